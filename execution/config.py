@@ -1,4 +1,7 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Final
 from dotenv import load_dotenv
 
 # Load .env (gracefully handle missing/unreadable .env)
@@ -8,43 +11,77 @@ except Exception:
     # .env is missing or unreadable - continue with environment variables or defaults
     pass
 
-# --- TIMEZONE SETTING ---
-# Canonical format (e.g., America/Los_Angeles, America/New_York)
-TIMEZONE = os.getenv("TIMEZONE", "America/Los_Angeles")
-
-# --- TWILIO CREDENTIALS ---
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "+15550000000")
-TWILIO_MESSAGING_SERVICE_SID = os.getenv("TWILIO_MESSAGING_SERVICE_SID")  # Required for A2P 10DLC (US SMS)
-
-# --- TELEGRAM ALERTS ---
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-
-# Validation: Fail Fast if Keys are placeholders or missing in production
-# (We assume production if running inside docker or typical deploy)
-if TWILIO_ACCOUNT_SID and "YOUR_SID" in TWILIO_ACCOUNT_SID:
-    # Allow mock mode, but warn loudly
-    print("⚠️ [CONFIG] Placeholder Credentials detected. App will run in Mock Mode.")
-    TWILIO_ACCOUNT_SID = None # Force Mock
-
-# --- APP CONFIG ---
-PLUMBER_PHONE_NUMBER = os.getenv("PLUMBER_PHONE_NUMBER", "+15551234567")
-AI_API_KEY = os.getenv("AI_API_KEY", "")
-
-# --- SAFE MODE (Kill Switch) ---
-# SAFE_MODE blocks all real SMS sends. Defaults to ON for local/dev.
-# IMPORTANT: Always set SAFE_MODE explicitly in .env:
-#   - LOCAL/DEV: SAFE_MODE=ON (always blocks real sends)
-#   - PRODUCTION: SAFE_MODE=OFF (must be explicit, never rely on default)
-# Accepts: "ON", "OFF", "true", "false", "1", "0" (case-insensitive)
-_safe_mode_val = os.getenv("SAFE_MODE", "ON").upper().strip()
-if _safe_mode_val in ("OFF", "FALSE", "0"):
-    SAFE_MODE = False
-else:
-    SAFE_MODE = True  # Default to ON (safe) - blocks all SMS sends
-
-# --- GLOBAL KILL SWITCH ---
-# If KILL_SWITCH is ON, the entire SMS engine worker will stop processing loops.
-KILL_SWITCH = os.getenv("KILL_SWITCH", "OFF").upper() == "ON"
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    # --- TIMEZONE SETTING ---
+    # Canonical format (e.g., America/Los_Angeles, America/New_York)
+    TIMEZONE: str
+
+    # --- TWILIO CREDENTIALS ---
+    TWILIO_ACCOUNT_SID: str | None
+    TWILIO_AUTH_TOKEN: str | None
+    TWILIO_PHONE_NUMBER: str
+    TWILIO_MESSAGING_SERVICE_SID: str | None  # Required for A2P 10DLC (US SMS)
+
+    # --- TELEGRAM ALERTS ---
+    TELEGRAM_BOT_TOKEN: str | None
+    TELEGRAM_CHAT_ID: str | None
+
+    # --- APP CONFIG ---
+    PLUMBER_PHONE_NUMBER: str
+    AI_API_KEY: str
+
+    # --- SAFE MODE (Kill Switch) ---
+    # Parsed once into a plain bool; every check after that is a bool branch
+    SAFE_MODE: Final[bool]
+
+    # --- GLOBAL KILL SWITCH ---
+    KILL_SWITCH: bool
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Reads the environment ONCE and returns the frozen settings for this process.
+    Every `config.X` access is served from this cached object.
+    """
+    twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+
+    # Validation: Fail Fast if Keys are placeholders or missing in production
+    # (We assume production if running inside docker or typical deploy)
+    if twilio_account_sid and "YOUR_SID" in twilio_account_sid:
+        # Allow mock mode, but warn loudly
+        print("⚠️ [CONFIG] Placeholder Credentials detected. App will run in Mock Mode.")
+        twilio_account_sid = None # Force Mock
+
+    # SAFE_MODE blocks all real SMS sends. Defaults to ON for local/dev.
+    # IMPORTANT: Always set SAFE_MODE explicitly in .env:
+    #   - LOCAL/DEV: SAFE_MODE=ON (always blocks real sends)
+    #   - PRODUCTION: SAFE_MODE=OFF (must be explicit, never rely on default)
+    # Accepts: "ON", "OFF", "true", "false", "1", "0" (case-insensitive)
+    # Anything other than an explicit off value means ON (safe) - blocks all SMS sends
+    safe_mode = os.getenv("SAFE_MODE", "ON").strip().lower() not in ("off", "false", "0")
+
+    return Settings(
+        TIMEZONE=os.getenv("TIMEZONE", "America/Los_Angeles"),
+        TWILIO_ACCOUNT_SID=twilio_account_sid,
+        TWILIO_AUTH_TOKEN=os.getenv("TWILIO_AUTH_TOKEN"),
+        TWILIO_PHONE_NUMBER=os.getenv("TWILIO_PHONE_NUMBER", "+15550000000"),
+        TWILIO_MESSAGING_SERVICE_SID=os.getenv("TWILIO_MESSAGING_SERVICE_SID"),
+        TELEGRAM_BOT_TOKEN=os.getenv("TELEGRAM_BOT_TOKEN"),
+        TELEGRAM_CHAT_ID=os.getenv("TELEGRAM_CHAT_ID"),
+        PLUMBER_PHONE_NUMBER=os.getenv("PLUMBER_PHONE_NUMBER", "+15551234567"),
+        AI_API_KEY=os.getenv("AI_API_KEY", ""),
+        SAFE_MODE=safe_mode,
+        # If KILL_SWITCH is ON, the entire SMS engine worker will stop processing loops.
+        KILL_SWITCH=os.getenv("KILL_SWITCH", "OFF").upper() == "ON",
+    )
+
+
+def __getattr__(name):
+    """Keeps `config.SAFE_MODE` / `from execution.config import X` working."""
+    try:
+        return getattr(get_settings(), name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -1,4 +1,5 @@
-
+import time
+import threading
 from flask import Blueprint, jsonify, request
 from execution.utils import database
 from execution.utils.logger import setup_logger
@@ -6,12 +7,40 @@ from execution.utils.logger import setup_logger
 logger = setup_logger("DashboardAPI")
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Dashboards poll these endpoints every few seconds from several tabs. Serve identical
+# requests from a short in-process TTL cache instead of re-running the aggregates.
+STATS_CACHE_TTL = 30  # seconds (funnel/revenue/queue counters)
+ACTIVITY_CACHE_TTL = 2  # seconds (live feed)
+RESPONSE_CACHE_MAX = 1024
+
+_response_cache = {}  # (endpoint, tenant_id) -> (expires_at, payload)
+_response_cache_lock = threading.Lock()
+
+def _cached(key, ttl, loader):
+    """Returns the cached payload for key, or calls loader() and caches it for ttl seconds."""
+    now = time.monotonic()
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+    
+    # Miss: query outside the lock so one slow aggregate doesn't block other tenants
+    payload = loader()
+    with _response_cache_lock:
+        if len(_response_cache) >= RESPONSE_CACHE_MAX:
+            _response_cache.clear()
+        _response_cache[key] = (now + ttl, payload)
+    return payload
+
 @dashboard_bp.route('/api/activity', methods=['GET'])
 def get_activity():
     """
     Returns recent conversation activity for the live feed.
     """
     tenant_id = request.args.get('tenant_id') # Optional filter
+    return jsonify(_cached(('activity', tenant_id), ACTIVITY_CACHE_TTL, lambda: _load_activity(tenant_id)))
+
+def _load_activity(tenant_id):
     logs = database.get_recent_conversation_logs(limit=20, tenant_id=tenant_id)
     
     # Format for UI
@@ -25,21 +54,25 @@ def get_activity():
             'timestamp': log['created_at'],
             'business': log.get('business', 'Lead Activity')
         })
-    
-    return jsonify(formatted)
+    return formatted
 
 @dashboard_bp.route('/api/stats', methods=['GET'])
 def get_stats():
     """Returns top-level stats for the dashboard"""
     tenant_id = request.args.get('tenant_id')
-    stats = database.get_lead_funnel_stats(tenant_id=tenant_id)
-    revenue = database.get_revenue_stats(tenant_id=tenant_id)
-    
-    return jsonify({
-        'leads': stats,
-        'revenue': revenue
+    return jsonify(cached_stats(tenant_id))
+
+def cached_stats(tenant_id=None):
+    """Funnel + revenue aggregates, shared by /api/stats and the /dashboard page."""
+    return _cached(('stats', tenant_id), STATS_CACHE_TTL, lambda: {
+        'leads': database.get_lead_funnel_stats(tenant_id=tenant_id),
+        'revenue': database.get_revenue_stats(tenant_id=tenant_id)
     })
 
+def cached_queue_stats(tenant_id=None):
+    """SMS queue counters for the /dashboard page."""
+    return _cached(('queue_stats', tenant_id), STATS_CACHE_TTL, lambda: database.get_dashboard_stats(tenant_id))
+
 @dashboard_bp.route('/api/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok"})
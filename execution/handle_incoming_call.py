@@ -1,29 +1,55 @@
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, request, stream_template, jsonify
 from flask_cors import CORS
 import os
+import logging
 from twilio.twiml.voice_response import VoiceResponse, Gather
+from twilio.twiml.messaging_response import MessagingResponse
 from twilio.rest import Client
-import pytz
+import re
 import uuid
 from datetime import datetime, timedelta
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
 
 # Import Config (Absolute Import from execution package)
 from execution import config
-from execution.utils.database import get_all_sms, create_or_update_lead, update_lead_status, log_conversation_event, get_lead_funnel_stats, set_opt_out, get_tenant_by_twilio_number, get_tenant_by_id, record_consent, revoke_consent, update_sms_status_by_message_sid, update_lead_intent, get_revenue_stats
+from execution.utils.database import iter_sms, create_or_update_lead, record_webhook_processed, get_lead_by_phone, insert_or_update_alert_buffer, get_tenant_by_any_number, update_lead_status, log_conversation_event, set_opt_out, record_consent, revoke_consent, update_sms_status_by_message_sid, update_lead_intent, upsert_lead_with_consent
 from execution.utils.security import require_twilio_signature, require_rate_limit, mask_pii, check_tenant_rate_limit, verify_unsubscribe_token
 from execution.utils.logger import setup_logger
 from execution.utils.alert_system import send_critical_alert
-from execution.services.twilio_service import get_twilio_service
+from execution.services.twilio_service import get_twilio_service, get_http_client
 from execution.utils.resilience import (
     validate_webhook_input, check_webhook_processed_safe, get_tenant_safe,
     queue_webhook_for_retry, add_to_webhook_cache, process_stop_safe
 )
-from execution.dashboard_api import dashboard_bp 
+from execution.dashboard_api import dashboard_bp, cached_stats, cached_queue_stats
 from execution.utils.database import cancel_pending_sms # Added for Nudge
+from execution.utils.constants import STOP_KEYWORDS, EMERGENCY_KEYWORDS, AUTO_REPLY_KEYWORDS, HELP_KEYWORDS, UNSTOP_KEYWORDS
+from execution.utils.tenant_cache import tenant_by_id
+from execution.utils.sms_engine import add_to_queue, add_many_to_queue
+from execution.utils.lookup_cache import line_lookups
 import random
 
 logger = setup_logger("FlaskWeb")
 
+# Fire-and-forget work (sheet logging) runs on a bounded pool: a burst of webhooks
+# queues jobs instead of spawning one thread per request.
+BACKGROUND_WORKERS = 8
+_BACKGROUND = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='webhook-bg')
+
+# Empty TwiML acks are byte-identical every time; serialize them once.
+_EMPTY_MSG_TWIML = str(MessagingResponse())
+_EMPTY_VOICE_TWIML = str(VoiceResponse())
+
+@lru_cache(maxsize=256)
+def _tz(name):
+    """Resolves a tenant timezone once per name, falling back to Pacific for bad names."""
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        return ZoneInfo('America/Los_Angeles')
+
 app = Flask(__name__, template_folder='../templates') # Point to templates folder
 # Set secret key for session management (Use stable key for development)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "plumber-ai-secret-development-key-8291")
@@ -71,7 +97,6 @@ def handle_not_found(e):
 @app.route("/health")
 def health():
     """Simple health check endpoint for smoke tests"""
-    from execution import config
     return {
         "status": "ok",
         "safe_mode": config.SAFE_MODE,
@@ -83,21 +108,22 @@ def health():
 def dashboard():
     """Admin Dashboard to view logs"""
     # Load Queue from DB
-    queue = get_all_sms()
+    # Keyset pagination: ?before=<created_at of last row shown>
+    try:
+        limit = max(1, min(int(request.args.get('limit', 500)), 500))
+    except ValueError:
+        limit = 500
+    before = request.args.get('before')
             
-    # Calc Stats
-    stats = {"missed_calls": 0, "reminders": 0, "errors": 0}
-    funnel = get_lead_funnel_stats()
-    revenue_stats = get_revenue_stats()
-    
-    for msg in queue:
-        body = msg['body'].lower()
-        if "wrapped up" in body: stats['missed_calls'] += 1
-        if "scheduled" in body: stats['reminders'] += 1
-        if "failed" in msg['status']: stats['errors'] += 1
-        
-    # Queue is already sorted new->old, so we don't need to reverse it.
-    return render_template('dashboard.html', queue=queue, stats=stats, funnel=funnel, revenue_stats=revenue_stats, queue_len=len(queue))
+    # Calc Stats (aggregated in SQL, served from the dashboard API's TTL cache)
+    stats = cached_queue_stats()
+    summary = cached_stats()
+    funnel = summary['leads']
+    revenue_stats = summary['revenue']
+        
+    # Queue rows are pulled lazily while the page streams (sorted new->old, no reverse needed)
+    queue = iter_sms(limit=limit, before=before)
+    return app.response_class(stream_template('dashboard.html', queue=queue, stats=stats, funnel=funnel, revenue_stats=revenue_stats, queue_len=stats['total'], limit=limit))
 
 # --- CONFIGURATION (Loaded from execution/config.py) ---
 ACCOUNT_SID = config.TWILIO_ACCOUNT_SID
@@ -109,14 +135,21 @@ try:
         logger.warning("⚠️  Running in MOCK mode (No Twilio Keys found)")
         twilio_client = None
     else:
-        twilio_client = Client(config.TWILIO_ACCOUNT_SID, config.TWILIO_AUTH_TOKEN)
+        twilio_client = Client(config.TWILIO_ACCOUNT_SID, config.TWILIO_AUTH_TOKEN, http_client=get_http_client())
         logger.info("✅ Twilio Client Initialized")
 except Exception as e:
     logger.error(f"Error initializing Twilio: {e}")
     twilio_client = None
 
-# --- PILOT SHIELDING: CONFIGURATIONS ---
-AUTO_REPLY_KEYWORDS = ['driving', 'away from my phone', 'auto-reply', 'out of office', 'unavailable', 'vacation']
+# --- SMS KEYWORD MATCHING (compiled once at import, not per message) ---
+_STOP_EXACT = frozenset(STOP_KEYWORDS)
+_STOP_RE = re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in STOP_KEYWORDS) + r')\b')
+_AUTO_REPLY_RE = re.compile('|'.join(re.escape(k) for k in AUTO_REPLY_KEYWORDS))  # substring match, one pass
+_WORD_RE = re.compile(r"[a-z]+")
+_URGENT_SET = frozenset(k for k in EMERGENCY_KEYWORDS if ' ' not in k)
+_URGENT_PHRASE_RE = re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in EMERGENCY_KEYWORDS if ' ' in k) + r')\b')
+_POSITIVE_FEEDBACK = frozenset({'good', 'great', 'awesome', 'excellent', 'yes'})
+_NEGATIVE_FEEDBACK = frozenset({'bad', 'poor', 'terrible', 'horrible', 'no', 'worst'})
 
 MISSED_CALL_TEMPLATES = [
     "Hi, this is {business_name}'s automated assistant. We missed your call! Are you looking for emergency service or a standard quote?\nReply STOP to unsubscribe.",
@@ -125,6 +158,27 @@ MISSED_CALL_TEMPLATES = [
     "Thanks for calling {business_name}. Our team is currently on a job. Are you looking for an emergency tech or a standard service quote?\nReply STOP to unsubscribe."
 ]
 
+_STATUS_DISPLAY = {
+    'delivered': '✅ SMS Delivered',
+    'undelivered': '❌ SMS Undelivered (Blocked)',
+    'failed': '❌ SMS Failed',
+    'sent': '📤 SMS Sent',
+    'queued': '⏳ SMS Queued'
+}
+
+@lru_cache(maxsize=256)
+def _hour_modes(start_hour, day_end_hour, evening_end_hour):
+    """24-entry table hour -> 'Day' / 'Evening' / 'Sleep', built once per distinct tenant schedule."""
+    return tuple(
+        'Day' if start_hour <= h < day_end_hour else 'Evening' if day_end_hour <= h < evening_end_hour else 'Sleep'
+        for h in range(24)
+    )
+
+@lru_cache(maxsize=1024)
+def _missed_call_bodies(business_name):
+    """All rotation templates pre-formatted for one business (formatted once per tenant, not per call)."""
+    return tuple(t.format(business_name=business_name) for t in MISSED_CALL_TEMPLATES)
+
 @app.route("/voice", methods=['GET', 'POST'])
 @require_twilio_signature
 def voice_handler():
@@ -154,6 +208,7 @@ def voice_handler():
     Returns:
         TwiML response (XML string) for Twilio to execute
     """
+    v = request.values.to_dict()  # Snapshot form+args once
     # KILL SWITCH CHECK (early exit)
     if config.KILL_SWITCH:
         logger.warning("🛑 KILL SWITCH ACTIVE: Rejecting Incoming Call.")
@@ -164,14 +219,11 @@ def voice_handler():
 
     # WRAP ENTIRE HANDLER IN TRY-CATCH
     try:
-        from execution.utils.database import record_webhook_processed
-        from execution.utils.sms_engine import add_to_queue
-        
         twilio = get_twilio_service()
         
-        caller_number = request.values.get('From')
-        to_number = request.values.get('To')
-        call_sid = request.values.get('CallSid')
+        caller_number = v.get('From')
+        to_number = v.get('To')
+        call_sid = v.get('CallSid')
         
         # INPUT VALIDATION
         is_valid, error_msg = validate_webhook_input(caller_number, to_number, call_sid)
@@ -198,7 +250,7 @@ def voice_handler():
                 return str(resp), 200
         
         if is_duplicate:
-            logger.info(f"♻️  Duplicate webhook ignored: CallSid {call_sid}")
+            logger.info("♻️  Duplicate webhook ignored: CallSid %s", call_sid)
             resp = VoiceResponse()
             resp.say("Thank you. Please check your text messages.", voice='Polly.Matthew-Neural', language='en-US')
             return str(resp), 200
@@ -225,34 +277,40 @@ def voice_handler():
             resp.dial(plumber_phone)
             return str(resp), 200
         
+        # Tenant Rate Limit (non-blocking) - checked BEFORE recording the webhook, so a
+        # rejected call costs no DB write and Twilio's retry isn't dropped as a duplicate
+        try:
+            if not check_tenant_rate_limit(tenant_id):
+                resp = VoiceResponse()
+                resp.say("Busy. Please try again later.", voice='Polly.Matthew-Neural')
+                return str(resp), 429
+        except Exception as e:
+            logger.warning(f"Rate limit check failed: {e}. Allowing request (fail-open).")
+
         # Record webhook as processed (with error handling)
         if not internal_id:
-            internal_id = str(uuid.uuid4())
+            internal_id = uuid.uuid4().hex
         
         try:
-            record_webhook_processed(call_sid, 'voice', tenant_id=tenant_id, internal_id=internal_id)
+            # The insert is the atomic arbiter: False means a concurrent delivery of this CallSid won
+            if call_sid and not record_webhook_processed(call_sid, 'voice', tenant_id=tenant_id, internal_id=internal_id):
+                logger.info("♻️  Duplicate webhook ignored (concurrent): CallSid %s", call_sid)
+                resp = VoiceResponse()
+                resp.say("Thank you. Please check your text messages.", voice='Polly.Matthew-Neural', language='en-US')
+                return str(resp), 200
             if used_fallback:
                 add_to_webhook_cache(call_sid, internal_id)
         except Exception as e:
             logger.warning(f"Failed to record voice webhook: {e}. Will retry async.")
             queue_webhook_for_retry(call_sid, caller_number, to_number, '', 'voice')
         
-        # Tenant Rate Limit (non-blocking)
-        try:
-            if not check_tenant_rate_limit(tenant_id):
-                resp = VoiceResponse()
-                resp.say("Busy. Please try again later.", voice='Polly.Matthew-Neural')
-                return str(resp), 429
-        except Exception as e:
-            logger.warning(f"Rate limit check failed: {e}. Allowing request (fail-open).")
-
         plumber_name = tenant['name']
         business_name = tenant.get('name', 'PlumberAI')
         plumber_phone = tenant['plumber_phone_number']
         emergency_mode = tenant.get('emergency_mode', 0)
         
         # Check if this is an "Emergency Press 1" event
-        digits = request.values.get('Digits')
+        digits = v.get('Digits')
         if digits == '1' and emergency_mode:
             logger.info(f"🚨 EMERGENCY OVERRIDE: Connecting caller {caller_number} to {plumber_phone}")
             try:
@@ -269,59 +327,50 @@ def voice_handler():
         resp = VoiceResponse()
         
         # Timezone Logic
-        tz_name = tenant.get('timezone', 'America/Los_Angeles')
-        try:
-            tz = pytz.timezone(tz_name)
-        except:
-            tz = pytz.timezone('America/Los_Angeles')
+        tz_name = tenant.get('timezone') or 'America/Los_Angeles'
+        tz = _tz(tz_name)
         
         local_time = datetime.now(tz)
         hour = local_time.hour
         
-        # Log for debugging
-        logger.info(f"📞 INCOMING CALL FROM: {mask_pii(caller_number)} TO: {to_number} (Tenant: {plumber_name})")
+        # Log for debugging (mask_pii only runs when INFO is actually emitted)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("📞 INCOMING CALL FROM: %s TO: %s (Tenant: %s)", mask_pii(caller_number), to_number, plumber_name)
         
         start_hour = tenant.get('business_hours_start', 7)
         day_end_hour = tenant.get('business_hours_end', 17)
         evening_end_hour = tenant.get('evening_hours_end', 17) # Default to same if not set
         
-        is_daytime = start_hour <= hour < day_end_hour
-        is_evening = day_end_hour <= hour < evening_end_hour
+        mode = _hour_modes(start_hour, day_end_hour, evening_end_hour)[hour]
+        is_daytime = mode == 'Day'
+        is_evening = mode == 'Evening'
         
-        logger.info(f"🕒 Local Time: {local_time.strftime('%I:%M %p')} (Hour: {hour}) | Mode: {'Day' if is_daytime else 'Evening' if is_evening else 'Sleep'}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🕒 Local Time: %s (Hour: %s) | Mode: %s", local_time.strftime('%I:%M %p'), hour, mode)
 
         # --- PILOT POLISH: LANDLINE & CNAM LOOKUP ---
         # This determines if caller is on mobile (can SMS) or landline (voicemail only)
-        # Error handling ensures lookup failure doesn't block call processing
+        # Served from cache; a first-time caller is assumed mobile while the Twilio
+        # Lookup runs in the background, so the TwiML never waits on it
         twilio = get_twilio_service()
-        try:
-            lookup = twilio.lookup_number(caller_number)
-            line_type = lookup.get('line_type', 'mobile')
-            caller_name = lookup.get('caller_name')
-        except Exception as e:
-            # If lookup fails, assume mobile to allow SMS fallback
-            logger.warning(f"Lookup failed for {caller_number}: {e}. Assuming mobile.")
-            lookup = {'line_type': 'mobile', 'caller_name': None}
-            line_type = 'mobile'
-            caller_name = None
+        lookup = line_lookups.get(caller_number, twilio.lookup_number)
+        line_type = lookup['line_type']
+        caller_name = lookup['caller_name']
         
         is_landline = line_type == 'landline'
 
         # --- LEAD & CONSENT (Always Record) ---
         # Pass bypass_check=True for inbound calls (system-initiated, valid consent)
-        lead_id, _ = create_or_update_lead(caller_number, tenant_id=tenant_id, source="voice_inbound", bypass_check=True, name=caller_name)
-        record_consent(
-            phone=caller_number,
+        lead_id, _, _ = upsert_lead_with_consent(
+            caller_number,
+            tenant_id=tenant_id,
+            source="voice_inbound",
             consent_type='implied',
             consent_source='inbound_call',
-            tenant_id=tenant_id,
-            metadata={'CallSid': call_sid, 'to_number': to_number}
+            metadata={'CallSid': call_sid, 'to_number': to_number},
+            name=caller_name
         )
 
-        # Phase 1: The Missed Call SMS (Rotation for Deliverability)
-        template = random.choice(MISSED_CALL_TEMPLATES)
-        sms_body = template.format(business_name=business_name)
-
         if is_daytime:
             # DAYTIME: Ring Plumber for 15s -> If No Answer -> AI Intercept
             logger.info(f"☀️ BUSINESS HOURS: Ringing Plumber... Fallback to AI.")
@@ -369,13 +418,17 @@ def voice_handler():
         # 3. Create Lead and Consent moved to top
         
         if caller_number and not is_landline:
-            add_to_queue(caller_number, sms_body, external_id=call_sid, tenant_id=tenant_id)
-            
             # 4. Notify the Plumber (Click-to-Call formatting)
             tenant_plumber_phone = tenant.get('plumber_phone_number')
             clean_name = caller_name or 'New Customer'
+            # Phase 1: The Missed Call SMS (Rotation for Deliverability)
+            sms_body = random.choice(_missed_call_bodies(business_name))
             alert_msg = f"🔔 ({plumber_name}) Lead Alert: Caught a missed call from {clean_name}. I have texted them back.\n\nClick to Call:\n{caller_number}"
-            add_to_queue(tenant_plumber_phone, alert_msg, external_id=f"{call_sid}:plumber", tenant_id=tenant_id)
+            # Customer text + plumber alert in one DB transaction
+            add_many_to_queue([
+                (caller_number, sms_body, call_sid, tenant_id),
+                (tenant_plumber_phone, alert_msg, f"{call_sid}:plumber", tenant_id),
+            ])
             
             # 5. LOG TO GOOGLE SHEET (If configured)
             # Use async/background processing to avoid blocking webhook
@@ -383,7 +436,6 @@ def voice_handler():
             if sheet_id:
                 try:
                     from execution.utils.sheets_engine import append_lead_to_sheet
-                    import threading
                     
                     def log_to_sheet_async():
                         try:
@@ -401,10 +453,8 @@ def voice_handler():
                         except Exception as e:
                             logger.error(f"Failed to log to sheet: {e}")
                     
-                    # Run in background thread to avoid blocking webhook
-                    thread = threading.Thread(target=log_to_sheet_async)
-                    thread.daemon = True
-                    thread.start()
+                    # Run in background pool to avoid blocking webhook
+                    _BACKGROUND.submit(log_to_sheet_async)
                 except Exception as e:
                     logger.error(f"Failed to start sheet logging thread: {e}")
 
@@ -415,17 +465,16 @@ def voice_handler():
         logger.critical(f"CRITICAL: Voice handler crashed: {e}", exc_info=True)
         send_critical_alert("Voice Handler Crash", 
             f"Webhook crashed: {e}\n"
-            f"From: {request.values.get('From')}\n"
-            f"To: {request.values.get('To')}\n"
-            f"CallSid: {request.values.get('CallSid')}")
+            f"From: {v.get('From')}\n"
+            f"To: {v.get('To')}\n"
+            f"CallSid: {v.get('CallSid')}")
         
         # Queue for retry
         try:
-            from execution.utils.resilience import queue_webhook_for_retry
             queue_webhook_for_retry(
-                request.values.get('CallSid'),
-                request.values.get('From'),
-                request.values.get('To'),
+                v.get('CallSid'),
+                v.get('From'),
+                v.get('To'),
                 '',
                 'voice'
             )
@@ -471,33 +520,28 @@ def sms_handler():
     Returns:
         TwiML MessagingResponse (XML string) - always returns 200 OK
     """
+    v = request.values.to_dict()  # Snapshot form+args once
     # KILL SWITCH CHECK (early exit, no DB needed)
     if config.KILL_SWITCH:
         logger.warning("🛑 KILL SWITCH ACTIVE: Rejecting Incoming SMS.")
-        from twilio.twiml.messaging_response import MessagingResponse
-        return str(MessagingResponse()), 200
+        return _EMPTY_MSG_TWIML, 200
 
     # WRAP ENTIRE HANDLER IN TRY-CATCH
     try:
-        from twilio.twiml.messaging_response import MessagingResponse
-        from execution.utils.sms_engine import add_to_queue
-        from execution.utils.database import record_webhook_processed, log_conversation_event, get_lead_by_phone, get_or_create_magic_token, insert_or_update_alert_buffer
-        from execution.utils.constants import STOP_KEYWORDS, EMERGENCY_KEYWORDS
-        import re
-        
         # INPUT VALIDATION FIRST (before any DB calls)
-        from_number = request.values.get('From')
-        to_number = request.values.get('To')
-        body = request.values.get('Body', '').strip()
-        msg_sid = request.values.get('MessageSid')
+        from_number = v.get('From')
+        to_number = v.get('To')
+        body = (v.get('Body') or '').strip()
+        body_lower = body.lower()  # Derived once; every keyword check below reuses it
+        msg_sid = v.get('MessageSid')
         
         # 🛡️ BUG #15 FIX: INFINITE LOOP PREVENTION
         # Twilio sends status updates (sent, delivered, etc.) to the same webhook if configured.
         # We MUST ignore these, otherwise we might reply to a confirmation -> infinite loop.
-        sms_status = request.values.get('SmsStatus')
+        sms_status = v.get('SmsStatus')
         if sms_status in ['sent', 'delivered', 'undelivered', 'failed', 'queued', 'sending']:
             logger.info(f"Ignoring status update: {sms_status} for {msg_sid}")
-            return str(MessagingResponse()), 200
+            return _EMPTY_MSG_TWIML, 200
 
         # Validate required fields
         # Validate required fields
@@ -506,7 +550,7 @@ def sms_handler():
             logger.error(f"Invalid webhook: {error_msg}. Headers: {dict(request.headers)}")
             send_critical_alert("Invalid Webhook Received", 
                 f"Validation error: {error_msg}\nFrom: {from_number}\nTo: {to_number}\nSID: {msg_sid}")
-            return str(MessagingResponse()), 200  # Return 200 to prevent retries
+            return _EMPTY_MSG_TWIML, 200  # Return 200 to prevent retries
         
         # IDEMPOTENCY CHECK WITH FALLBACK
         is_duplicate = False
@@ -519,11 +563,11 @@ def sms_handler():
                 # DB unavailable - queue for async processing
                 queue_webhook_for_retry(msg_sid, from_number, to_number, body, 'sms')
                 logger.info(f"Webhook queued for retry (DB unavailable): {msg_sid}")
-                return str(MessagingResponse()), 200  # Return OK to prevent retries
+                return _EMPTY_MSG_TWIML, 200  # Return OK to prevent retries
         
         if is_duplicate:
-            logger.info(f"♻️  Duplicate webhook ignored: MessageSid {msg_sid} (already processed as {internal_id})")
-            return str(MessagingResponse()), 200
+            logger.info("♻️  Duplicate webhook ignored: MessageSid %s (already processed as %s)", msg_sid, internal_id)
+            return _EMPTY_MSG_TWIML, 200
         
         # TENANT RESOLUTION WITH FALLBACK
         tenant, tenant_used_fallback = get_tenant_safe(to_number)
@@ -531,18 +575,30 @@ def sms_handler():
             logger.error(f"Unknown tenant for {to_number}. Webhook: {msg_sid}")
             send_critical_alert("Tenant Resolution Failed", 
                 f"Could not resolve tenant for {to_number}. This may indicate provisioning issue.")
-            return str(MessagingResponse()), 200  # Return 200 to prevent retries
+            return _EMPTY_MSG_TWIML, 200  # Return 200 to prevent retries
         
         tenant_id = tenant['id']
         business_name = tenant.get('name', 'PlumberAI')
         tenant_plumber_phone = tenant.get('plumber_phone_number')
         
+        # Rate limiting (non-blocking) - before recording, so rejected messages skip the DB write
+        try:
+            if not check_tenant_rate_limit(tenant_id):
+                logger.warning(f"Rate limit exceeded for tenant {tenant_id}")
+                return "Too Many Requests", 429
+        except Exception as e:
+            logger.warning(f"Rate limit check failed: {e}. Allowing request (fail-open).")
+            # Fail-open for rate limiting
+        
         # Record webhook as processed (with error handling)
         if not internal_id:
-            internal_id = str(uuid.uuid4())
+            internal_id = uuid.uuid4().hex
         
         try:
-            record_webhook_processed(msg_sid, 'sms', tenant_id=tenant_id, internal_id=internal_id)
+            # The insert is the atomic arbiter: False means a concurrent delivery of this MessageSid won
+            if msg_sid and not record_webhook_processed(msg_sid, 'sms', tenant_id=tenant_id, internal_id=internal_id):
+                logger.info("♻️  Duplicate webhook ignored (concurrent): MessageSid %s", msg_sid)
+                return _EMPTY_MSG_TWIML, 200
             if used_fallback:
                 # Also cache it for future reference
                 add_to_webhook_cache(msg_sid, internal_id)
@@ -551,33 +607,23 @@ def sms_handler():
             queue_webhook_for_retry(msg_sid, from_number, to_number, body, 'sms')
             # Continue processing - don't fail the request
         
-        # Rate limiting (non-blocking)
-        try:
-            if not check_tenant_rate_limit(tenant_id):
-                logger.warning(f"Rate limit exceeded for tenant {tenant_id}")
-                return "Too Many Requests", 429
-        except Exception as e:
-            logger.warning(f"Rate limit check failed: {e}. Allowing request (fail-open).")
-            # Fail-open for rate limiting
-        
-        logger.info(f"📩 INCOMING SMS from {mask_pii(from_number)}: {mask_pii(body)} (SID: {msg_sid}) Tenant: {tenant_id}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("📩 INCOMING SMS from %s: %s (SID: %s) Tenant: %s", mask_pii(from_number), mask_pii(body), msg_sid, tenant_id)
         
         # CRITICAL: STOP PROCESSING (HIGHEST PRIORITY - works even if DB is down)
-        body_lower = body.strip().lower() if body else ""
         is_stop = False
         stop_keyword = None
         
         # Check for exact matches first (fast path)
-        if body_lower in STOP_KEYWORDS:
+        if body_lower in _STOP_EXACT:
             is_stop = True
             stop_keyword = body_lower
         else:
-            # Check for partial matches
-            for pattern in STOP_KEYWORDS:
-                if re.search(r'\b' + pattern + r'\b', body_lower):
-                    is_stop = True
-                    stop_keyword = pattern
-                    break
+            # Check for partial matches (single precompiled alternation)
+            stop_match = _STOP_RE.search(body_lower)
+            if stop_match:
+                is_stop = True
+                stop_keyword = stop_match.group(0)
         
         if is_stop:
             # ... existing STOP logic ...
@@ -592,12 +638,12 @@ def sms_handler():
             return str(resp), 200
 
         # BUG #3: AUTO-REPLY IMMUNITY (Bot-on-Bot loop prevention)
-        if any(keyword in body_lower for keyword in AUTO_REPLY_KEYWORDS):
+        if _AUTO_REPLY_RE.search(body_lower):
             logger.warning(f"🤖 AUTO-REPLY detected from {mask_pii(from_number)}: '{body}'. Killing response loop.")
             try:
                 log_conversation_event(from_number, 'inbound', f"(Auto-Reply) {body}", external_id=msg_sid, tenant_id=tenant_id)
             except: pass
-            return str(MessagingResponse()), 200
+            return _EMPTY_MSG_TWIML, 200
         
         # Lead State Machine: Log & Update (only if not STOP)
         try:
@@ -625,13 +671,10 @@ def sms_handler():
         except Exception as e:
             logger.warning(f"Failed to cancel nudge: {e}")
 
-        body_clean = body.lower().strip()
-        
         # COMPLIANCE KEYWORDS (HELP / UNSTOP)
-        help_keywords = ['help', 'info', 'aide']
-        if body_clean in help_keywords:
+        if body_lower in HELP_KEYWORDS:
             try:
-                tenant_config = get_tenant_by_id(tenant_id)
+                tenant_config = tenant_by_id.get(tenant_id)
                 business_name = tenant_config.get('business_name', 'PlumberAI') if tenant_config else business_name
             except Exception as e:
                 logger.warning(f"Failed to get tenant config for help: {e}")
@@ -639,15 +682,13 @@ def sms_handler():
             resp.message(f"{business_name}: Text us anytime for service. Call for emergencies. Reply STOP to unsubscribe.")
             return str(resp), 200
 
-        if body_clean in ['start', 'unstop']:
+        if body_lower in UNSTOP_KEYWORDS:
             try:
-                from execution.utils.database import set_opt_out
                 set_opt_out(from_number, False)
                 record_consent(from_number, 'express', 'inbound_sms', tenant_id, metadata={'keyword': body})
             except Exception as e:
                 logger.error(f"Failed to process UNSTOP: {e}")
-            resp = MessagingResponse()
-            return str(resp), 200
+            return _EMPTY_MSG_TWIML, 200
     
         # AI KILL SWITCH (Global Pause)
         ai_active = tenant.get('ai_active', 1)
@@ -666,7 +707,6 @@ def sms_handler():
             if sheet_id:
                 try:
                     from execution.utils.sheets_engine import append_lead_to_sheet
-                    import threading
                     
                     lead_info = None
                     try:
@@ -688,41 +728,41 @@ def sms_handler():
                         except Exception as e:
                             logger.error(f"Sheet Log Error (KillSwitch): {e}")
                     
-                    t = threading.Thread(target=log_killswitch_async)
-                    t.daemon = True
-                    t.start()
+                    _BACKGROUND.submit(log_killswitch_async)
                 except Exception as e:
                     logger.error(f"Failed to start sheet logging thread: {e}")
                     
-            return str(MessagingResponse()), 200
+            return _EMPTY_MSG_TWIML, 200
 
         
         # SMART REVIEW LOGIC
-        clean_body = body.lower().strip()
-        
         # POSITIVE FEEDBACK
-        if clean_body in ['good', 'great', 'awesome', 'excellent', 'yes']:
+        if body_lower in _POSITIVE_FEEDBACK:
             try:
                 review_link = tenant.get('google_review_link')
                 if review_link:
                     reply_msg = f"{business_name}: That's music to our ears! 🎵 It would help us SO much if you could leave that on Google: {review_link} \n\nThanks again!"
-                    add_to_queue(from_number, reply_msg, external_id=f"{msg_sid}_review_link", tenant_id=tenant_id)
                     boss_msg = f"⭐ 5-STAR POTENTIAL: {from_number} said '{body}'. I sent them the link."
-                    add_to_queue(tenant.get('plumber_phone_number'), boss_msg, tenant_id=tenant_id)
+                    add_many_to_queue([
+                        (from_number, reply_msg, f"{msg_sid}_review_link", tenant_id),
+                        (tenant.get('plumber_phone_number'), boss_msg, None, tenant_id),
+                    ])
             except Exception as e:
                 logger.error(f"Failed to process positive feedback: {e}")
-            return str(MessagingResponse()), 200
+            return _EMPTY_MSG_TWIML, 200
 
         # NEGATIVE FEEDBACK
-        if clean_body in ['bad', 'poor', 'terrible', 'horrible', 'no', 'worst']:
+        if body_lower in _NEGATIVE_FEEDBACK:
             try:
                 reply_msg = f"{business_name}: I am so sorry to hear that. I have just alerted the owner directly, and he will be calling you shortly to make this right."
-                add_to_queue(from_number, reply_msg, external_id=f"{msg_sid}_apology", tenant_id=tenant_id)
                 boss_msg = f"🚨 NEGATIVE FEEDBACK: Customer says '{body}'.\n\nCall Now:\n{from_number}"
-                add_to_queue(tenant.get('plumber_phone_number'), boss_msg, tenant_id=tenant_id)
+                add_many_to_queue([
+                    (from_number, reply_msg, f"{msg_sid}_apology", tenant_id),
+                    (tenant.get('plumber_phone_number'), boss_msg, None, tenant_id),
+                ])
             except Exception as e:
                 logger.error(f"Failed to process negative feedback: {e}")
-            return str(MessagingResponse()), 200
+            return _EMPTY_MSG_TWIML, 200
         
         # CLASSIFY REQUEST URGENCY using improved classification logic
         # This uses intelligent keyword matching with context awareness
@@ -734,11 +774,12 @@ def sms_handler():
             confidence = classification.get('confidence', 0.5)
             reasoning = classification.get('reasoning', '')
             
-            logger.info(f"📊 Classification: {classification.get('urgency')} (confidence: {confidence:.2f}) - {reasoning}")
+            logger.info("📊 Classification: %s (confidence: %.2f) - %s", classification.get('urgency'), confidence, reasoning)
         except Exception as e:
             # Fallback to simple keyword matching if classification fails
             logger.warning(f"Classification failed, using fallback: {e}")
-            is_urgent = any(k in body.lower() for k in EMERGENCY_KEYWORDS)
+            tokens = set(_WORD_RE.findall(body_lower))
+            is_urgent = not tokens.isdisjoint(_URGENT_SET) or bool(_URGENT_PHRASE_RE.search(body_lower))
             confidence = 0.5
         
         # Get lead info (with error handling)
@@ -757,27 +798,24 @@ def sms_handler():
             except Exception as e:
                 logger.warning(f"Failed to update lead intent: {e}")
             
-            # EMERGENCY RESPONSE (Phase 2 - No STOP)
+            # EMERGENCY RESPONSE (Phase 2 - No STOP) + ESCALATION (Critical Alert - Click-to-Call)
+            # Queued together in one DB transaction
             try:
                 emerg_resp = f"{business_name}: ⚠️ Understood. I have flagged this as an EMERGENCY. I am paging the on-call plumber right now. Please hold tight."
-                add_to_queue(from_number, emerg_resp, external_id=f"{msg_sid}_emerg_ack", tenant_id=tenant_id)
-            except Exception as e:
-                logger.error(f"Failed to send emergency response: {e}")
-
-            # ESCALATION (Critical Alert - Click-to-Call)
-            try:
                 clean_name = cust_name if cust_name != 'Unknown' else 'New Customer'
                 boss_alert = f"🚨 EMERGENCY LEADS: {clean_name} says: '{body}'\n\nTap to Dial:\n{from_number}"
-                add_to_queue(tenant.get('plumber_phone_number'), boss_alert, external_id=f"{msg_sid}_boss_alert", tenant_id=tenant_id)
+                add_many_to_queue([
+                    (from_number, emerg_resp, f"{msg_sid}_emerg_ack", tenant_id),
+                    (tenant.get('plumber_phone_number'), boss_alert, f"{msg_sid}_boss_alert", tenant_id),
+                ])
             except Exception as e:
-                logger.error(f"Failed to send emergency alert: {e}")
+                logger.error(f"Failed to send emergency response/alert: {e}")
             
             # LOG TO SHEET (Emergency - async)
             sheet_id = tenant.get('google_sheet_id')
             if sheet_id:
                 try:
                     from execution.utils.sheets_engine import append_lead_to_sheet
-                    import threading
                     
                     def log_emergency_async():
                         try:
@@ -791,33 +829,31 @@ def sms_handler():
                         except Exception as e:
                             logger.error(f"Sheet Log Error (Emergency): {e}")
                     
-                    t = threading.Thread(target=log_emergency_async)
-                    t.daemon = True
-                    t.start()
+                    _BACKGROUND.submit(log_emergency_async)
                 except Exception as e:
                     logger.error(f"Failed to start emergency sheet logging: {e}")
             
-            return str(MessagingResponse()), 200
+            return _EMPTY_MSG_TWIML, 200
 
         # STANDARD SERVICE (Phase 2 - Click-to-Call)
         clean_name = cust_name if cust_name != 'Unknown' else 'New Customer'
         alert_msg = f"🔔 STANDARD SERVICE: Msg - '{body}'\nFrom: {clean_name}\n\nCall Now:\n{from_number}"
         
+        # Acknowledgement to Customer (Phase 2 - No STOP)
+        ack_body = f"Thanks! I've sent your details to {plumber_name}. We will get back to you shortly with a quote."
+        outbound = [(from_number, ack_body, f"{msg_sid}_ack", tenant_id)]
+        
         # ALERT BUFFERING ("Anti-Annoyance")
         try:
             insert_or_update_alert_buffer(tenant_id, from_number, tenant_plumber_phone, alert_msg)
             logger.info(f"⏳ buffered alert for {from_number}")
         except Exception as e:
             logger.error(f"⚠️ Error buffering alert: {e}. Falling back to immediate send.")
-            try:
-                add_to_queue(tenant_plumber_phone, alert_msg, external_id=f"{msg_sid}_copy", tenant_id=tenant_id)
-            except Exception as e2:
-                logger.error(f"Failed to send alert: {e2}")
+            outbound.append((tenant_plumber_phone, alert_msg, f"{msg_sid}_copy", tenant_id))
         
-        # Acknowledgement to Customer (Phase 2 - No STOP)
+        # Ack (+ fallback alert) in one DB transaction
         try:
-            ack_body = f"Thanks! I've sent your details to {plumber_name}. We will get back to you shortly with a quote."
-            add_to_queue(from_number, ack_body, external_id=f"{msg_sid}_ack", tenant_id=tenant_id)
+            add_many_to_queue(outbound)
         except Exception as e:
             logger.error(f"Failed to send acknowledgement: {e}")
         
@@ -826,7 +862,6 @@ def sms_handler():
         if sheet_id:
             try:
                 from execution.utils.sheets_engine import append_lead_to_sheet
-                import threading
                 
                 status = "Emergency" if is_urgent else "Inquiry"
                 
@@ -844,40 +879,36 @@ def sms_handler():
                     except Exception as e:
                         logger.error(f"Sheet Log Error: {e}")
                 
-                thread = threading.Thread(target=log_to_sheet_async)
-                thread.daemon = True
-                thread.start()
+                _BACKGROUND.submit(log_to_sheet_async)
             except Exception as e:
                 logger.error(f"Failed to start sheet logging thread: {e}")
 
-        return str(MessagingResponse()), 200
+        return _EMPTY_MSG_TWIML, 200
         
     except Exception as e:
         # CATCH-ALL: Never let exceptions escape
         logger.critical(f"CRITICAL: SMS handler crashed: {e}", exc_info=True)
         send_critical_alert("SMS Handler Crash", 
             f"Webhook crashed: {e}\n"
-            f"From: {request.values.get('From')}\n"
-            f"To: {request.values.get('To')}\n"
-            f"SID: {request.values.get('MessageSid')}\n"
-            f"Body: {request.values.get('Body', '')[:100]}")
+            f"From: {v.get('From')}\n"
+            f"To: {v.get('To')}\n"
+            f"SID: {v.get('MessageSid')}\n"
+            f"Body: {v.get('Body', '')[:100]}")
         
         # Queue webhook for retry processing
         try:
-            from execution.utils.resilience import queue_webhook_for_retry
             queue_webhook_for_retry(
-                request.values.get('MessageSid'),
-                request.values.get('From'),
-                request.values.get('To'),
-                request.values.get('Body', ''),
+                v.get('MessageSid'),
+                v.get('From'),
+                v.get('To'),
+                v.get('Body', ''),
                 'sms'
             )
         except Exception as e2:
             logger.error(f"Failed to queue webhook for retry: {e2}")
         
         # Always return 200 to prevent retry storms
-        from twilio.twiml.messaging_response import MessagingResponse
-        return str(MessagingResponse()), 200
+        return _EMPTY_MSG_TWIML, 200
     
 @app.route("/sms/status", methods=['POST'])
 @require_twilio_signature
@@ -887,13 +918,12 @@ def sms_status_handler():
     Updates the message status in the database based on Twilio's status.
     Resilient version with error handling.
     """
+    v = request.values.to_dict()  # Snapshot form+args once
     try:
-        from execution.utils.security import mask_pii
-        
-        message_sid = request.values.get('MessageSid')
-        message_status = request.values.get('MessageStatus')
-        from_number = request.values.get('From')
-        to_number = request.values.get('To')
+        message_sid = v.get('MessageSid')
+        message_status = v.get('MessageStatus')
+        from_number = v.get('From')
+        to_number = v.get('To')
         
         if not message_sid:
             logger.error("⚠️ SMS Status Callback: Missing MessageSid")
@@ -904,15 +934,9 @@ def sms_status_handler():
             return "Missing MessageStatus", 400
         
         # Log the status change
-        status_display = {
-            'delivered': '✅ SMS Delivered',
-            'undelivered': '❌ SMS Undelivered (Blocked)',
-            'failed': '❌ SMS Failed',
-            'sent': '📤 SMS Sent',
-            'queued': '⏳ SMS Queued'
-        }.get(message_status.lower(), f'📊 SMS Status: {message_status}')
-        
-        logger.info(f"{status_display} | MessageSid: {message_sid} | From: {mask_pii(from_number)} | To: {mask_pii(to_number)}")
+        if logger.isEnabledFor(logging.INFO):
+            status_display = _STATUS_DISPLAY.get(message_status.lower(), f'📊 SMS Status: {message_status}')
+            logger.info("%s | MessageSid: %s | From: %s | To: %s", status_display, message_sid, mask_pii(from_number), mask_pii(to_number))
         
         # Update the message status in the database (with error handling)
         try:
@@ -947,22 +971,20 @@ def voicemail_handler():
         - Returns 200 OK even on errors to prevent Twilio retries
         - Logs all errors for debugging
     """
+    v = request.values.to_dict()  # Snapshot form+args once
     try:
-        from execution.utils.database import log_conversation_event, update_lead_status, create_or_update_lead
-        from execution.utils.sms_engine import add_to_queue
-        from execution.utils.resilience import get_tenant_safe
         from execution.utils.transcription import transcribe_recording_async
         
-        caller_number = request.values.get('From')
-        to_number = request.values.get('To')
-        recording_url = request.values.get('RecordingUrl')
-        call_sid = request.values.get('CallSid')
+        caller_number = v.get('From')
+        to_number = v.get('To')
+        recording_url = v.get('RecordingUrl')
+        call_sid = v.get('CallSid')
         
         # Resolve tenant with error handling
         tenant, _ = get_tenant_safe(to_number)
         if not tenant:
             logger.error(f"Could not resolve tenant for voicemail: {to_number}")
-            return str(VoiceResponse()), 200
+            return _EMPTY_VOICE_TWIML, 200
              
         tenant_id = tenant['id']
         plumber_phone = tenant.get('plumber_phone_number')
@@ -1001,16 +1023,16 @@ def voicemail_handler():
             except Exception as e:
                 logger.error(f"Failed to queue plumber alert: {e}")
             
-        return str(VoiceResponse()), 200
+        return _EMPTY_VOICE_TWIML, 200
         
     except Exception as e:
         # CATCH-ALL: Never let exceptions escape
         logger.critical(f"CRITICAL: Voicemail handler crashed: {e}", exc_info=True)
         send_critical_alert("Voicemail Handler Crash", 
             f"Webhook crashed: {e}\n"
-            f"From: {request.values.get('From')}\n"
-            f"RecordingUrl: {request.values.get('RecordingUrl')}")
-        return str(VoiceResponse()), 200
+            f"From: {v.get('From')}\n"
+            f"RecordingUrl: {v.get('RecordingUrl')}")
+        return _EMPTY_VOICE_TWIML, 200
 
 @app.route("/unsubscribe", methods=['GET'])
 @require_rate_limit  # Rate limit public unsubscribe endpoint to prevent abuse
@@ -1040,44 +1062,30 @@ def voice_status_handler():
     If call was 'completed' (answered), do nothing.
     If 'busy', 'no-answer', 'failed', 'canceled', Trigger AI Fallback.
     """
+    v = request.values.to_dict()  # Snapshot form+args once
     try:
-        from execution.utils.sms_engine import add_to_queue
-        from execution.utils.database import record_webhook_processed, create_or_update_lead, record_consent, get_db_connection
-        from execution.utils.resilience import check_webhook_processed_safe, get_tenant_safe, queue_webhook_for_retry
-        import uuid
-        
-        call_status = request.values.get('DialCallStatus')
-        answered_by = request.values.get('AnsweredBy', 'unknown')
-        to_number = request.values.get('To')
-        caller_number = request.values.get('From')
-        call_sid = request.values.get('CallSid')
+        call_status = v.get('DialCallStatus')
+        answered_by = v.get('AnsweredBy', 'unknown')
+        to_number = v.get('To')
+        caller_number = v.get('From')
+        call_sid = v.get('CallSid')
         
         # IDEMPOTENCY CHECK WITH FALLBACK
         if call_sid:
             status_webhook_id = f"{call_sid}_status_{call_status}"
             is_duplicate, internal_id, used_fallback = check_webhook_processed_safe(status_webhook_id)
             if is_duplicate:
-                logger.info(f"♻️  Duplicate webhook ignored: {status_webhook_id}")
-                return str(VoiceResponse()), 200
+                logger.info("♻️  Duplicate webhook ignored: %s", status_webhook_id)
+                return _EMPTY_VOICE_TWIML, 200
         
         # RESOLVE TENANT WITH FALLBACK
+        # Common case: 'To' is our Twilio number (served from the tenant cache)
         tenant, _ = get_tenant_safe(to_number)
         
-        # Try 'From' Number if 'To' didn't work
-        if not tenant:
-            tenant, _ = get_tenant_safe(caller_number)
-        
-        # Try Plumber Phone lookup (fallback)
+        # Otherwise match To/From against Twilio OR plumber numbers in a single query
         if not tenant:
             try:
-                conn = get_db_connection()
-                if conn:
-                    row = conn.execute("SELECT * FROM tenants WHERE plumber_phone_number = ?", (to_number,)).fetchone()
-                    if not row:
-                        row = conn.execute("SELECT * FROM tenants WHERE plumber_phone_number = ?", (caller_number,)).fetchone()
-                    if row:
-                        tenant = dict(row)
-                    conn.close()
+                tenant = get_tenant_by_any_number(to_number, caller_number)
             except Exception as e:
                 logger.error(f"DB Error resolving tenant in callback: {e}")
 
@@ -1087,12 +1095,12 @@ def voice_status_handler():
                 "Tenant Resolution Failed (Voice Status)",
                 f"Voice status callback could not resolve tenant. To: {to_number}, From: {caller_number}, CallSid: {call_sid}"
             )
-            return str(VoiceResponse()), 200  # Return OK to prevent retries
+            return _EMPTY_VOICE_TWIML, 200  # Return OK to prevent retries
             
         tenant_id = tenant['id']
         plumber_name = tenant['name']
         
-        logger.info(f"📞 DIAL STATUS: {call_status} for {plumber_name} (Tenant: {tenant_id})")
+        logger.info("📞 DIAL STATUS: %s for %s (Tenant: %s)", call_status, plumber_name, tenant_id)
         
         if call_status == 'completed' or answered_by == 'human':
             logger.info(f"✅ Call Answered by {answered_by}. No AI needed.")
@@ -1102,8 +1110,10 @@ def voice_status_handler():
                     record_webhook_processed(status_webhook_id, 'voice_status', tenant_id=tenant_id, internal_id=f"completed_{call_sid}")
             except Exception as e:
                 logger.warning(f"Failed to record completed webhook: {e}")
-            return str(VoiceResponse()), 200
+            return _EMPTY_VOICE_TWIML, 200
             
+        resp = VoiceResponse()
+        
         # BUG #4: VOICEMAIL DETECTION (Machine Handling)
         if answered_by in ['machine_start', 'machine_end_beep', 'machine_end_silence', 'fax']:
             logger.warning(f"🤖 VOICEMAIL detected ({answered_by}). Skipping AI speech.")
@@ -1115,26 +1125,30 @@ def voice_status_handler():
         
         resp.hangup()
         
+        # CNAM from the background lookup started in /voice (usually landed by now)
+        lookup = line_lookups.peek(caller_number) or {}
+        
         # Create Lead if not exists (with error handling)
         lead_id = None
         try:
-            lead_id, _ = create_or_update_lead(caller_number, tenant_id=tenant_id, source="voice_missed", bypass_check=True)
-            record_consent(caller_number, 'implied', 'inbound_call', tenant_id=tenant_id, metadata={'CallSid': call_sid})
+            lead_id, _, _ = upsert_lead_with_consent(caller_number, tenant_id=tenant_id, source="voice_missed",
+                                                     consent_type='implied', consent_source='inbound_call',
+                                                     metadata={'CallSid': call_sid}, name=lookup.get('caller_name'))
         except Exception as e:
             logger.error(f"Failed to create lead/consent: {e}. Continuing with SMS.")
         
         # Missed Call SMS (Phase 1 Rotation)
         try:
             business_name = tenant.get('name', 'PlumberAI')
-            template = random.choice(MISSED_CALL_TEMPLATES)
-            sms_body = template.format(business_name=business_name)
-            add_to_queue(caller_number, sms_body, external_id=f"{call_sid}_missed", tenant_id=tenant_id)
+            sms_body = random.choice(_missed_call_bodies(business_name))
+            outbound = [(caller_number, sms_body, f"{call_sid}_missed", tenant_id)]
             
             # Notify the Plumber (Phase 1 Alert - Click-to-Call)
             tenant_plumber_phone = tenant.get('plumber_phone_number')
             if tenant_plumber_phone:
                 alert_msg = f"🔔 ({plumber_name}) Missed Call: I've texted the customer to start the intake.\n\nReturn Call:\n{caller_number}"
-                add_to_queue(tenant_plumber_phone, alert_msg, external_id=f"{call_sid}_alert", tenant_id=tenant_id)
+                outbound.append((tenant_plumber_phone, alert_msg, f"{call_sid}_alert", tenant_id))
+            add_many_to_queue(outbound)
         except Exception as e:
             logger.error(f"Failed to queue SMS: {e}")
         
@@ -1144,9 +1158,9 @@ def voice_status_handler():
         logger.critical(f"CRITICAL: Voice status handler crashed: {e}", exc_info=True)
         send_critical_alert("Voice Status Handler Crash", 
             f"Webhook crashed: {e}\n"
-            f"CallSid: {request.values.get('CallSid')}\n"
-            f"Status: {request.values.get('DialCallStatus')}")
-        return str(VoiceResponse()), 200
+            f"CallSid: {v.get('CallSid')}\n"
+            f"Status: {v.get('DialCallStatus')}")
+        return _EMPTY_VOICE_TWIML, 200
 
 if __name__ == "__main__":
     logger.info(f"🔧 Plumber Agent Listening on Port 5002")
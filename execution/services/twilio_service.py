@@ -1,14 +1,44 @@
 
 import os
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from execution import config
 from execution.utils.logger import setup_logger
 
 logger = setup_logger("TwilioService")
 
+# Per-request timeout (seconds) so one slow API call can't stall a send thread
+TWILIO_TIMEOUT = 15
+# Keep-alive pool sized for the SMS engine's send threads plus webhook lookups
+TWILIO_POOL_CONNECTIONS = 16
+TWILIO_POOL_MAXSIZE = 64
+
+_http_client = None
+
+def get_http_client():
+    """
+    Process-wide TwilioHttpClient: every Client shares one pooled requests.Session,
+    so calls reuse keep-alive TLS connections to api.twilio.com.
+    Retry only covers connection failures and idempotent reads (urllib3 default
+    allowed_methods), never a POST that may already have sent an SMS.
+    """
+    global _http_client
+    if _http_client is None:
+        http_client = TwilioHttpClient(pool_connections=True, timeout=TWILIO_TIMEOUT)
+        adapter = HTTPAdapter(
+            pool_connections=TWILIO_POOL_CONNECTIONS,
+            pool_maxsize=TWILIO_POOL_MAXSIZE,
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        )
+        http_client.session.mount('https://', adapter)
+        _http_client = http_client
+    return _http_client
+
 class TwilioWrapper:
     def __init__(self, sid, token):
-        self.client = Client(sid, token) if sid and token else None
+        self.client = Client(sid, token, http_client=get_http_client()) if sid and token else None
         
     def lookup_number(self, phone_number):
         """
@@ -35,9 +65,10 @@ class TwilioWrapper:
             logger.warning(f"Twilio Lookup Failed for {phone_number}: {e}")
             return {'line_type': 'mobile', 'caller_name': None}
 
-    def send_sms(self, to, body, from_=None):
+    def send_sms(self, to, body, from_=None, tenant_id=None, external_id=None):
+        """Returns the MessageSid. tenant_id / external_id are only used for log context."""
         if not self.client:
-            logger.warning(f"[MOCK] Would send SMS to {to}: {body}")
+            logger.warning(f"[MOCK] Would send SMS to {to} (Tenant: {tenant_id}, Ref: {external_id}): {body}")
             return "mock_sid"
         
         from_number = from_ or config.TWILIO_PHONE_NUMBER
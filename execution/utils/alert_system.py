@@ -1,12 +1,107 @@
 import os
+import json
+import http.client
 import smtplib
 import ssl
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from execution.utils.logger import setup_logger
 
+# Optional fast JSON encoder (returns bytes directly); stdlib fallback keeps the payload compact
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson:
+    _dumps = orjson.dumps
+else:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
 logger = setup_logger("AlertSystem")
 
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465
+
+# Built once: loading the CA bundle is the expensive part of create_default_context()
+_SSL_CTX = ssl.create_default_context()
+# One logged-in SMTP session per thread, reused across alerts (saves a TLS handshake per send)
+_smtp_local = threading.local()
+
+def _close_smtp():
+    server = getattr(_smtp_local, "server", None)
+    _smtp_local.server = None
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+def _get_smtp(sender_email, sender_password):
+    """
+    Returns this thread's cached SMTP_SSL session, reconnecting if the server
+    dropped it (Gmail closes idle sessions after a few minutes).
+    """
+    server = getattr(_smtp_local, "server", None)
+    if server is not None and getattr(_smtp_local, "user", None) == sender_email:
+        try:
+            if server.noop()[0] == 250:
+                return server
+        except (smtplib.SMTPException, OSError):
+            pass
+    _close_smtp()
+
+    server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=_SSL_CTX, timeout=10)
+    server.login(sender_email, sender_password)
+    _smtp_local.server = server
+    _smtp_local.user = sender_email
+    return server
+
+def smtp_send(sender_email, sender_password, to_email, message):
+    """
+    Sends a formatted message over this thread's pooled SMTP session (shared by
+    alerts and email reports). Raises on failure, after dropping the session.
+    """
+    try:
+        try:
+            _get_smtp(sender_email, sender_password).sendmail(sender_email, to_email, message)
+        except smtplib.SMTPServerDisconnected:
+            # Dropped between the NOOP and the send - retry once on a fresh session
+            _close_smtp()
+            _get_smtp(sender_email, sender_password).sendmail(sender_email, to_email, message)
+    except Exception:
+        _close_smtp()
+        raise
+
+TELEGRAM_HOST = "api.telegram.org"
+
+# Kept-alive HTTPS connection to Telegram; http.client connections aren't thread-safe, hence the lock
+_tg_conn = None
+_tg_lock = threading.Lock()
+
+def _telegram_post(path, data):
+    """POSTs JSON over the shared Telegram connection. Returns (status, body). Caller holds _tg_lock."""
+    global _tg_conn
+    for attempt in range(2):
+        if _tg_conn is None:
+            _tg_conn = http.client.HTTPSConnection(TELEGRAM_HOST, timeout=5, context=_SSL_CTX)
+        try:
+            _tg_conn.request("POST", path, body=data, headers={'Content-Type': 'application/json'})
+            response = _tg_conn.getresponse()
+            return response.status, response.read()
+        except (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionError):
+            # Telegram closed the idle keep-alive socket - reconnect once
+            _tg_conn.close()
+            _tg_conn = None
+            if attempt:
+                raise
+        except Exception:
+            _tg_conn.close()
+            _tg_conn = None
+            raise
+
 def send_critical_alert(error_title, error_details):
     """
     Sends an email alert to the admin when a CRITICAL failure occurs.
@@ -40,10 +135,7 @@ def send_critical_alert(error_title, error_details):
     msg.attach(MIMEText(body, "plain"))
     
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, admin_email, msg.as_string())
+        smtp_send(sender_email, sender_password, admin_email, msg.as_string())
         logger.info(f"🚨 Admin Alert Sent: {error_title}")
     except Exception as e:
         logger.error(f"Failed to send admin alert email: {e}")
@@ -55,30 +147,30 @@ def send_critical_alert(error_title, error_details):
 def send_telegram_alert(message):
     """
     Sends a message to the configured Telegram Chat.
-    Uses urllib to avoid adding 'requests' dependency if not present.
+    Uses http.client (stdlib) over a kept-alive connection to avoid adding a 'requests' dependency.
     """
     try:
         from execution.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
-        import urllib.request
-        import json
         
         if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
             return False
             
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+        path = f"/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
             "chat_id": TELEGRAM_CHAT_ID,
             "text": message,
             "parse_mode": "Markdown"
         }
         
-        data = json.dumps(payload).encode('utf-8')
-        req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+        data = _dumps(payload)
+        with _tg_lock:
+            status, _ = _telegram_post(path, data)
         
-        with urllib.request.urlopen(req, timeout=5) as response:
-             if response.getcode() == 200:
-                 logger.info("✅ Telegram Alert Sent")
-                 return True
+        if status == 200:
+            logger.info("✅ Telegram Alert Sent")
+            return True
+        logger.error(f"Telegram API returned HTTP {status}")
+        return False
     except Exception as e:
         logger.error(f"Failed to send Telegram alert: {e}")
         return False
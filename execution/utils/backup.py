@@ -1,46 +1,315 @@
 
 import os
+import errno
+import heapq
 import shutil
+import sqlite3
 import time
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from execution.utils.logger import setup_logger
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Optional: compress backups with zstd (.db.zst). Without it backups stay plain .db
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# Optional: io_uring copies (Linux >= 5.15 + liburing). Used when the kernel-side
+# copy paths are unavailable, ahead of the plain pread/write loop
+try:
+    import pyuring as iou
+except (ImportError, OSError):
+    iou = None
+
 logger = setup_logger("BackupService")
 
-def run_backup():
+# Paths are fixed for the process - resolve them once at import
+_BASE = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_DATA_DIR = os.path.join(_BASE, 'data')
+_DB_FILE = os.path.join(_DATA_DIR, 'plumber.db')
+_BACKUP_DIR = os.path.join(_DATA_DIR, 'backups')
+os.makedirs(_BACKUP_DIR, exist_ok=True)
+_PREFIX = "plumber_backup"
+
+ZSTD_LEVEL = 3
+STREAM_CHUNK = 4 << 20  # 4 MiB buffers: fewer syscalls per byte on userspace copy paths
+
+def _fadvise(fd, advice):
+    """posix_fadvise hint (Linux). No-op where unsupported - it's only a hint."""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, f"POSIX_FADV_{advice}"))
+        except OSError:
+            pass
+
+def _compress_file(src_path, dst_path):
+    """Streams src through zstd into dst (all cores via zstd's worker threads)."""
+    cctx = zstd.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+    with open(src_path, 'rb', buffering=0) as fin, open(dst_path, 'wb', buffering=0) as fout:
+        _fadvise(fin.fileno(), "SEQUENTIAL")  # Larger readahead window
+        cctx.copy_stream(fin, fout, read_size=STREAM_CHUNK, write_size=STREAM_CHUNK)
+        # Backups are write-once: flush them out and drop their pages so the nightly
+        # run doesn't evict the live DB's working set from the page cache
+        os.fdatasync(fout.fileno())
+        _fadvise(fout.fileno(), "DONTNEED")
+
+# Pages copied per backup step. Steps release the read lock in between, so a
+# long backup never starves the webhook writers (-1 = whole DB in one step).
+BACKUP_PAGES_PER_STEP = 1024
+
+def _snapshot_db(db_path, dst_path):
+    """
+    Consistent copy of a live SQLite DB. Unlike a raw file copy this sees committed
+    WAL content and can't tear pages.
+
+    VACUUM INTO (SQLite >= 3.27) writes a compacted copy - no free pages or
+    fragmentation - in one statement. Older SQLite uses the Online Backup API.
+    """
+    src = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        if sqlite3.sqlite_version_info >= (3, 27, 0):
+            src.execute("VACUUM INTO ?", (dst_path,))
+            return
+        dst = sqlite3.connect(dst_path)
+        try:
+            with dst:
+                src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=0)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+# Rotation index: one "<backup name>\t<source signature>" line per backup, oldest first.
+# Lets rotation append/trim instead of listing + sorting the directory every run,
+# and remembers what DB state each backup captured (see _source_signature).
+INDEX_NAME = ".index"
+KEEP_BACKUPS = 7
+
+def _backup_key(name):
+    """
+    Sort key for backup names. Current names carry a 20-digit epoch-ns stamp;
+    legacy %Y%m%d_%H%M%S names always predate them, so they sort first.
+    """
+    stamp = name[len(_PREFIX) + 1:].split(".", 1)[0]
+    return (0 if "_" in stamp else 1, stamp)
+
+def _read_index(backup_dir):
+    """[name, signature] entries from the index; rebuilt once from a directory listing if missing."""
+    index_path = os.path.join(backup_dir, INDEX_NAME)
+    try:
+        with open(index_path) as f:
+            return [(line.rstrip("\n").split("\t") + [""])[:2] for line in f if line.strip()]
+    except FileNotFoundError:
+        logger.info("🗂️ Backup index missing - rebuilding from directory listing")
+        # scandir: DirEntry carries d_type, so is_file() needs no extra stat per entry
+        with os.scandir(backup_dir) as it:
+            names = [e.name for e in it if e.name.startswith(_PREFIX) and e.is_file()]
+        # Only the newest KEEP_BACKUPS need ordering; the rest are rotated out unsorted
+        keep = heapq.nlargest(KEEP_BACKUPS, names, key=_backup_key)
+        kept = set(keep)
+        return [[name, ""] for name in names if name not in kept] + [[name, ""] for name in reversed(keep)]
+
+def _write_index(backup_dir, entries):
+    """Atomically replaces the index (temp file + os.replace)."""
+    index_path = os.path.join(backup_dir, INDEX_NAME)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(f"{name}\t{sig}\n" for name, sig in entries)
+    os.replace(tmp_path, index_path)
+
+def _remove_backups(backup_dir, victims):
+    """Unlinks rotated backups in one tight loop and logs once (catch-up runs can rotate many)."""
+    for old_f in victims:
+        try:
+            os.remove(os.path.join(backup_dir, old_f))
+        except FileNotFoundError:
+            pass  # Already gone (manual cleanup)
+        except OSError as e:
+            logger.warning("⚠️ Could not remove old backup %s: %s", old_f, e)
+    if victims:
+        logger.info("🗑️ Rotated %d old backup(s): %s … %s", len(victims), victims[0], victims[-1])
+
+# Last KEEP_BACKUPS [name, signature] entries, oldest first. Loaded from the index on
+# the first run, then kept in memory: each run is one append + at most one unlink.
+_history = None
+
+def _get_history(backup_dir):
+    global _history
+    if _history is None:
+        entries = _read_index(backup_dir)
+        # Index longer than the retention (e.g. KEEP_BACKUPS lowered): trim it now
+        _remove_backups(backup_dir, [name for name, _ in entries[:-KEEP_BACKUPS]])
+        _history = deque(entries, maxlen=KEEP_BACKUPS)
+    return _history
+
+def _fsync_path(path, flags=os.O_RDONLY):
+    """fsync a file or (with O_DIRECTORY) a directory entry table."""
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _source_signature(db_path):
+    """
+    mtime_ns/size of the DB and its WAL. In WAL mode commits land in -wal and only
+    reach the main file on checkpoint, so both must match for "unchanged".
+    """
+    parts = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+        except FileNotFoundError:
+            parts.append("-")
+    return ",".join(parts)
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int): Linux reflink ioctl (Btrfs, XFS, bcachefs)
+
+def _reflink(src_fd, dst_fd):
+    """Copy-on-write clone: shares data extents, so it's O(1) and takes no space until the source diverges."""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False  # Not a CoW filesystem, cross-device, etc.
+
+def _copy_file(src_path, dst_path):
+    """
+    File copy, cheapest method first: reflink (FICLONE), copy_file_range, sendfile,
+    an io_uring pipeline (if pyuring is installed), then a 4 MiB pread/write loop.
+    Metadata is copied like shutil.copy2.
+    """
+    src_fd = os.open(src_path, os.O_RDONLY)
+    try:
+        _fadvise(src_fd, "SEQUENTIAL")
+        dst_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            remaining = 0 if _reflink(src_fd, dst_fd) else os.fstat(src_fd).st_size
+            offset = 0
+            mode = "copy_file_range" if hasattr(os, "copy_file_range") else "sendfile"
+            while remaining > 0:
+                try:
+                    if mode == "copy_file_range":
+                        copied = os.copy_file_range(src_fd, dst_fd, remaining)
+                    elif mode == "sendfile":
+                        copied = os.sendfile(dst_fd, src_fd, offset, remaining)
+                    elif mode == "io_uring":
+                        # Whole file, several 1 MiB READ/WRITE SQEs in flight: the read of
+                        # chunk i+1 overlaps the write of chunk i
+                        iou.copy(src_path, dst_path, mode="fast")
+                        break
+                    else:
+                        chunk = os.pread(src_fd, min(STREAM_CHUNK, remaining), offset)
+                        copied = os.pwrite(dst_fd, chunk, offset) if chunk else 0
+                except OSError as e:
+                    if mode == "io_uring":
+                        # UringError (e.g. io_uring disabled by seccomp): iou.copy rewrites
+                        # dst from the start, so restart the userspace copy from 0 too
+                        logger.warning(f"⚠️ io_uring copy failed ({e}). Falling back to read/write.")
+                        mode, offset, remaining = "read_write", 0, os.fstat(src_fd).st_size
+                        continue
+                    # Cross-device / unsupported FS: drop to the next method from the current offset
+                    if mode == "read_write" or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                        raise
+                    if mode == "copy_file_range":
+                        mode = "sendfile"
+                    else:
+                        mode = "io_uring" if iou else "read_write"
+                    continue
+                if copied == 0:
+                    break  # Source shrank under us
+                offset += copied
+                remaining -= copied
+            os.fdatasync(dst_fd)
+            _fadvise(dst_fd, "DONTNEED")
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src_path, dst_path)
+
+# One worker: backups run off the caller's thread but never overlap each other
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+
+def run_backup(block=False):
+    """
+    Queues a backup on the background worker and returns its Future.
+    block=True waits for it to finish (CLI / cron usage).
+    """
+    fut = _EXECUTOR.submit(_do_backup)
+    if block:
+        fut.result()
+    return fut
+
+def _do_backup():
     """
     Copies the production database to a backup folder.
     Rotates old backups (keeps last 7).
     """
-    # 1. Paths
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    data_dir = os.path.join(base_dir, 'data')
-    db_file = os.path.join(data_dir, 'plumber.db')
-    backup_dir = os.path.join(data_dir, 'backups')
+    # 1. Paths (resolved at import)
+    db_file = _DB_FILE
+    backup_dir = _BACKUP_DIR
     
-    if not os.path.exists(db_file):
-        logger.error(f"Cannot backup: {db_file} not found.")
-        return
-        
-    os.makedirs(backup_dir, exist_ok=True)
-    
-    # 2. Daily Backup Name
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(backup_dir, f"plumber_backup_{timestamp}.db")
+    # 2. Backup Name: zero-padded epoch ns - sorts lexically, unique per run, no DST repeats
+    timestamp = f"{time.time_ns():020d}"
+    backup_stem = os.path.join(backup_dir, f"{_PREFIX}_{timestamp}")
     
     try:
-        shutil.copy2(db_file, backup_path)
+        backups = _get_history(backup_dir)
+        src_sig = _source_signature(db_file)
+        
+        prev_name, prev_sig = backups[-1] if backups else (None, "")
+        prev_path = os.path.join(backup_dir, prev_name) if prev_name else None
+        if prev_path and prev_sig == src_sig and os.path.exists(prev_path):
+            # DB untouched since the last backup: hardlink it (metadata only, no data written).
+            # Rotation's os.remove drops one link; data goes when the last link does.
+            backup_path = backup_stem + prev_name[prev_name.index("."):]
+            os.link(prev_path, backup_path)
+            logger.info(f"🔗 Database unchanged - linked {prev_name}")
+        else:
+            backup_path = backup_stem + ".db"
+            try:
+                _snapshot_db(db_file, backup_path)
+            except sqlite3.Error as e:
+                # e.g. DB file damaged - a raw copy is still better than no backup
+                logger.warning(f"⚠️ Online backup failed ({e}). Falling back to raw file copy.")
+                _copy_file(db_file, backup_path)
+            
+            if zstd:
+                # SQLite pages (zero fill, repeated schema/text) typically shrink 3-6x
+                compressed_path = backup_path + ".zst"
+                _compress_file(backup_path, compressed_path)
+                os.remove(backup_path)
+                backup_path = compressed_path
+        # Durable before rotation deletes anything: file data, then its directory entry
+        _fsync_path(backup_path)
+        _fsync_path(backup_dir, os.O_RDONLY | os.O_DIRECTORY)
         logger.info(f"✅ Database Backup Created: {backup_path}")
         
-        # 3. Rotate (Keep last 7)
-        backups = sorted([f for f in os.listdir(backup_dir) if f.startswith("plumber_backup")], reverse=True)
-        if len(backups) > 7:
-            for old_f in backups[7:]:
-                os.remove(os.path.join(backup_dir, old_f))
-                logger.info(f"🗑️ Rotated old backup: {old_f}")
+        # 3. Rotate (Keep last 7) - bounded deque, persisted to the index after each append
+        backup_name = os.path.basename(backup_path)
+        if backup_name not in (name for name, _ in backups):
+            evict = backups[0][0] if len(backups) == KEEP_BACKUPS else None
+            backups.append([backup_name, src_sig])  # maxlen drops the oldest entry
+            if evict:
+                _remove_backups(backup_dir, [evict])
+        _write_index(backup_dir, backups)
                 
+    except FileNotFoundError:
+        # No pre-check: a missing DB surfaces here (sqlite reports it as an
+        # OperationalError, then the raw-copy fallback raises this)
+        logger.error(f"Cannot backup: {db_file} not found.")
     except Exception as e:
         logger.error(f"Backup Failed: {e}")
 
 if __name__ == "__main__":
-    run_backup()
+    run_backup(block=True)
@@ -0,0 +1,39 @@
+"""
+Shared keyword lists for inbound message handling.
+
+Used by handle_incoming_call.py (STOP/HELP/auto-reply detection, fallback
+urgency check) and classification.py (weighted emergency scoring).
+"""
+
+# --- COMPLIANCE: OPT-OUT ---
+# CTIA standard opt-out words + CASL (French) variants.
+STOP_KEYWORDS = (
+    'stop', 'stopall', 'unsubscribe', 'cancel', 'end', 'quit',
+    'opt out', 'opt-out', 'optout', 'arret', 'arrêt',
+)
+
+# Whole-message keywords: exact-match membership, so frozensets (O(1) lookup)
+HELP_KEYWORDS = frozenset({'help', 'info', 'aide'})
+UNSTOP_KEYWORDS = frozenset({'start', 'unstop'})
+
+# --- PILOT SHIELDING: AUTO-REPLY DETECTION ---
+# Substring matches (bot-on-bot loop prevention).
+AUTO_REPLY_KEYWORDS = (
+    'driving', 'away from my phone', 'auto-reply', 'out of office',
+    'unavailable', 'vacation',
+)
+
+# --- CLASSIFICATION: EMERGENCY SIGNALS ---
+# Multi-word phrases are matched with word boundaries on each side.
+EMERGENCY_KEYWORDS = (
+    'emergency', 'urgent', 'burst', 'explode', 'flood', 'flooding',
+    'overflow', 'overflowing', 'toilet overflow', 'sewage', 'gas smell',
+    'water everywhere', 'no water', 'no hot water', 'leak', 'leaking',
+    'broken pipe', 'frozen pipe', 'basement', 'ceiling',
+)
+
+# --- CLASSIFICATION: NEGATIVE SENTIMENT ---
+NEGATIVE_KEYWORDS = (
+    'bad', 'poor', 'terrible', 'horrible', 'worst', 'angry', 'upset',
+    'disappointed', 'unhappy', 'rude', 'late', 'never showed',
+)
@@ -3,12 +3,26 @@ import json
 import os
 import time
 import uuid
+import atexit
+import threading
+import weakref
+import random
+import functools
 from datetime import datetime
 import contextlib
 from execution.utils.logger import setup_logger
+from execution.utils.webhook_cache import seen_webhooks, shared_seen_get, shared_seen_add
 
 logger = setup_logger("Database")
 
+# Optional fast JSON decoder for stored metadata blobs; stdlib fallback otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson else json.loads
+
 # Define DB Path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Default Path (fallback)
@@ -30,6 +44,9 @@ class PostgresCursorWrapper:
         # Convert SQLite ? placeholders to Postgres %s
         pg_query = query.replace('?', '%s')
         return self.cursor.execute(pg_query, params)
+    
+    def executemany(self, query, seq_of_params):
+        return self.cursor.executemany(query.replace('?', '%s'), seq_of_params)
             
     def __getattr__(self, name):
         return getattr(self.cursor, name)
@@ -47,6 +64,11 @@ class PostgresConnectionWrapper:
         cursor = self.cursor()
         cursor.execute(query, params)
         return cursor
+    
+    def executemany(self, query, seq_of_params):
+        cursor = self.cursor()
+        cursor.executemany(query, seq_of_params)
+        return cursor
         
     def cursor(self):
         return PostgresCursorWrapper(self.conn.cursor())
@@ -62,43 +84,122 @@ class PostgresConnectionWrapper:
 
 # --------------------------------
 
+# --- PER-THREAD SQLITE CONNECTION CACHE ---
+# Each worker thread keeps one open connection (connect + PRAGMAs run once) and
+# get_db_connection() lends it out again on every call. Call sites keep their
+# `conn.close()`: on a lent connection it just hands the connection back.
+_tls = threading.local()
+_cached_conns = weakref.WeakSet()  # For the atexit close; dead threads drop theirs via GC
+
+# Long-lived connections re-run PRAGMA optimize every N uses so planner stats
+# (sqlite_stat1) follow the tables as they grow
+OPTIMIZE_EVERY = 1000
+
+# Prepared statements kept per connection (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+class _CachedConnection(sqlite3.Connection):
+    """Long-lived cached connection: per-thread read lease, or the process-wide writer (subclassed so it can be weak-referenced)."""
+    in_use = False
+    read_only = False
+    _uses = 0
+
+    def maybe_optimize(self):
+        self._uses += 1
+        if self._uses % OPTIMIZE_EVERY == 0 and not self.read_only:
+            try:
+                self.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ PRAGMA optimize failed: {e}")
 
-def get_db_connection():
+    def release(self):
+        # Same visible effect as a real close: uncommitted work is discarded
+        try:
+            if self.in_transaction:
+                self.rollback()
+            self.maybe_optimize()
+        except sqlite3.ProgrammingError:
+            pass  # Already closed by the atexit hook
+        self.in_use = False
+
+class _ConnectionLease:
     """
-    Gets database connection with retry logic.
-    Supports both SQLite (local) and Postgres (production).
+    One checkout of a thread's cached connection; behaves like the connection.
+    close() - or the lease being garbage-collected when a caller raised before
+    closing - rolls back anything uncommitted and returns the connection.
     """
-    # 1. TRY POSTGRES (Production)
-    db_url = os.getenv('DATABASE_URL')
-    if db_url and 'postgresql' in db_url:
-        if not psycopg2:
-             logger.warning("DATABASE_URL set but psycopg2 not installed. Falling back to SQLite.")
-        else:
-            try:
-                return PostgresConnectionWrapper(db_url)
-            except Exception as e:
-                logger.error(f"❌ Failed to connect to Postgres: {e}. Falling back to SQLite.")
+    __slots__ = ("_conn",)
 
-    # 2. FALLBACK TO SQLITE (Local/Dev)
-    db_path = os.getenv('PLUMBER_DB_PATH', DEFAULT_DB_PATH)
-    directory = os.path.dirname(db_path)
-    if directory and db_path != ":memory:":
-        os.makedirs(directory, exist_ok=True)
-    
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.release()
+
+    __del__ = close
+
+def _close_cached_connections():
+    for conn in list(_cached_conns):
+        try:
+            if not conn.read_only:
+                conn.execute("PRAGMA optimize")  # Recommended once before closing a long-lived connection
+            conn.close()
+        except Exception:
+            pass
+
+atexit.register(_close_cached_connections)
+
+def _open_sqlite(db_path, factory=sqlite3.Connection, read_only=False):
+    """Opens a SQLite connection with retry on lock and the standard PRAGMAs."""
     attempts = 0
     max_attempts = 3
     base_delay = 0.1
     
     while attempts < max_attempts:
         try:
-            conn = sqlite3.connect(db_path, timeout=30.0)
+            # check_same_thread=False for cached connections: read leases are per-thread (the atexit
+            # hook closes them from the main thread), but the write_conn() writer is ONE connection
+            # shared by every thread in the process - safe only because _writer_lock serializes it
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro" if read_only else db_path,
+                                   timeout=30.0, factory=factory, uri=read_only,
+                                   cached_statements=STATEMENT_CACHE_SIZE,
+                                   check_same_thread=factory is sqlite3.Connection)
             conn.row_factory = sqlite3.Row
             try:
-                conn.execute("PRAGMA journal_mode=WAL")
+                if read_only:
+                    conn.execute("PRAGMA query_only=ON")
+                else:
+                    # Must precede WAL: only a brand-new (empty) file picks it up this way,
+                    # existing files are switched over once by init_db
+                    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    # Bursts of small commits can balloon the -wal file; truncate it back after checkpoints
+                    conn.execute("PRAGMA journal_size_limit=67108864")
+                    if factory is not sqlite3.Connection:
+                        # Long-lived: analyze at open what later queries will need (0x10000 = check all tables)
+                        conn.execute("PRAGMA optimize=0x10002")
                 conn.execute("PRAGMA synchronous=NORMAL")
                 conn.execute("PRAGMA busy_timeout=30000")
-            except Exception:
-                pass
+                conn.execute("PRAGMA temp_store=MEMORY")  # Sorts / temp B-trees stay in RAM
+                conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache (negative = KiB)
+                if db_path != ":memory:":
+                    conn.execute("PRAGMA mmap_size=1073741824")  # Reads served from the page cache via mmap
+            except Exception as e:
+                # Still usable, just untuned - but say so instead of silently running on defaults
+                logger.warning(f"⚠️ SQLite PRAGMA setup incomplete ({db_path}): {e}")
             return conn
         except sqlite3.OperationalError as e:
             if "database is locked" in str(e) and attempts < max_attempts - 1:
@@ -112,6 +213,144 @@ def get_db_connection():
     
     raise sqlite3.OperationalError(f"Failed to connect to database after {max_attempts} attempts: {db_path}")
 
+
+def get_db_connection():
+    """
+    Gets database connection with retry logic.
+    Supports both SQLite (local) and Postgres (production).
+    """
+    # 1. TRY POSTGRES (Production)
+    db_url = os.getenv('DATABASE_URL')
+    if db_url and 'postgresql' in db_url:
+        if not psycopg2:
+             logger.warning("DATABASE_URL set but psycopg2 not installed. Falling back to SQLite.")
+        else:
+            try:
+                return PostgresConnectionWrapper(db_url)
+            except Exception as e:
+                logger.error(f"❌ Failed to connect to Postgres: {e}. Falling back to SQLite.")
+
+    # 2. FALLBACK TO SQLITE (Local/Dev)
+    db_path = os.getenv('PLUMBER_DB_PATH', DEFAULT_DB_PATH)
+    directory = os.path.dirname(db_path)
+    if directory and db_path != ":memory:":
+        os.makedirs(directory, exist_ok=True)
+    
+    if db_path == ":memory:":
+        return _open_sqlite(db_path)  # Every :memory: connection is its own DB - never share
+    return _lend_thread_conn(db_path)
+
+def _lend_thread_conn(db_path, read_only=False):
+    """Lends this thread's cached read-write (or read-only) connection to db_path."""
+    slots = getattr(_tls, "slots", None)
+    if slots is None:
+        slots = _tls.slots = {}
+    key = (os.getpid(), db_path)
+    cached = slots.get(read_only)
+    conn = None
+    if cached is not None:
+        if cached[0] == key:
+            conn = cached[1]
+        elif cached[0][0] == os.getpid():
+            cached[1].close()  # PLUMBER_DB_PATH changed (a forked child never touches the parent's handle)
+    if conn is not None and conn.in_use:
+        # Nested use while the thread's connection is lent out: a private
+        # connection keeps the outer transaction isolated, as before
+        return _open_sqlite(db_path, read_only=read_only)
+    if conn is None:
+        conn = _open_sqlite(db_path, factory=_CachedConnection, read_only=read_only)
+        conn.read_only = read_only
+        slots[read_only] = (key, conn)
+        _cached_conns.add(conn)
+    conn.in_use = True
+    return _ConnectionLease(conn)
+
+def _sqlite_path():
+    """Path of the SQLite DB when it's the backend in use; None for Postgres / :memory:."""
+    db_url = os.getenv('DATABASE_URL')
+    if db_url and 'postgresql' in db_url and psycopg2:
+        return None
+    db_path = os.getenv('PLUMBER_DB_PATH', DEFAULT_DB_PATH)
+    return None if db_path == ":memory:" else db_path
+
+# --- READ / WRITE SPLIT ---
+# WAL allows one writer alongside any number of readers. SELECT-only helpers use
+# read_conn() (per-thread, opened read-only); hot write paths share one writer
+# connection via write_conn(), serialized in-process by _writer_lock.
+_writer_lock = threading.RLock()
+_writer = None  # (pid, db_path, connection)
+
+# Writer helpers retry this many times when SQLite still reports the DB as
+# busy/locked after busy_timeout (seen under bursty multi-process load)
+BUSY_RETRIES = 3
+
+def _retry_busy(fn):
+    """Re-runs a self-contained write helper on SQLITE_BUSY/LOCKED, with jittered exponential backoff."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                msg = str(e)
+                if attempt == BUSY_RETRIES or ("locked" not in msg and "busy" not in msg):
+                    raise
+                logger.warning(f"⏳ DB busy in {fn.__name__}, retry {attempt + 1}/{BUSY_RETRIES}")
+                time.sleep(random.uniform(0.01, 0.05) * (2 ** attempt))
+    return wrapper
+
+@contextlib.contextmanager
+def read_conn():
+    """Read-only connection for SELECT-only helpers. Never blocks the writer."""
+    db_path = _sqlite_path()
+    conn = _lend_thread_conn(db_path, read_only=True) if db_path else get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@contextlib.contextmanager
+def write_conn():
+    """
+    The process's writer connection, inside one transaction: commits on success,
+    rolls back on error. BEGIN IMMEDIATE takes the write lock up front, so
+    contention fails fast instead of dead-locking on a read->write upgrade.
+    A nested write_conn() on the same thread joins the outer transaction.
+    """
+    global _writer
+    db_path = _sqlite_path()
+    if not db_path:
+        conn = get_db_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return
+    
+    with _writer_lock:
+        key = (os.getpid(), db_path)
+        if _writer is None or _writer[:2] != key:
+            if _writer is not None and _writer[0] == os.getpid():
+                _writer[2].close()
+            _writer = (*key, _open_sqlite(db_path, factory=_CachedConnection))
+            _cached_conns.add(_writer[2])
+        conn = _writer[2]
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        conn.maybe_optimize()
+
 @contextlib.contextmanager
 def get_db_cursor(commit=False):
     """
@@ -134,364 +373,303 @@ def get_db_cursor(commit=False):
         conn.close()
 
 
+# Base schema (tables as first released + their original indexes). Idempotent;
+# init_db runs it as one script inside a single transaction (one commit on first boot).
+_SCHEMA_DDL = """
+BEGIN;
+
+-- 1. JOBS
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant_id TEXT,
+    client_id TEXT NOT NULL,
+    customer_name TEXT,
+    customer_phone TEXT,
+    job_date TEXT,
+    status TEXT DEFAULT 'scheduled',
+    notes TEXT
+);
+
+-- 1.5 TENANTS
+CREATE TABLE IF NOT EXISTS tenants (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    twilio_phone_number TEXT UNIQUE, -- The key to identify tenant
+    plumber_phone_number TEXT,
+    timezone TEXT DEFAULT 'America/Los_Angeles',
+    business_hours_start INTEGER DEFAULT 7,
+    business_hours_end INTEGER DEFAULT 19,
+    created_at TIMESTAMP,
+    emergency_mode BOOLEAN DEFAULT 0,
+    evening_hours_end INTEGER DEFAULT 19 -- Default same as business_end if not used
+);
+
+-- 2. SMS_QUEUE (Moved Up for Migration Safety)
+CREATE TABLE IF NOT EXISTS sms_queue (
+    id TEXT PRIMARY KEY,
+    tenant_id TEXT,
+    external_id TEXT UNIQUE,
+    to_number TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    last_attempt TEXT,
+    created_at TEXT,
+    sent_at TEXT
+);
+
+-- 3. OTP Codes (Login)
+CREATE TABLE IF NOT EXISTS otp_codes (
+    phone TEXT PRIMARY KEY,
+    code TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    attempts INTEGER DEFAULT 0,
+    created_at TEXT
+);
+
+-- 3. LEADS
+CREATE TABLE IF NOT EXISTS leads (
+    id TEXT PRIMARY KEY,
+    tenant_id TEXT,
+    phone TEXT NOT NULL,
+    status TEXT DEFAULT 'new',
+    priority INTEGER DEFAULT 1,
+    opt_out INTEGER DEFAULT 0,
+    created_at TEXT,
+    last_contact_at TEXT,
+    notes TEXT,
+    quality_score INTEGER DEFAULT 0,
+    intent TEXT, -- 'emergency', 'service', 'inquiry'
+    summary TEXT,
+    name TEXT,
+    magic_token TEXT
+);
+
+-- 4. CONVERSATION_LOGS
+CREATE TABLE IF NOT EXISTS conversation_logs (
+    id TEXT PRIMARY KEY,
+    lead_id TEXT,
+    direction TEXT, -- inbound, outbound
+    body TEXT,
+    external_id TEXT,
+    created_at TEXT,
+    FOREIGN KEY (lead_id) REFERENCES leads (id)
+);
+
+-- 4.5 ALERT BUFFER (Anti-Annoyance)
+-- Holds messages for 30 seconds to group them before alerting the plumber.
+CREATE TABLE IF NOT EXISTS alert_buffer (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant_id TEXT,
+    customer_phone TEXT,
+    plumber_phone TEXT,
+    messages_text TEXT,
+    message_count INTEGER DEFAULT 1,
+    send_at INTEGER, -- unix seconds (integer compares in the worker's poll)
+    created_at TIMESTAMP,
+    UNIQUE(tenant_id, customer_phone)
+);
+
+-- 4.6 WEBHOOK_EVENTS (Idempotency)
+-- Tracks processed webhooks by provider ID (MessageSid, CallSid) to prevent duplicate processing
+CREATE TABLE IF NOT EXISTS webhook_events (
+    id TEXT PRIMARY KEY,
+    provider_id TEXT UNIQUE NOT NULL, -- Twilio MessageSid or CallSid
+    webhook_type TEXT NOT NULL, -- 'sms', 'voice', 'voice_status'
+    tenant_id TEXT,
+    processed_at TEXT NOT NULL,
+    internal_id TEXT -- Our internal message/event ID
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_webhook_events_provider_id ON webhook_events(provider_id);
+
+-- 4.6.5 alert_buffer index for efficient queries
+CREATE INDEX IF NOT EXISTS idx_alert_buffer_send_at ON alert_buffer(send_at);
+
+-- 4.7 RATE_LIMITS
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    count INTEGER DEFAULT 0,
+    reset_at REAL
+);
+
+-- PERFORMANCE INDEXES
+CREATE INDEX IF NOT EXISTS idx_sms_queue_status_created ON sms_queue(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_webhook_processed ON webhook_events(processed_at);
+-- twilio_phone_number is UNIQUE (implicitly indexed); plumber_phone_number needs its own for callback lookups
+CREATE INDEX IF NOT EXISTS idx_tenants_plumber_phone ON tenants(plumber_phone_number);
+
+-- 5. CONSENT_RECORDS (CASL Compliance - Canada's Anti-Spam Legislation)
+-- Stores proof of consent for every lead, required by CRTC for regulatory audits.
+CREATE TABLE IF NOT EXISTS consent_records (
+    id TEXT PRIMARY KEY,
+    lead_id TEXT NOT NULL,
+    tenant_id TEXT,
+    phone TEXT NOT NULL,
+    consent_type TEXT NOT NULL, -- 'implied' (they called us) or 'express' (form submission)
+    consent_source TEXT NOT NULL, -- 'inbound_call', 'inbound_sms', 'web_form', 'manual'
+    ip_address TEXT, -- Required for web form consent (CASL proof)
+    user_agent TEXT, -- Browser/device info for web forms
+    form_url TEXT, -- URL of form if applicable
+    consent_text TEXT, -- The exact text they agreed to
+    consented_at TEXT NOT NULL, -- ISO 8601 timestamp
+    expires_at TEXT, -- Implied consent expires after 2 years per CASL
+    revoked_at TEXT, -- When they opted out
+    revocation_reason TEXT, -- 'STOP', 'unsubscribe', etc.
+    metadata TEXT, -- JSON for additional context (CallSid, MessageSid, etc.)
+    FOREIGN KEY (lead_id) REFERENCES leads (id)
+);
+
+COMMIT;
+"""
+
+# Columns added after the first release: (table, column, column DDL, follow-up statement).
+# init_db adds whichever are missing, in this order.
+_COLUMN_MIGRATIONS = (
+    ("tenants", "evening_hours_end", "INTEGER DEFAULT 19", None),
+    ("tenants", "average_job_value", "INTEGER DEFAULT 350", None),  # Revenue metric
+    ("tenants", "calendar_id", "TEXT", None),
+    ("tenants", "google_review_link", "TEXT", None),
+    # Normalized Twilio number for the indexed tenant lookup. Generated column:
+    # SQLite keeps it in sync on every insert/update, so no writer can skip it
+    ("tenants", "twilio_phone_norm",
+     "TEXT GENERATED ALWAYS AS (ltrim(replace(twilio_phone_number, ' ', ''), '+')) VIRTUAL", None),
+    ("tenants", "google_sheet_id", "TEXT", None),
+    # Business Health Suite: onboarding funnel, involuntary churn, financial visibility
+    ("tenants", "onboarding_step", "TEXT DEFAULT 'signup'", None),
+    ("tenants", "subscription_status", "TEXT DEFAULT 'active'", None),
+    ("tenants", "estimated_cost", "REAL DEFAULT 0.0", None),
+    ("sms_queue", "twilio_message_sid", "TEXT",
+     "CREATE INDEX IF NOT EXISTS idx_sms_queue_twilio_sid ON sms_queue(twilio_message_sid)"),
+    # Atomic worker claiming
+    ("sms_queue", "locked_at", "TEXT",
+     "CREATE INDEX IF NOT EXISTS idx_sms_queue_locked_at ON sms_queue(locked_at)"),
+    # Message scheduling
+    ("sms_queue", "scheduled_for", "TEXT",
+     "CREATE INDEX IF NOT EXISTS idx_sms_queue_scheduled_for ON sms_queue(scheduled_for)"),
+    ("sms_queue", "external_id", "TEXT",
+     "CREATE UNIQUE INDEX IF NOT EXISTS idx_sms_queue_external_id ON sms_queue(external_id)"),
+    # Quiet-hours gate: earliest send time (unix seconds), computed at queue time
+    # from the tenant's timezone/business hours. NULL = send any time.
+    ("sms_queue", "send_after_utc", "INTEGER",
+     "CREATE INDEX IF NOT EXISTS idx_sms_queue_status_send_after ON sms_queue(status, send_after_utc)"),
+    # Retry backoff: unix time the next attempt is due, set by finalize_send_attempt. NULL = now.
+    ("sms_queue", "next_attempt_at", "INTEGER",
+     "CREATE INDEX IF NOT EXISTS idx_sms_queue_status_next_attempt ON sms_queue(status, next_attempt_at)"),
+    ("leads", "magic_token", "TEXT", None),
+    ("leads", "name", "TEXT", None),
+    ("leads", "quality_score", "INTEGER DEFAULT 0", None),
+    ("leads", "intent", "TEXT", None),
+    ("leads", "summary", "TEXT", None),
+    ("leads", "opt_out", "INTEGER DEFAULT 0", None),
+    # Normalized phone (same rule as twilio_phone_norm) so opt-out/status lookups
+    # match +1555..., 1555... and spaced variants alike
+    ("leads", "phone_norm",
+     "TEXT GENERATED ALWAYS AS (ltrim(replace(phone, ' ', ''), '+')) VIRTUAL", None),
+    # Multi-tenant: every table carries tenant_id
+    ("sms_queue", "tenant_id", "TEXT", None),
+    ("leads", "tenant_id", "TEXT", None),
+    ("conversation_logs", "tenant_id", "TEXT", None),
+    ("jobs", "tenant_id", "TEXT", None),
+)
+
 def init_db():
     """Validates that tables exist, creates them if not."""
     conn = get_db_connection()
     c = conn.cursor()
     
-    # 1. Create JOBS Table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS jobs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tenant_id TEXT,
-            client_id TEXT NOT NULL,
-            customer_name TEXT,
-            customer_phone TEXT,
-            job_date TEXT,
-            status TEXT DEFAULT 'scheduled',
-            notes TEXT
-        )
-    ''')
-    
-    # 1.5 Create TENANTS Table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS tenants (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            twilio_phone_number TEXT UNIQUE, -- The key to identify tenant
-            plumber_phone_number TEXT,
-            timezone TEXT DEFAULT 'America/Los_Angeles',
-            business_hours_start INTEGER DEFAULT 7,
-            business_hours_end INTEGER DEFAULT 19,
-            created_at TIMESTAMP,
-            emergency_mode BOOLEAN DEFAULT 0,
-            evening_hours_end INTEGER DEFAULT 19 -- Default same as business_end if not used
-        )
-    ''')
-
-    # 2. Create SMS_QUEUE Table (Moved Up for Migration Safety)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sms_queue (
-            id TEXT PRIMARY KEY,
-            tenant_id TEXT,
-            external_id TEXT UNIQUE,
-            to_number TEXT NOT NULL,
-            body TEXT NOT NULL,
-            status TEXT DEFAULT 'pending',
-            attempts INTEGER DEFAULT 0,
-            last_attempt TEXT,
-            created_at TEXT,
-            sent_at TEXT
-        )
-    ''')
-
-    # 3. Create OTP Codes Table (Login)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS otp_codes (
-            phone TEXT PRIMARY KEY,
-            code TEXT NOT NULL,
-            expires_at TEXT NOT NULL,
-            attempts INTEGER DEFAULT 0,
-            created_at TEXT
-        )
-    ''')
-
-    
-    # 1.6 Migration for Schedule
-    try:
-        cursor = c.execute("PRAGMA table_info(tenants)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'evening_hours_end' not in columns:
-            logger.info("🔧 Migrating DB: Adding schedule cols to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN evening_hours_end INTEGER DEFAULT 19")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (schedule): {e}")
-
-    # 1.6.5 Migration for Average Job Value (Revenue Metric)
-    try:
-        cursor = c.execute("PRAGMA table_info(tenants)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'average_job_value' not in columns:
-            logger.info("🔧 Migrating DB: Adding average_job_value col to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN average_job_value INTEGER DEFAULT 350")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (average_job_value): {e}")
-
-    # 1.7 Migration for Calendar ID
-    try:
-        cursor = c.execute("PRAGMA table_info(tenants)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'calendar_id' not in columns:
-            logger.info("🔧 Migrating DB: Adding calendar_id col to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN calendar_id TEXT")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (calendar_id): {e}")
-        
-    # 1.8 Migration for Review Link
-    try:
-        cursor = c.execute("PRAGMA table_info(tenants)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'google_review_link' not in columns:
-            logger.info("🔧 Migrating DB: Adding google_review_link col to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN google_review_link TEXT")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (google_review_link): {e}")
+    # BASE SCHEMA: every CREATE in one script / one transaction
+    conn.executescript(_SCHEMA_DDL)
+    
+    # COLUMN MIGRATIONS: one schema introspection for every table, then only the
+    # missing ALTERs, all in one transaction (one commit instead of one per column)
+    existing = {}
+    for table, column in conn.execute(
+        "SELECT m.name, p.name FROM sqlite_master m, pragma_table_xinfo(m.name) p WHERE m.type = 'table'"
+    ):
+        existing.setdefault(table, set()).add(column)
+    
+    conn.execute("BEGIN")
+    for table, column, ddl, follow_up in _COLUMN_MIGRATIONS:
+        if column in existing.get(table, ()):
+            continue
+        try:
+            logger.info(f"🔧 Migrating DB: Adding {column} col to {table}...")
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+            if follow_up:
+                conn.execute(follow_up)
+        except Exception as e:
+            logger.warning(f"⚠️ Migration warning ({column}): {e}")
+    conn.commit()
     
-    # 1.9 Migration for Twilio MessageSid
-    try:
-        cursor = c.execute("PRAGMA table_info(sms_queue)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'twilio_message_sid' not in columns:
-            logger.info("🔧 Migrating DB: Adding twilio_message_sid col to sms_queue...")
-            c.execute("ALTER TABLE sms_queue ADD COLUMN twilio_message_sid TEXT")
-            c.execute("CREATE INDEX IF NOT EXISTS idx_sms_queue_twilio_sid ON sms_queue(twilio_message_sid)")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (twilio_message_sid): {e}")
-
-    # 1.9.5 Migration for locked_at (Atomic Worker Claiming)
-    try:
-        cursor = c.execute("PRAGMA table_info(sms_queue)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'locked_at' not in columns:
-            logger.info("🔧 Migrating DB: Adding locked_at col to sms_queue...")
-            c.execute("ALTER TABLE sms_queue ADD COLUMN locked_at TEXT")
-            c.execute("CREATE INDEX IF NOT EXISTS idx_sms_queue_locked_at ON sms_queue(locked_at)")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (locked_at): {e}")
-
-    # 1.9.6 Migration for scheduled_for (Message Scheduling)
     try:
-        cursor = c.execute("PRAGMA table_info(sms_queue)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'scheduled_for' not in columns:
-            logger.info("🔧 Migrating DB: Adding scheduled_for col to sms_queue...")
-            c.execute("ALTER TABLE sms_queue ADD COLUMN scheduled_for TEXT")
-            c.execute("CREATE INDEX IF NOT EXISTS idx_sms_queue_scheduled_for ON sms_queue(scheduled_for)")
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tenants_phone_norm ON tenants(twilio_phone_norm)")
     except Exception as e:
-        logger.warning(f"⚠️ Migration warning (scheduled_for): {e}")
-
-
+        logger.warning(f"⚠️ Migration warning (twilio_phone_norm): {e}")
 
-    # 1.10 Migration for Google Sheet ID
-    try:
-        cursor = c.execute("PRAGMA table_info(tenants)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'google_sheet_id' not in columns:
-            logger.info("🔧 Migrating DB: Adding google_sheet_id col to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN google_sheet_id TEXT")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (google_sheet_id): {e}")
-
-    # 1.11 Migration for Business Health Suite (Resilience)
-    try:
-        cursor = c.execute("PRAGMA table_info(tenants)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        # Onboarding Funnel
-        if 'onboarding_step' not in columns:
-            logger.info("🔧 Migrating DB: Adding onboarding_step to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN onboarding_step TEXT DEFAULT 'signup'")
-            
-        # Subscription Status (Involuntary Churn)
-        if 'subscription_status' not in columns:
-            logger.info("🔧 Migrating DB: Adding subscription_status to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN subscription_status TEXT DEFAULT 'active'")
-            
-        # Financial Visibility
-        if 'estimated_cost' not in columns:
-            logger.info("🔧 Migrating DB: Adding estimated_cost to tenants...")
-            c.execute("ALTER TABLE tenants ADD COLUMN estimated_cost REAL DEFAULT 0.0")
-            
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (Health Suite): {e}")
-    
-    # 3. Create LEADS Table
-    # 3. Create LEADS Table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS leads (
-            id TEXT PRIMARY KEY,
-            tenant_id TEXT,
-            phone TEXT NOT NULL,
-            status TEXT DEFAULT 'new',
-            priority INTEGER DEFAULT 1,
-            opt_out INTEGER DEFAULT 0,
-            created_at TEXT,
-            last_contact_at TEXT,
-            notes TEXT,
-            quality_score INTEGER DEFAULT 0,
-            intent TEXT, -- 'emergency', 'service', 'inquiry'
-            summary TEXT,
-            name TEXT,
-            magic_token TEXT
-        )
-    """)
-
-    # 1.10 Migration for Magic Token in Leads
+    # SMS ARCHIVE (see archive_old_sms): same columns as sms_queue, no constraints.
+    # Columns added to sms_queue later are mirrored here.
     try:
-        # Check if column exists using PRAGMA - Safer for concurrency
-        cursor = c.execute("PRAGMA table_info(leads)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'magic_token' not in columns:
-            logger.info("🔧 Migrating DB: Adding magic_token col to leads...")
-            c.execute("ALTER TABLE leads ADD COLUMN magic_token TEXT")
+        c.execute("CREATE TABLE IF NOT EXISTS sms_queue_archive AS SELECT * FROM sms_queue WHERE 0")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_sms_archive_created ON sms_queue_archive(created_at)")
+        for column, col_type in conn.execute("""
+            SELECT q.name, q.type FROM pragma_table_info('sms_queue') q
+            WHERE q.name NOT IN (SELECT name FROM pragma_table_info('sms_queue_archive'))
+        """).fetchall():
+            c.execute(f"ALTER TABLE sms_queue_archive ADD COLUMN {column} {col_type}")
     except Exception as e:
-        logger.warning(f"⚠️ Migration warning (magic_token): {e}")
+        logger.warning(f"⚠️ Migration warning (sms_queue_archive): {e}")
 
-    # 1.11 Migration for Name in Leads
-    try:
-        cursor = c.execute("PRAGMA table_info(leads)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'name' not in columns:
-            logger.info("🔧 Migrating DB: Adding name col to leads...")
-            c.execute("ALTER TABLE leads ADD COLUMN name TEXT")
-    except Exception as e:
-        logger.warning(f"⚠️ Migration warning (name): {e}")
-    
-    # 3.5 Migration for Quality Columns
+    # Migration for conversation_logs UNIQUE index (Idempotency)
     try:
-        cursor = c.execute("PRAGMA table_info(leads)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'quality_score' not in columns:
-            logger.info("🔧 Migrating DB: Adding quality_score col to leads...")
-            c.execute("ALTER TABLE leads ADD COLUMN quality_score INTEGER DEFAULT 0")
-        if 'intent' not in columns:
-            logger.info("🔧 Migrating DB: Adding intent col to leads...")
-            c.execute("ALTER TABLE leads ADD COLUMN intent TEXT")
-        if 'summary' not in columns:
-            logger.info("🔧 Migrating DB: Adding summary col to leads...")
-            c.execute("ALTER TABLE leads ADD COLUMN summary TEXT")
+        # Check if index exists or just try to create it (IF NOT EXISTS is safe)
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_conversation_logs_external_id ON conversation_logs(external_id)")
     except Exception as e:
-        logger.warning(f"⚠️ Migration warning (quality cols): {e}")
+        logger.warning(f"⚠️  Migration failed for conversation_logs index: {e}")
 
-    # 4. Create CONVERSATION_LOGS Table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS conversation_logs (
-            id TEXT PRIMARY KEY,
-            lead_id TEXT,
-            direction TEXT, -- inbound, outbound
-            body TEXT,
-            external_id TEXT,
-            created_at TEXT,
-            FOREIGN KEY (lead_id) REFERENCES leads (id)
-        )
-    """)
-    
-    # 4.5 Create ALERT BUFFER Table (Anti-Annoyance)
-    # This table holds messages for 30 seconds to group them before alerting the plumber.
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS alert_buffer (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tenant_id TEXT,
-            customer_phone TEXT,
-            plumber_phone TEXT,
-            messages_text TEXT,
-            message_count INTEGER DEFAULT 1,
-            send_at TIMESTAMP,
-            created_at TIMESTAMP,
-            UNIQUE(tenant_id, customer_phone)
-        )
-    ''')
-
-    # 4.6 Create WEBHOOK_EVENTS Table (Idempotency)
-    # Tracks processed webhooks by provider ID (MessageSid, CallSid) to prevent duplicate processing
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS webhook_events (
-            id TEXT PRIMARY KEY,
-            provider_id TEXT UNIQUE NOT NULL, -- Twilio MessageSid or CallSid
-            webhook_type TEXT NOT NULL, -- 'sms', 'voice', 'voice_status'
-            tenant_id TEXT,
-            processed_at TEXT NOT NULL,
-            internal_id TEXT -- Our internal message/event ID
-        )
-    ''')
-    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_webhook_events_provider_id ON webhook_events(provider_id)')
-    
-    # 4.6.5 Create index on alert_buffer for efficient queries
-    c.execute('CREATE INDEX IF NOT EXISTS idx_alert_buffer_send_at ON alert_buffer(send_at)')
-    
-    # 4.7 Create RATE_LIMITS Table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS rate_limits (
-            key TEXT PRIMARY KEY,
-            count INTEGER DEFAULT 0,
-            reset_at REAL
-        )
-    ''')
-    
-    # PERFORMANCE INDEXES
-    c.execute("CREATE INDEX IF NOT EXISTS idx_sms_queue_status_created ON sms_queue(status, created_at)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_webhook_processed ON webhook_events(processed_at)")
-
-    # 5. Create CONSENT_RECORDS Table (CASL Compliance - Canada's Anti-Spam Legislation)
-    # This table stores proof of consent for every lead, required by CRTC for regulatory audits.
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS consent_records (
-            id TEXT PRIMARY KEY,
-            lead_id TEXT NOT NULL,
-            tenant_id TEXT,
-            phone TEXT NOT NULL,
-            consent_type TEXT NOT NULL, -- 'implied' (they called us) or 'express' (form submission)
-            consent_source TEXT NOT NULL, -- 'inbound_call', 'inbound_sms', 'web_form', 'manual'
-            ip_address TEXT, -- Required for web form consent (CASL proof)
-            user_agent TEXT, -- Browser/device info for web forms
-            form_url TEXT, -- URL of form if applicable
-            consent_text TEXT, -- The exact text they agreed to
-            consented_at TEXT NOT NULL, -- ISO 8601 timestamp
-            expires_at TEXT, -- Implied consent expires after 2 years per CASL
-            revoked_at TEXT, -- When they opted out
-            revocation_reason TEXT, -- 'STOP', 'unsubscribe', etc.
-            metadata TEXT, -- JSON for additional context (CallSid, MessageSid, etc.)
-            FOREIGN KEY (lead_id) REFERENCES leads (id)
-        )
-    """)
-    
-    # Simple migration: Checking if external_id exists, if not add it
+    # Migration for leads UNIQUE constraint (phone, tenant_id) - Multi-tenant support
+    # This allows the same phone number to exist for different tenants
     try:
-        cursor = c.execute("PRAGMA table_info(sms_queue)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'external_id' not in columns:
-            logger.info("🔧 Migrating DB: Adding external_id col to sms_queue...")
-            c.execute("ALTER TABLE sms_queue ADD COLUMN external_id TEXT")
-            c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sms_queue_external_id ON sms_queue(external_id)")
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_phone_tenant ON leads(phone, tenant_id)")
     except Exception as e:
-        logger.warning(f"⚠️ Migration warning (external_id): {e}")
+        logger.warning(f"⚠️  Migration failed for leads unique index: {e}")
 
-    # Migration for OPT_OUT
+    # HOT-PATH INDEXES (opt-out gate, per-recipient queue cancels, lead history, job lookups, consent checks, funnel)
+    # leads(phone) lookups are already served by idx_leads_phone_tenant
     try:
-        cursor = c.execute("PRAGMA table_info(leads)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'opt_out' not in columns:
-            logger.info("🔧 Migrating DB: Adding opt_out col to leads...")
-            c.execute("ALTER TABLE leads ADD COLUMN opt_out INTEGER DEFAULT 0")
+        c.execute("DROP INDEX IF EXISTS idx_leads_phone_optout")  # Superseded by the phone_norm index
+        c.execute("CREATE INDEX IF NOT EXISTS idx_leads_phone_norm_optout ON leads(phone_norm, opt_out)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_sms_queue_to_status ON sms_queue(to_number, status)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_conv_logs_lead ON conversation_logs(lead_id, created_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_phone_tenant_date ON jobs(customer_phone, tenant_id, job_date DESC)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_consent_lead ON consent_records(lead_id, revoked_at, expires_at)")
+        # Consent gate / audit trail / stats: tenant-scoped and global (tenant_id=None) lookups
+        c.execute("CREATE INDEX IF NOT EXISTS idx_consent_tenant_phone ON consent_records(tenant_id, phone, revoked_at, consented_at DESC)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_consent_phone ON consent_records(phone, revoked_at, consented_at DESC)")
+        # Covers the funnel GROUP BY (tenant + optional created_at range) without touching the table
+        c.execute("CREATE INDEX IF NOT EXISTS idx_leads_tenant_status ON leads(tenant_id, status, created_at)")
+        # Narrows the tenant-scoped dashboard counters to that tenant's rows
+        c.execute("CREATE INDEX IF NOT EXISTS idx_sms_queue_tenant_status ON sms_queue(tenant_id, status)")
     except Exception as e:
-        logger.warning(f"⚠️ Migration warning (opt_out): {e}")
-    
-    # Migration for TENANT_ID (Ensure each table has it)
-    tables = ['sms_queue', 'leads', 'conversation_logs', 'jobs']
-    for t in tables:
-        try:
-            # Check if column exists
-            cursor = conn.execute(f"PRAGMA table_info({t})")
-            columns = [row[1] for row in cursor.fetchall()]
-            if 'tenant_id' not in columns:
-                logger.info(f"🔧 Migrating DB: Adding tenant_id col to {t}...")
-                conn.execute(f"ALTER TABLE {t} ADD COLUMN tenant_id TEXT")
-        except Exception as e:
-            logger.warning(f"⚠️  Migration failed for table {t}: {e}")
+        logger.warning(f"⚠️  Migration failed for hot-path indexes: {e}")
 
-    # Migration for conversation_logs UNIQUE index (Idempotency)
+    # alert_buffer.send_at moved from ISO text (local time) to unix seconds; convert leftovers once
     try:
-        # Check if index exists or just try to create it (IF NOT EXISTS is safe)
-        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_conversation_logs_external_id ON conversation_logs(external_id)")
+        c.execute("""
+            UPDATE alert_buffer SET send_at = CAST(strftime('%s', send_at, 'utc') AS INTEGER)
+            WHERE typeof(send_at) = 'text'
+        """)
     except Exception as e:
-        logger.warning(f"⚠️  Migration failed for conversation_logs index: {e}")
+        logger.warning(f"⚠️ Migration warning (alert_buffer.send_at): {e}")
 
-    # Migration for leads UNIQUE constraint (phone, tenant_id) - Multi-tenant support
-    # This allows the same phone number to exist for different tenants
+    # Retries queued before next_attempt_at existed: derive it from last_attempt (same backoff)
     try:
-        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_phone_tenant ON leads(phone, tenant_id)")
+        c.execute("""
+            UPDATE sms_queue SET next_attempt_at = CAST(strftime('%s', last_attempt, 'utc') AS INTEGER) + CASE attempts
+                WHEN 1 THEN 5 WHEN 2 THEN 30 WHEN 3 THEN 120 WHEN 4 THEN 600 ELSE 1800 END
+            WHERE status = 'pending' AND next_attempt_at IS NULL AND attempts > 0 AND last_attempt IS NOT NULL
+        """)
     except Exception as e:
-        logger.warning(f"⚠️  Migration failed for leads unique index: {e}")
+        logger.warning(f"⚠️ Migration warning (sms_queue.next_attempt_at): {e}")
 
     # Create Default Tenant if Empty
     c.execute("SELECT count(*) FROM tenants")
@@ -499,14 +677,25 @@ def init_db():
         create_default_tenant_internal(conn)
         
     conn.commit()
+
+    # INCREMENTAL AUTO-VACUUM: lets archive_old_sms hand freed pages back to the OS.
+    # Switching an existing file over needs one full VACUUM (only ever runs once).
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logger.info("🔧 Migrating DB: Enabling incremental auto-vacuum (one-time VACUUM)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+    except Exception as e:
+        logger.warning(f"⚠️ Migration warning (auto_vacuum): {e}")
+
+    # Refresh planner stats so the new indexes get picked up (cheap no-op when nothing changed)
+    conn.execute("PRAGMA optimize")
     conn.close()
 
 def get_all_tenants():
-    """Returns all provisioned tenants."""
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM tenants").fetchall()
-    conn.close()
-    return [dict(ix) for ix in rows]
+    """Returns all provisioned tenants (as rows: key access; dict() them for JSON)."""
+    with read_conn() as conn:
+        return conn.execute("SELECT * FROM tenants").fetchall()
 
 def create_default_tenant_internal(conn):
     try:
@@ -550,24 +739,21 @@ def migrate_json_to_sqlite(conn=None):
                 logger.info("📦 Migrating jobs_db.json to SQLite...")
                 with open(json_path, 'r') as f:
                     jobs = json.load(f)
-                    for job in jobs:
-                        # Check if ID is integer (it is in structure)
-                        # We interpret job['id'] as the primary key.
-                        try:
-                            c.execute("""
-                                INSERT INTO jobs (id, client_id, customer_name, customer_phone, job_date, status, notes)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                job.get('id'), 
-                                job.get('client_id'), 
-                                job.get('customer_name'), 
-                                job.get('customer_phone'), 
-                                job.get('job_date'), 
-                                job.get('status'), 
-                                job.get('notes')
-                            ))
-                        except sqlite3.IntegrityError:
-                            pass # specific ID already exists
+                # We interpret job['id'] as the primary key. One executemany in the
+                # caller's transaction; OR IGNORE skips IDs that already exist
+                c.executemany("""
+                    INSERT OR IGNORE INTO jobs (id, client_id, customer_name, customer_phone, job_date, status, notes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(
+                    job.get('id'), 
+                    job.get('client_id'), 
+                    job.get('customer_name'), 
+                    job.get('customer_phone'), 
+                    job.get('job_date'), 
+                    job.get('status'), 
+                    job.get('notes')
+                ) for job in jobs])
+                logger.info(f"📦 {c.rowcount}/{len(jobs)} jobs copied")
             logger.info("✅ Jobs migrated.")
             
         # --- Migrate Queue ---
@@ -583,23 +769,20 @@ def migrate_json_to_sqlite(conn=None):
                 logger.info("📦 Migrating sms_queue.json to SQLite...")
                 with open(json_path, 'r') as f:
                     queue = json.load(f)
-                    for msg in queue:
-                        try:
-                            c.execute("""
-                                INSERT INTO sms_queue (id, to_number, body, status, attempts, last_attempt, created_at, sent_at)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                msg.get('id'),
-                                msg.get('to'), # Note: JSON uses 'to', Schema uses 'to_number'
-                                msg.get('body'),
-                                msg.get('status'),
-                                msg.get('attempts'),
-                                msg.get('last_attempt'),
-                                msg.get('created_at'),
-                                msg.get('sent_at') 
-                            ))
-                        except sqlite3.IntegrityError:
-                            pass
+                c.executemany("""
+                    INSERT OR IGNORE INTO sms_queue (id, to_number, body, status, attempts, last_attempt, created_at, sent_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(
+                    msg.get('id'),
+                    msg.get('to'), # Note: JSON uses 'to', Schema uses 'to_number'
+                    msg.get('body'),
+                    msg.get('status'),
+                    msg.get('attempts'),
+                    msg.get('last_attempt'),
+                    msg.get('created_at'),
+                    msg.get('sent_at') 
+                ) for msg in queue])
+                logger.info(f"📦 {c.rowcount}/{len(queue)} queued messages copied")
             logger.info("✅ SMS Queue migrated.")
 
         if should_close:
@@ -611,10 +794,8 @@ def migrate_json_to_sqlite(conn=None):
 # --- JOB ACCESSORS ---
 
 def get_all_jobs():
-    conn = get_db_connection()
-    jobs = conn.execute('SELECT * FROM jobs').fetchall()
-    conn.close()
-    return [dict(ix) for ix in jobs]
+    with read_conn() as conn:
+        return conn.execute('SELECT * FROM jobs').fetchall()
 
 def add_job(client_id, customer_name, customer_phone, job_date, notes):
     conn = get_db_connection()
@@ -626,213 +807,325 @@ def add_job(client_id, customer_name, customer_phone, job_date, notes):
     conn.commit()
     conn.close()
 
+def _norm_phone(phone):
+    """Python twin of the *_phone_norm / phone_norm columns: no spaces, no leading +."""
+    return str(phone).strip().replace(' ', '').lstrip('+')
+
 def get_tenant_by_twilio_number(twilio_number):
     """
     Finds the tenant config based on the INCOMING phone number (To).
-    Optimized to use SQL WHERE clause instead of Python loop.
+    One lookup on the indexed twilio_phone_norm column (no spaces, no leading +).
     """
     if not twilio_number: 
         return None
     
-    # Normalize: strip spaces and leading +
-    clean_num = str(twilio_number).strip().lstrip('+')
-    
-    conn = get_db_connection()
-    if not conn:
-        return None
-    
-    try:
-        # Try exact match first
+    with read_conn() as conn:
         row = conn.execute(
-            "SELECT * FROM tenants WHERE twilio_phone_number = ? OR twilio_phone_number = ? OR twilio_phone_number = ?",
-            (twilio_number, clean_num, f"+{clean_num}")
+            "SELECT * FROM tenants WHERE twilio_phone_norm = ? LIMIT 1", (_norm_phone(twilio_number),)
         ).fetchone()
-        
-        if row:
-            return dict(row)
-        
-        # Fallback: Check all tenants with normalization (for edge cases)
-        rows = conn.execute("SELECT * FROM tenants").fetchall()
-        for db_row in rows:
-            db_num = str(db_row['twilio_phone_number']).strip().lstrip('+')
-            if db_num == clean_num:
-                return dict(db_row)
-        
+    return dict(row) if row else None
+
+def get_tenant_by_any_number(*numbers):
+    """
+    Resolves a tenant from any of the given numbers in ONE query, matching either
+    the tenant's Twilio number or its plumber phone (used by call-status callbacks,
+    where To/From may be the plumber's cell after a <Dial>).
+    Twilio-number matches win over plumber-phone matches; earlier numbers win over later ones.
+    """
+    numbers = [_norm_phone(n) for n in numbers if n]
+    if not numbers:
         return None
-    finally:
-        conn.close()
+    
+    # Same normalization as get_tenant_by_twilio_number, so /voice and /voice/status route alike
+    plumber_norm = "ltrim(replace(plumber_phone_number, ' ', ''), '+')"
+    placeholders = ", ".join("?" for _ in numbers)
+    rank_twilio = " ".join(f"WHEN twilio_phone_norm = ? THEN {i}" for i in range(len(numbers)))
+    rank_plumber = " ".join(f"WHEN {plumber_norm} = ? THEN {len(numbers) + i}" for i in range(len(numbers)))
+    with read_conn() as conn:
+        row = conn.execute(f"""
+            SELECT * FROM tenants
+            WHERE twilio_phone_norm IN ({placeholders}) OR {plumber_norm} IN ({placeholders})
+            ORDER BY CASE {rank_twilio} {rank_plumber} END
+            LIMIT 1
+        """, (*numbers, *numbers, *numbers, *numbers)).fetchone()
+        return dict(row) if row else None
 
 def get_tenant_by_id(tenant_id):
     """
-    Retrieves tenant by ID. No caching to ensure fresh data in multi-tenant scenarios.
+    Retrieves tenant by ID straight from the DB (hot paths use tenant_cache.tenant_by_id).
     Validates tenant_id is not None/empty before querying.
     """
     if not tenant_id:
         return None
     
-    conn = get_db_connection()
-    if not conn:
-        return None
-    try:
+    with read_conn() as conn:
         row = conn.execute("SELECT * FROM tenants WHERE id = ?", (tenant_id,)).fetchone()
-        if row: 
-            return dict(row)
-        return None
-    finally:
-        conn.close()
+    if row: 
+        return dict(row)
+    return None
+
+# --- HOT STATEMENTS ---
+# Shared by every call site so each long-lived connection's statement cache
+# (cached_statements, see _open_sqlite) holds one prepared copy per statement
+
+SQL_INSERT_SMS_QUEUE = """
+    INSERT INTO sms_queue (id, tenant_id, external_id, to_number, body, status, created_at, scheduled_for, send_after_utc)
+    VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+
+# sent_at is only overwritten when a value is passed
+SQL_UPDATE_SMS_STATUS = """
+    UPDATE sms_queue
+    SET status = ?, attempts = ?, last_attempt = ?, sent_at = COALESCE(?, sent_at)
+    WHERE id = ?
+"""
+
+# Send outcome in one statement: success -> 'sent'; failure -> retry with backoff
+# (seconds after the Nth failed attempt, same schedule as sms_engine.calculate_backoff)
+# or 'failed_permanent' once attempts reach the retry limit
+SQL_FINALIZE_SENT = """
+    UPDATE sms_queue
+    SET status = 'sent', attempts = attempts + 1, last_attempt = NULL, sent_at = ?,
+        twilio_message_sid = COALESCE(?, twilio_message_sid)
+    WHERE id = ?
+"""
+
+SQL_FINALIZE_FAILED = """
+    UPDATE sms_queue
+    SET attempts = attempts + 1,
+        last_attempt = ?,
+        status = CASE WHEN attempts + 1 >= ? THEN 'failed_permanent' ELSE 'pending' END,
+        next_attempt_at = ? + CASE attempts + 1
+            WHEN 1 THEN 5 WHEN 2 THEN 30 WHEN 3 THEN 120 WHEN 4 THEN 600 ELSE 1800 END
+    WHERE id = ?
+"""
+
+SQL_INSERT_CONVERSATION_LOG = """
+    INSERT INTO conversation_logs (id, tenant_id, lead_id, direction, body, external_id, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+
+SQL_INSERT_CONSENT = """
+    INSERT INTO consent_records
+    (id, lead_id, tenant_id, phone, consent_type, consent_source,
+     ip_address, user_agent, form_url, consent_text,
+     consented_at, expires_at, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 # --- QUEUE ACCESSORS ---
 
-def add_sms_to_queue(to_number, body, external_id=None, tenant_id=None, delay_seconds=0):
-    conn = get_db_connection()
-    if not conn:
-        logger.warning(f"⚠️ Failed to get DB connection. Message not queued for {to_number}")
-        return False
-    
+@_retry_busy
+def _insert_sms_row(params):
+    """One sms_queue insert in its own writer transaction. Returns rows inserted (0 = duplicate)."""
+    with write_conn() as conn:
+        return conn.execute(SQL_INSERT_SMS_QUEUE, params).rowcount
+
+def add_sms_to_queue(to_number, body, external_id=None, tenant_id=None, delay_seconds=0, send_after_utc=None):
     msg_id = str(uuid.uuid4())
     # 🛡️ BUG #19 FIX: Timezone String Errors (Force ISO8601)
-    created_at = datetime.now().isoformat()
+    now = datetime.now()  # One clock read per call
+    created_at = now.isoformat()
     # Calculate scheduled_for if delayed
     scheduled_for = None
     if delay_seconds > 0:
         from datetime import timedelta
-        scheduled_for = (datetime.now() + timedelta(seconds=delay_seconds)).isoformat()
+        scheduled_for = (now + timedelta(seconds=delay_seconds)).isoformat()
     
     try:
-        conn.execute("""
-            INSERT INTO sms_queue (id, tenant_id, external_id, to_number, body, status, created_at, scheduled_for)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (msg_id, tenant_id, external_id, to_number, body, 'pending', created_at, scheduled_for))
-        conn.commit()
+        if _insert_sms_row((msg_id, tenant_id, external_id, to_number, body, created_at, scheduled_for, send_after_utc)) == 0:
+            # external_id already queued (Idempotency check)
+            logger.info(f"♻️  Duplicate Event Ignored (External ID: {external_id})")
+            return False
         if scheduled_for:
             logger.info(f"⏳ Message scheduled for {to_number} at {scheduled_for}")
         else:
             logger.info(f"📥 Message queued for {to_number} (DB)")
         return True
-    except sqlite3.IntegrityError:
-        # If external_id exists (Idempotency check)
-        if external_id:
-            logger.info(f"♻️  Duplicate Event Ignored (External ID: {external_id})")
-            return False
-        else:
-            # Should not happen with UUID but safe to raise or retry
-            raise
     except Exception as e:
         logger.warning(f"⚠️ Error queuing message: {e}")
-        conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
+
+def add_many_sms_to_queue(rows):
+    """
+    Inserts several (to_number, body, external_id, tenant_id, send_after_utc) rows in ONE transaction
+    (one commit/fsync instead of one per message).
+    Duplicate external_ids are skipped, same idempotency as add_sms_to_queue.
+    Returns a list of booleans (True = queued) in input order.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    
+    created_at = datetime.now().isoformat()
+    results = []
+    try:
+        with write_conn() as conn:
+            for to_number, body, external_id, tenant_id, send_after_utc in rows:
+                cur = conn.execute(SQL_INSERT_SMS_QUEUE,
+                                   (str(uuid.uuid4()), tenant_id, external_id, to_number, body, created_at, None, send_after_utc))
+                inserted = cur.rowcount == 1
+                if not inserted:
+                    logger.info(f"♻️  Duplicate Event Ignored (External ID: {external_id})")
+                results.append(inserted)
+        logger.info(f"📥 {sum(results)}/{len(rows)} messages queued in one transaction (DB)")
+        return results
+    except Exception as e:
+        logger.warning(f"⚠️ Error batch-queuing messages: {e}")
+        return [False] * len(rows)
+
+# UPDATE ... RETURNING needs SQLite 3.35+ (Postgres always has it)
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
 
 def claim_pending_sms(limit=10, timeout_minutes=5):
     """
     Atomically claim pending rows OR stuck processing rows (Self-Healing).
     Uses single atomic UPDATE with backoff awareness to prevent race conditions.
+    Rows addressed to opted-out numbers are marked 'failed_optout' instead of claimed.
     """
-    from datetime import timedelta
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
     try:
-        now = datetime.now()
-        now_str = now.isoformat()
-        
-        # Exponential Backoff thresholds (seconds)
-        # 0: 0, 1: 5, 2: 30, 3: 120, 4: 600, 5+: 1800
-        t1 = (now - timedelta(seconds=5)).isoformat()
-        t2 = (now - timedelta(seconds=30)).isoformat()
-        t3 = (now - timedelta(seconds=120)).isoformat()
-        t4 = (now - timedelta(seconds=600)).isoformat()
-        t5 = (now - timedelta(seconds=1800)).isoformat()
-        
-        # Stickiness check for stuck workers
-        cutoff = (now - timedelta(minutes=timeout_minutes)).isoformat()
-        
-        conn.execute("BEGIN IMMEDIATE")
-        
-        try:
-            # Atomic selection and claim
-            # Logic: 
-            # 1. Row is 'pending' AND (
-            #    attempts=0 OR (attempts=1 AND last_attempt < t1) OR (attempts=2 AND last_attempt < t2) ...
-            # )
-            # 2. OR Row is 'processing' AND locked_at < cutoff (stuck worker)
-            conn.execute("""
-                UPDATE sms_queue 
-                SET status = 'processing', locked_at = ?
-                WHERE id IN (
-                    SELECT id FROM sms_queue 
-                    WHERE (
-                        status = 'pending' AND (
-                            attempts = 0 
-                            OR (attempts = 1 AND last_attempt <= ?)
-                            OR (attempts = 2 AND last_attempt <= ?)
-                            OR (attempts = 3 AND last_attempt <= ?)
-                            OR (attempts = 4 AND last_attempt <= ?)
-                            OR (attempts >= 5 AND last_attempt <= ?)
-                        ) AND (scheduled_for IS NULL OR scheduled_for <= ?)
-                    ) OR (
-                        status = 'processing' AND (locked_at IS NULL OR locked_at <= ?)
-                    )
-                    ORDER BY created_at ASC
-                    LIMIT ?
+        return _claim_pending_rows(limit, timeout_minutes)
+    except Exception as e:
+        logger.error(f"DB Claim Error: {e}")
+        return []
+
+@_retry_busy
+def _claim_pending_rows(limit, timeout_minutes):
+    """The claim itself (one writer transaction); retried when the DB is busy."""
+    from datetime import timedelta
+    now = datetime.now()
+    now_str = now.isoformat()
+    now_ts = int(now.timestamp())
+    
+    # Stickiness check for stuck workers
+    cutoff = (now - timedelta(minutes=timeout_minutes)).isoformat()
+    
+    with write_conn() as conn:
+        # Opt-out gate in SQL: queued rows for globally opted-out numbers are retired
+        # here (same phone_norm rule as check_opt_out_status), so the claim below
+        # never hands them to the worker and it needn't re-check each recipient.
+        skipped = conn.execute("""
+            UPDATE sms_queue SET status = 'failed_optout'
+            WHERE status IN ('pending', 'processing') AND EXISTS (
+                SELECT 1 FROM leads
+                WHERE phone_norm = ltrim(replace(sms_queue.to_number, ' ', ''), '+') AND opt_out = 1
+            )
+        """).rowcount
+        if skipped and skipped > 0:
+            logger.info(f"🚫 Skipped {skipped} queued message(s) to opted-out numbers")
+
+        # Atomic selection and claim
+        # Logic: 
+        # 1. Row is 'pending' AND its retry backoff has elapsed (next_attempt_at)
+        #    AND due (scheduled_for) AND inside the recipient's send window (send_after_utc)
+        # 2. OR Row is 'processing' AND locked_at < cutoff (stuck worker)
+        # RETURNING hands back exactly the rows this UPDATE claimed (no re-select by timestamp)
+        cur = conn.execute(f"""
+            UPDATE sms_queue 
+            SET status = 'processing', locked_at = ?
+            WHERE id IN (
+                SELECT id FROM sms_queue 
+                WHERE (
+                    status = 'pending'
+                    AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                    AND (scheduled_for IS NULL OR scheduled_for <= ?)
+                    AND (send_after_utc IS NULL OR send_after_utc <= ?)
+                ) OR (
+                    status = 'processing' AND (locked_at IS NULL OR locked_at <= ?)
                 )
-            """, (now_str, t1, t2, t3, t4, t5, now_str, cutoff, limit))
-            
+                ORDER BY created_at ASC
+                LIMIT ?
+            )
+            {"RETURNING *" if _HAS_RETURNING else ""}
+        """, (now_str, now_ts, now_str, now_ts, cutoff, limit))
+        
+        if _HAS_RETURNING:
+            claimed_rows = cur.fetchall()
+        else:
             claimed_rows = conn.execute("""
                 SELECT * FROM sms_queue 
                 WHERE status = 'processing' AND locked_at = ?
                 ORDER BY created_at ASC
                 LIMIT ?
             """, (now_str, limit)).fetchall()
-            
-            conn.commit()
-            return [dict(ix) for ix in claimed_rows]
-        except Exception as e:
-            conn.rollback()
-            raise e
-            
-    except Exception as e:
-        logger.error(f"DB Claim Error: {e}")
-        return []
+    # RETURNING order is unspecified: keep the oldest-first send order
+    return sorted((dict(ix) for ix in claimed_rows), key=lambda r: r['created_at'] or '')
+
+def get_pending_sms():
+    # Deprecated in favor of claim_pending_sms for workers
+    # But useful for non-mutating checks
+    with read_conn() as conn:
+        return conn.execute("SELECT * FROM sms_queue WHERE status = 'pending'").fetchall()
+
+def get_all_sms():
+    """Yields the 100 newest SMS queue rows as dicts (reverse chronological, for the dashboard)."""
+    with read_conn() as conn:
+        for row in conn.execute("SELECT * FROM sms_queue ORDER BY created_at DESC LIMIT 100"):
+            yield dict(row)
+
+def iter_sms(limit=500, before=None, tenant_id=None):
+    """
+    Yields newest-first SMS queue rows one at a time (for streamed dashboard rendering).
+    Rows are yielded as-is (key access, no per-row dict) - the template reads columns by name.
+    Keyset pagination: pass the last row's created_at as `before` to get the next page.
+    The connection stays open until the generator is exhausted or closed.
+    """
+    query = "SELECT * FROM sms_queue WHERE 1=1"
+    params = []
+    if before:
+        query += " AND created_at < ?"
+        params.append(before)
+    if tenant_id:
+        query += " AND tenant_id = ?"
+        params.append(tenant_id)
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+    
+    conn = get_db_connection()
+    try:
+        yield from conn.execute(query, params)
     finally:
-        if conn:
-            conn.close()
+        conn.close()
 
-def get_pending_sms():
-    # Deprecated in favor of claim_pending_sms for workers
-    # But useful for non-mutating checks
-    conn = get_db_connection()
-    msgs = conn.execute("SELECT * FROM sms_queue WHERE status = 'pending'").fetchall()
-    conn.close()
-    return [dict(ix) for ix in msgs]
+def get_dashboard_stats(tenant_id=None):
+    """
+    Dashboard counters computed in a single aggregate query
+    (instead of pulling the queue into Python and scanning bodies).
+    """
+    query = """
+        SELECT
+            COALESCE(SUM(CASE WHEN LOWER(body) LIKE ? THEN 1 ELSE 0 END), 0) AS missed_calls,
+            COALESCE(SUM(CASE WHEN LOWER(body) LIKE ? THEN 1 ELSE 0 END), 0) AS reminders,
+            COALESCE(SUM(CASE WHEN status LIKE ? THEN 1 ELSE 0 END), 0) AS errors,
+            COUNT(*) AS total
+        FROM sms_queue
+    """
+    params = ['%wrapped up%', '%scheduled%', '%failed%']
+    if tenant_id:
+        query += " WHERE tenant_id = ?"
+        params.append(tenant_id)
 
-def get_all_sms():
-    conn = get_db_connection()
-    # Return reverse chronological for dashboard
-    msgs = conn.execute("SELECT * FROM sms_queue ORDER BY created_at DESC LIMIT 100").fetchall()
-    conn.close()
-    
-    # Convert 'to_number' to 'to' to match old interface if needed, or update consumers
-    return [dict(ix) for ix in msgs]
+    with read_conn() as conn:
+        row = conn.execute(query, params).fetchone()
+
+    if not row:
+        return {"missed_calls": 0, "reminders": 0, "errors": 0, "total": 0}
+    return {"missed_calls": row['missed_calls'], "reminders": row['reminders'], "errors": row['errors'], "total": row['total']}
 
 def get_sms_since(start_date_iso, tenant_id=None):
-    """Fetch all messages since a specific date (for reports)"""
-    conn = get_db_connection()
-    if tenant_id:
-        msgs = conn.execute(
-            "SELECT * FROM sms_queue WHERE created_at >= ? AND tenant_id = ? ORDER BY created_at ASC", 
-            (start_date_iso, tenant_id)
-        ).fetchall()
-    else:
-        msgs = conn.execute(
+    """Fetch all messages since a specific date (for reports). Returns rows (key access)."""
+    with read_conn() as conn:
+        if tenant_id:
+            return conn.execute(
+                "SELECT * FROM sms_queue WHERE created_at >= ? AND tenant_id = ? ORDER BY created_at ASC", 
+                (start_date_iso, tenant_id)
+            ).fetchall()
+        return conn.execute(
             "SELECT * FROM sms_queue WHERE created_at >= ? ORDER BY created_at ASC", 
             (start_date_iso,)
         ).fetchall()
-    conn.close()
-    return [dict(ix) for ix in msgs]
 
 def get_recent_conversation_logs(limit=20, tenant_id=None):
     """
@@ -871,22 +1164,24 @@ def get_recent_conversation_logs(limit=20, tenant_id=None):
     finally:
         conn.close()
 
+@_retry_busy
 def update_sms_status(msg_id, status, attempts, last_attempt=None, sent_at=None):
-    conn = get_db_connection()
-    if sent_at:
-        conn.execute("""
-            UPDATE sms_queue 
-            SET status = ?, attempts = ?, last_attempt = ?, sent_at = ?
-            WHERE id = ?
-        """, (status, attempts, last_attempt, sent_at, msg_id))
-    else:
-        conn.execute("""
-            UPDATE sms_queue 
-            SET status = ?, attempts = ?, last_attempt = ?
-            WHERE id = ?
-        """, (status, attempts, last_attempt, msg_id))
-    conn.commit()
-    conn.close()
+    with write_conn() as conn:
+        conn.execute(SQL_UPDATE_SMS_STATUS, (status, attempts, last_attempt, sent_at or None, msg_id))
+
+@_retry_busy
+def finalize_send_attempt(msg_id, success, max_retries, twilio_message_sid=None, now=None):
+    """
+    Records one send attempt with a single UPDATE: 'sent' (+ sent_at, MessageSid) on
+    success; otherwise attempts+1 and either 'pending' with next_attempt_at pushed back,
+    or 'failed_permanent' once attempts reach max_retries.
+    """
+    now = now or datetime.now()
+    with write_conn() as conn:
+        if success:
+            conn.execute(SQL_FINALIZE_SENT, (now.isoformat(), twilio_message_sid, msg_id))
+        else:
+            conn.execute(SQL_FINALIZE_FAILED, (now.isoformat(), max_retries, int(now.timestamp()), msg_id))
 
 def update_sms_status_by_message_sid(twilio_message_sid, status):
     """
@@ -1036,14 +1331,38 @@ def cancel_pending_sms(external_id_pattern: str) -> bool:
     finally:
         conn.close()
 
-def archive_old_sms(days=30):
+# Queue states that will never be claimed again
+ARCHIVE_STATUSES = ('sent', 'delivered', 'failed', 'failed_permanent', 'failed_optout', 'cancelled')
+
+def archive_old_sms(days=30, vacuum_pages=1000):
     """
-    Optional: Archiving logic for old messages to keep DB lightweight.
+    Moves finished messages older than `days` into sms_queue_archive, keeping the
+    live queue (and claim_pending_sms) small, then returns up to `vacuum_pages`
+    freed pages to the OS. Returns the number of rows archived.
     """
-    pass
+    if not _sqlite_path():
+        return 0  # SQLite-only (archive table is created by init_db)
+    
+    from datetime import timedelta
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    where = f"created_at < ? AND status IN ({', '.join('?' * len(ARCHIVE_STATUSES))})"
+    params = (cutoff, *ARCHIVE_STATUSES)
+    
+    with write_conn() as conn:
+        cols = ", ".join(r[0] for r in conn.execute("SELECT name FROM pragma_table_info('sms_queue_archive')"))
+        conn.execute(f"INSERT INTO sms_queue_archive ({cols}) SELECT {cols} FROM sms_queue WHERE {where}", params)
+        moved = conn.execute(f"DELETE FROM sms_queue WHERE {where}", params).rowcount
+    
+    if moved:
+        with write_conn() as conn:
+            # Row-returning pragma: must be stepped to completion to free every page
+            conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+        logger.info(f"🗄️ Archived {moved} SMS older than {days} days")
+    return moved
 
 # --- LEAD MANAGEMENT ---
 
+@_retry_busy
 def create_or_update_lead(phone, tenant_id=None, source="call", bypass_check=False, name=None):
     """
     Creates a new lead linked to a specific tenant.
@@ -1054,94 +1373,100 @@ def create_or_update_lead(phone, tenant_id=None, source="call", bypass_check=Fal
         tenant_id: Optional tenant ID
         source: Source of the lead (e.g., "call", "website_form")
         bypass_check: If False, logs a warning that add_client.py should be used for compliance.
-                      If True, allows direct calls (for inbound calls, webhooks, etc.)
+                      System callers (inbound calls, webhooks, add_client.py) pass True explicitly.
         name: Optional name for the lead (e.g., caller name from CNAM lookup)
     """
     # Compliance warning: Direct calls should use add_client.py for proper consent tracking
+    # (a plain flag - no caller frame introspection on the hot path)
     if not bypass_check:
-        import traceback
-        import sys
-        # Check if called from add_client.py (skip warning if so)
-        frame = sys._getframe(1)
-        caller_file = frame.f_code.co_filename if frame else ""
-        if "add_client.py" not in caller_file:
-            logger.warning(f"⚠️  WARNING: Direct lead creation detected. Use 'add_client.py' for compliance (consent proof required). Phone: {phone}")
+        logger.warning(f"⚠️  WARNING: Direct lead creation detected. Use 'add_client.py' for compliance (consent proof required). Phone: {phone}")
     
     conn = get_db_connection()
     if not conn:
         raise Exception("Failed to get database connection")
     
-    now = datetime.now().isoformat()
-    
     try:
         # Use transaction to prevent race conditions
         conn.execute("BEGIN IMMEDIATE")
-        
-        # Check if exists FOR THIS TENANT (within transaction)
-        if tenant_id:
-            row = conn.execute("SELECT id, status FROM leads WHERE phone = ? AND tenant_id = ?", (phone, tenant_id)).fetchone()
-        else:
-            row = conn.execute("SELECT id, status FROM leads WHERE phone = ?", (phone,)).fetchone()
-        
-        if row:
-            lead_id = row['id']
-            current_status = row['status']
-            # Update last_contact
-            conn.execute("UPDATE leads SET last_contact_at = ? WHERE id = ?", (now, lead_id))
-            conn.commit()
-            return lead_id, current_status
-        else:
-            lead_id = str(uuid.uuid4())
-            
-            # SAFETY CHECK: Inherit Opt-Out Status from Global History
-            # If this user opted out previously (even under a different tenant), 
-            # we respect that globally to avoid spam lawsuits.
-            is_blocked = check_opt_out_status(phone)
-            initial_opt_out_val = 1 if is_blocked else 0
-            
-            # Insert with name if provided
-            if name:
-                conn.execute("""
-                    INSERT INTO leads (id, tenant_id, phone, name, status, created_at, last_contact_at, opt_out)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (lead_id, tenant_id, phone, name, 'new', now, now, initial_opt_out_val))
-            else:
-                conn.execute("""
-                    INSERT INTO leads (id, tenant_id, phone, status, created_at, last_contact_at, opt_out)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (lead_id, tenant_id, phone, 'new', now, now, initial_opt_out_val))
-            conn.commit()
-            logger.info(f"🌟 New Lead Created: {phone} (Tenant: {tenant_id}) OptOut={initial_opt_out_val}")
-            return lead_id, 'new'
+        lead_id, status = _upsert_lead_in_txn(conn, phone, tenant_id, name)
+        conn.commit()
+        return lead_id, status
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         conn.close()
 
+def _upsert_lead_in_txn(conn, phone, tenant_id=None, name=None, now=None):
+    """
+    Lead get-or-create on an open connection. The caller owns the transaction
+    (BEGIN IMMEDIATE ... commit/rollback) and may pass its own ISO `now`.
+    Returns (lead_id, status).
+    """
+    now = now or datetime.now().isoformat()
+    
+    # Tenant-scoped leads: one upsert on idx_leads_phone_tenant. (NULL tenant_ids never
+    # conflict in a unique index, so tenant-less calls keep the lookup-then-insert path.)
+    if tenant_id and _HAS_RETURNING:
+        # SAFETY CHECK: a new lead inherits a global opt-out (same rule as check_opt_out_status)
+        row = conn.execute("""
+            INSERT INTO leads (id, tenant_id, phone, name, status, created_at, last_contact_at, opt_out)
+            VALUES (?, ?, ?, ?, 'new', ?, ?,
+                    CASE WHEN EXISTS (SELECT 1 FROM leads WHERE phone_norm = ? AND opt_out = 1) THEN 1 ELSE 0 END)
+            ON CONFLICT(phone, tenant_id) DO UPDATE SET last_contact_at = excluded.last_contact_at
+            RETURNING id, status, created_at, opt_out
+        """, (str(uuid.uuid4()), tenant_id, phone, name, now, now, _norm_phone(phone))).fetchone()
+        if row['created_at'] == now:
+            logger.info(f"🌟 New Lead Created: {phone} (Tenant: {tenant_id}) OptOut={row['opt_out']}")
+        return row['id'], row['status']
+    
+    # Check if exists FOR THIS TENANT (within transaction)
+    if tenant_id:
+        row = conn.execute("SELECT id, status FROM leads WHERE phone = ? AND tenant_id = ?", (phone, tenant_id)).fetchone()
+    else:
+        row = conn.execute("SELECT id, status FROM leads WHERE phone = ?", (phone,)).fetchone()
+    
+    if row:
+        lead_id = row['id']
+        # Update last_contact
+        conn.execute("UPDATE leads SET last_contact_at = ? WHERE id = ?", (now, lead_id))
+        return lead_id, row['status']
+    
+    lead_id = str(uuid.uuid4())
+    
+    # SAFETY CHECK: Inherit Opt-Out Status from Global History
+    # If this user opted out previously (even under a different tenant), 
+    # we respect that globally to avoid spam lawsuits.
+    # (Same query as check_opt_out_status, on this connection.)
+    is_blocked = conn.execute("SELECT 1 FROM leads WHERE phone_norm = ? AND opt_out = 1 LIMIT 1", (_norm_phone(phone),)).fetchone()
+    initial_opt_out_val = 1 if is_blocked else 0
+    
+    conn.execute("""
+        INSERT INTO leads (id, tenant_id, phone, name, status, created_at, last_contact_at, opt_out)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (lead_id, tenant_id, phone, name, 'new', now, now, initial_opt_out_val))
+    logger.info(f"🌟 New Lead Created: {phone} (Tenant: {tenant_id}) OptOut={initial_opt_out_val}")
+    return lead_id, 'new'
+
 def get_lead_by_phone(phone, tenant_id):
     """Retrieves full lead details, including name if linked to a job."""
-    conn = get_db_connection()
-    # 1. Try to find name from JOBS table first (Most accurate)
-    # We join or just query jobs for this phone
-    job_row = conn.execute("""
-        SELECT customer_name FROM jobs 
-        WHERE customer_phone = ? AND tenant_id = ? 
-        ORDER BY job_date DESC LIMIT 1
-    """, (phone, tenant_id)).fetchone()
-    
-    lead_row = conn.execute("SELECT * FROM leads WHERE phone = ? AND tenant_id = ?", (phone, tenant_id)).fetchone()
-    conn.close()
+    # One round-trip: the latest job's customer name (most accurate) rides along
+    # as a correlated subquery served by idx_jobs_phone_tenant_date
+    with read_conn() as conn:
+        lead_row = conn.execute("""
+            SELECT l.*, (
+                SELECT j.customer_name FROM jobs j
+                WHERE j.customer_phone = l.phone AND j.tenant_id = l.tenant_id
+                ORDER BY j.job_date DESC LIMIT 1
+            ) AS job_name
+            FROM leads l WHERE l.phone = ? AND l.tenant_id = ? LIMIT 1
+        """, (phone, tenant_id)).fetchone()
     
     if not lead_row:
         return None
         
     lead = dict(lead_row)
-    if job_row and job_row['customer_name']:
-         lead['name'] = job_row['customer_name']
-    else:
-         lead['name'] = "Unknown"
-         
+    lead['name'] = lead.pop('job_name', None) or "Unknown"
     return lead
 
 def update_lead_status(phone, new_status, tenant_id=None):
@@ -1153,12 +1478,13 @@ def update_lead_status(phone, new_status, tenant_id=None):
     if not conn:
         return False
     
+    phone_norm = _norm_phone(phone)
     try:
         # Build query with tenant_id if provided
         if tenant_id:
-            row = conn.execute("SELECT status, opt_out FROM leads WHERE phone = ? AND tenant_id = ?", (phone, tenant_id)).fetchone()
+            row = conn.execute("SELECT status, opt_out FROM leads WHERE phone_norm = ? AND tenant_id = ?", (phone_norm, tenant_id)).fetchone()
         else:
-            row = conn.execute("SELECT status, opt_out FROM leads WHERE phone = ?", (phone,)).fetchone()
+            row = conn.execute("SELECT status, opt_out FROM leads WHERE phone_norm = ?", (phone_norm,)).fetchone()
         
         if not row:
             return False
@@ -1176,9 +1502,9 @@ def update_lead_status(phone, new_status, tenant_id=None):
         
         # Update with tenant_id if provided
         if tenant_id:
-            conn.execute("UPDATE leads SET status = ? WHERE phone = ? AND tenant_id = ?", (new_status, phone, tenant_id))
+            conn.execute("UPDATE leads SET status = ? WHERE phone_norm = ? AND tenant_id = ?", (new_status, phone_norm, tenant_id))
         else:
-            conn.execute("UPDATE leads SET status = ? WHERE phone = ?", (new_status, phone))
+            conn.execute("UPDATE leads SET status = ? WHERE phone_norm = ?", (new_status, phone_norm))
         conn.commit()
         return True
     finally:
@@ -1209,6 +1535,7 @@ def update_lead_intent(phone, intent, tenant_id=None):
         conn.close()
 
 
+@_retry_busy
 def set_opt_out(phone, is_opt_out=True):
     """
     Sets opt-out status. PERMANENT: Once opted out, cannot be overridden by mistake.
@@ -1216,21 +1543,18 @@ def set_opt_out(phone, is_opt_out=True):
     """
     val = 1 if is_opt_out else 0
     create_or_update_lead(phone, bypass_check=True) # Ensure exists (system call)
-    conn = get_db_connection()
-    
-    # PERMANENT: If already opted out, don't allow override unless explicitly setting to False
-    # This prevents accidental re-subscription
-    if is_opt_out:
-        # Setting to opt-out: PERMANENT - update all leads for this phone across all tenants
-        conn.execute("UPDATE leads SET opt_out = 1 WHERE phone = ?", (phone,))
-        # Also cancel any pending messages in queue
-        conn.execute("UPDATE sms_queue SET status = 'failed_optout' WHERE to_number = ? AND status IN ('pending', 'processing')", (phone,))
-    else:
-        # Only allow opt-in if explicitly requested (for START/UNSTOP commands)
-        conn.execute("UPDATE leads SET opt_out = 0 WHERE phone = ?", (phone,))
     
-    conn.commit()
-    conn.close()
+    with write_conn() as conn:
+        # PERMANENT: If already opted out, don't allow override unless explicitly setting to False
+        # This prevents accidental re-subscription
+        if is_opt_out:
+            # Setting to opt-out: PERMANENT - update all leads for this phone across all tenants
+            conn.execute("UPDATE leads SET opt_out = 1 WHERE phone_norm = ?", (_norm_phone(phone),))
+            # Also cancel any pending messages in queue
+            conn.execute("UPDATE sms_queue SET status = 'failed_optout' WHERE to_number = ? AND status IN ('pending', 'processing')", (phone,))
+        else:
+            # Only allow opt-in if explicitly requested (for START/UNSTOP commands)
+            conn.execute("UPDATE leads SET opt_out = 0 WHERE phone_norm = ?", (_norm_phone(phone),))
     logger.info(f"🚫 Opt-Out Set for {phone}: {is_opt_out} (PERMANENT)")
 
 def check_opt_out_status(phone):
@@ -1241,33 +1565,45 @@ def check_opt_out_status(phone):
     """
     if not phone:
         return False
-    conn = get_db_connection()
-    # Check for ANY opt-out across all tenants (global opt-out)
-    row = conn.execute("SELECT 1 FROM leads WHERE phone = ? AND opt_out = 1 LIMIT 1", (phone,)).fetchone()
-    conn.close()
+    with read_conn() as conn:
+        # Check for ANY opt-out across all tenants (global opt-out)
+        row = conn.execute("SELECT 1 FROM leads WHERE phone_norm = ? AND opt_out = 1 LIMIT 1", (_norm_phone(phone),)).fetchone()
     return bool(row)
 
+def get_opted_out_phones(phones):
+    """
+    Batch form of check_opt_out_status: returns the subset of `phones` that are
+    opted out in ANY tenant, with one indexed query for the whole batch.
+    """
+    by_norm = {}
+    for phone in phones:
+        if phone:
+            by_norm.setdefault(_norm_phone(phone), []).append(phone)
+    if not by_norm:
+        return set()
+    placeholders = ", ".join("?" * len(by_norm))
+    with read_conn() as conn:
+        rows = conn.execute(
+            f"SELECT DISTINCT phone_norm FROM leads WHERE opt_out = 1 AND phone_norm IN ({placeholders})",
+            tuple(by_norm)
+        ).fetchall()
+    return {phone for row in rows for phone in by_norm[row[0]]}
+
+@_retry_busy
 def log_conversation_event(phone, direction, body, external_id=None, tenant_id=None):
     """
     Logs a message (inbound/outbound) attached to the lead.
     """
-    # Ensure lead exists first (system call)
-    lead_id, _ = create_or_update_lead(phone, tenant_id, bypass_check=True)
-    
-    conn = get_db_connection()
     log_id = str(uuid.uuid4())
     now = datetime.now().isoformat()
     
-    try:
-        conn.execute("""
-            INSERT INTO conversation_logs (id, tenant_id, lead_id, direction, body, external_id, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (log_id, tenant_id, lead_id, direction, body, external_id, now))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        pass # Duplicate log event
-    finally:
-        conn.close()
+    # Lead upsert + log insert share one writer transaction
+    with write_conn() as conn:
+        lead_id, _ = _upsert_lead_in_txn(conn, phone, tenant_id, now=now)
+        # Duplicate log events are ignored
+        conn.execute(SQL_INSERT_CONVERSATION_LOG, (log_id, tenant_id, lead_id, direction, body, external_id, now))
+
+FUNNEL_STATUSES = ("new", "contacted", "replied", "booked", "lost")
 
 def get_lead_funnel_stats(tenant_id=None, start_date=None, end_date=None):
     """
@@ -1280,43 +1616,30 @@ def get_lead_funnel_stats(tenant_id=None, start_date=None, end_date=None):
         start_date: Optional ISO date string to filter leads created on or after this date
         end_date: Optional ISO date string to filter leads created on or before this date
     """
-    conn = get_db_connection()
-    if not conn:
-        return {"new": 0, "contacted": 0, "replied": 0, "booked": 0, "lost": 0, "total": 0}
+    # Build query with optional filters
+    base_query = "SELECT status, COUNT(*) as count FROM leads WHERE 1=1"
+    params = []
     
-    try:
-        # Build query with optional filters
-        base_query = "SELECT status, COUNT(*) as count FROM leads WHERE 1=1"
-        params = []
-        
-        if tenant_id:
-            base_query += " AND tenant_id = ?"
-            params.append(tenant_id)
-        
-        if start_date:
-            base_query += " AND created_at >= ?"
-            params.append(start_date)
-        
-        if end_date:
-            base_query += " AND created_at <= ?"
-            params.append(end_date)
-        
-        base_query += " GROUP BY status"
-        
+    if tenant_id:
+        base_query += " AND tenant_id = ?"
+        params.append(tenant_id)
+    
+    if start_date:
+        base_query += " AND created_at >= ?"
+        params.append(start_date)
+    
+    if end_date:
+        base_query += " AND created_at <= ?"
+        params.append(end_date)
+    
+    base_query += " GROUP BY status"
+    
+    with read_conn() as conn:
         rows = conn.execute(base_query, params).fetchall()
-    finally:
-        conn.close()
     
-    stats = {
-        "new": 0, "contacted": 0, "replied": 0, "booked": 0, "lost": 0 
-    }
-    total = 0
-    for r in rows:
-        s = r['status']
-        c = r['count']
-        stats[s] = c
-        total += c
-    stats['total'] = total
+    stats = dict.fromkeys(FUNNEL_STATUSES, 0)
+    stats.update((r['status'], r['count']) for r in rows)
+    stats['total'] = sum(stats.values())
     return stats
 
 def get_revenue_stats(tenant_id=None, start_date=None, end_date=None):
@@ -1444,7 +1767,6 @@ def record_consent(phone, consent_type, consent_source, tenant_id=None,
     # Ensure lead exists (system call)
     lead_id, _ = create_or_update_lead(phone, tenant_id=tenant_id, bypass_check=True)
     
-    conn = get_db_connection()
     consent_id = str(uuid.uuid4())
     now = datetime.now()
     consented_at = now.isoformat()
@@ -1460,21 +1782,68 @@ def record_consent(phone, consent_type, consent_source, tenant_id=None,
     metadata_json = json.dumps(metadata) if metadata else None
     
     try:
-        conn.execute("""
-            INSERT INTO consent_records 
-            (id, lead_id, tenant_id, phone, consent_type, consent_source, 
-             ip_address, user_agent, form_url, consent_text, 
-             consented_at, expires_at, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (consent_id, lead_id, tenant_id, phone, consent_type, consent_source,
-              ip_address, user_agent, form_url, consent_text,
-              consented_at, expires_at, metadata_json))
-        conn.commit()
+        _insert_consent_row((consent_id, lead_id, tenant_id, phone, consent_type, consent_source,
+                             ip_address, user_agent, form_url, consent_text,
+                             consented_at, expires_at, metadata_json))
         logger.info(f"✅ CASL Consent Recorded: {phone} ({consent_type}/{consent_source})")
         return consent_id
     except Exception as e:
         logger.warning(f"⚠️ Failed to record consent: {e}")
         return None
+
+@_retry_busy
+def _insert_consent_row(params):
+    with write_conn() as conn:
+        conn.execute(SQL_INSERT_CONSENT, params)
+
+def _insert_consent_in_txn(conn, lead_id, phone, consent_type, consent_source, tenant_id=None,
+                           ip_address=None, user_agent=None, form_url=None,
+                           consent_text=None, metadata=None):
+    """Consent insert on an open connection (caller commits). Returns consent_id."""
+    from datetime import timedelta
+    
+    consent_id = str(uuid.uuid4())
+    now = datetime.now()
+    
+    # CASL: Implied consent expires after 2 years; express consent does not expire unless revoked
+    expires_at = (now + timedelta(days=730)).isoformat() if consent_type == 'implied' else None
+    metadata_json = json.dumps(metadata) if metadata else None
+    
+    conn.execute("""
+        INSERT INTO consent_records 
+        (id, lead_id, tenant_id, phone, consent_type, consent_source, 
+         ip_address, user_agent, form_url, consent_text, 
+         consented_at, expires_at, metadata)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (consent_id, lead_id, tenant_id, phone, consent_type, consent_source,
+          ip_address, user_agent, form_url, consent_text,
+          now.isoformat(), expires_at, metadata_json))
+    return consent_id
+
+def upsert_lead_with_consent(phone, tenant_id=None, source="call", consent_type='implied',
+                             consent_source='inbound_call', metadata=None, name=None):
+    """
+    Creates/touches the lead AND records CASL consent in ONE transaction
+    (replaces create_or_update_lead() + record_consent(), which took three
+    connections and commits because record_consent re-upserts the lead).
+    
+    Returns (lead_id, lead_status, consent_id). Raises on DB failure (nothing is written).
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise Exception("Failed to get database connection")
+    
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        lead_id, status = _upsert_lead_in_txn(conn, phone, tenant_id, name)
+        consent_id = _insert_consent_in_txn(conn, lead_id, phone, consent_type, consent_source,
+                                            tenant_id=tenant_id, metadata=metadata)
+        conn.commit()
+        logger.info(f"✅ CASL Consent Recorded: {phone} ({consent_type}/{consent_source})")
+        return lead_id, status, consent_id
+    except Exception as e:
+        conn.rollback()
+        raise e
     finally:
         conn.close()
 
@@ -1492,33 +1861,31 @@ def verify_valid_consent(phone, tenant_id=None):
         dict: {'has_consent': bool, 'consent_type': str, 'consent_source': str, 'consented_at': str}
               or None if no valid consent exists
     """
-    conn = get_db_connection()
     now = datetime.now().isoformat()
     
     # Query for valid consent: not revoked AND (no expiry OR expiry > now)
-    if tenant_id:
-        row = conn.execute("""
-            SELECT consent_type, consent_source, consented_at, expires_at 
-            FROM consent_records 
-            WHERE phone = ? 
-              AND tenant_id = ?
-              AND revoked_at IS NULL 
-              AND (expires_at IS NULL OR expires_at > ?)
-            ORDER BY consented_at DESC
-            LIMIT 1
-        """, (phone, tenant_id, now)).fetchone()
-    else:
-        row = conn.execute("""
-            SELECT consent_type, consent_source, consented_at, expires_at 
-            FROM consent_records 
-            WHERE phone = ? 
-              AND revoked_at IS NULL 
-              AND (expires_at IS NULL OR expires_at > ?)
-            ORDER BY consented_at DESC
-            LIMIT 1
-        """, (phone, now)).fetchone()
-    
-    conn.close()
+    with read_conn() as conn:
+        if tenant_id:
+            row = conn.execute("""
+                SELECT consent_type, consent_source, consented_at, expires_at 
+                FROM consent_records 
+                WHERE phone = ? 
+                  AND tenant_id = ?
+                  AND revoked_at IS NULL 
+                  AND (expires_at IS NULL OR expires_at > ?)
+                ORDER BY consented_at DESC
+                LIMIT 1
+            """, (phone, tenant_id, now)).fetchone()
+        else:
+            row = conn.execute("""
+                SELECT consent_type, consent_source, consented_at, expires_at 
+                FROM consent_records 
+                WHERE phone = ? 
+                  AND revoked_at IS NULL 
+                  AND (expires_at IS NULL OR expires_at > ?)
+                ORDER BY consented_at DESC
+                LIMIT 1
+            """, (phone, now)).fetchone()
     
     if row:
         return {
@@ -1531,6 +1898,49 @@ def verify_valid_consent(phone, tenant_id=None):
     return None
 
 
+def get_messaging_gate(phone, tenant_id=None):
+    """
+    Pre-send compliance gate in ONE query: global opt-out (same rule as
+    check_opt_out_status) plus the newest valid consent (same rule as
+    verify_valid_consent).
+    
+    Returns:
+        dict: {'opted_out': bool, 'consent': verify_valid_consent()-shaped dict or None}
+    """
+    now = datetime.now().isoformat()
+    tenant_filter = "AND tenant_id = ?" if tenant_id else ""
+    params = [_norm_phone(phone), phone, *([tenant_id] if tenant_id else []), now]
+    
+    with read_conn() as conn:
+        row = conn.execute(f"""
+            SELECT
+                EXISTS (SELECT 1 FROM leads WHERE phone_norm = ? AND opt_out = 1) AS opted_out,
+                c.consent_type, c.consent_source, c.consented_at, c.expires_at
+            FROM (SELECT 1 AS one) g
+            LEFT JOIN (
+                SELECT consent_type, consent_source, consented_at, expires_at
+                FROM consent_records
+                WHERE phone = ? {tenant_filter}
+                  AND revoked_at IS NULL
+                  AND (expires_at IS NULL OR expires_at > ?)
+                ORDER BY consented_at DESC
+                LIMIT 1
+            ) c ON TRUE
+        """, params).fetchone()
+    
+    consent = None
+    if row['consent_type'] is not None:
+        consent = {
+            'has_consent': True,
+            'consent_type': row['consent_type'],
+            'consent_source': row['consent_source'],
+            'consented_at': row['consented_at'],
+            'expires_at': row['expires_at']
+        }
+    return {'opted_out': bool(row['opted_out']), 'consent': consent}
+
+
+@_retry_busy
 def revoke_consent(phone, reason='STOP', tenant_id=None):
     """
     Revokes all consent for a phone number (CASL opt-out).
@@ -1543,25 +1953,23 @@ def revoke_consent(phone, reason='STOP', tenant_id=None):
         reason: The opt-out keyword used ('STOP', 'unsubscribe', etc.)
         tenant_id: Optional tenant scope (if None, revokes for all tenants)
     """
-    conn = get_db_connection()
     now = datetime.now().isoformat()
     
-    if tenant_id:
-        conn.execute("""
-            UPDATE consent_records 
-            SET revoked_at = ?, revocation_reason = ?
-            WHERE phone = ? AND tenant_id = ? AND revoked_at IS NULL
-        """, (now, reason, phone, tenant_id))
-    else:
-        # Global revocation (all tenants) - SAFER for CASL
-        conn.execute("""
-            UPDATE consent_records 
-            SET revoked_at = ?, revocation_reason = ?
-            WHERE phone = ? AND revoked_at IS NULL
-        """, (now, reason, phone))
+    with write_conn() as conn:
+        if tenant_id:
+            conn.execute("""
+                UPDATE consent_records 
+                SET revoked_at = ?, revocation_reason = ?
+                WHERE phone = ? AND tenant_id = ? AND revoked_at IS NULL
+            """, (now, reason, phone, tenant_id))
+        else:
+            # Global revocation (all tenants) - SAFER for CASL
+            conn.execute("""
+                UPDATE consent_records 
+                SET revoked_at = ?, revocation_reason = ?
+                WHERE phone = ? AND revoked_at IS NULL
+            """, (now, reason, phone))
     
-    conn.commit()
-    conn.close()
     logger.info(f"🚫 CASL Consent Revoked: {phone} (Reason: {reason})")
 
 
@@ -1575,34 +1983,29 @@ def get_consent_audit_trail(phone, tenant_id=None):
     Returns:
         list of dicts with full consent history
     """
-    conn = get_db_connection()
-    
-    if tenant_id:
-        rows = conn.execute("""
-            SELECT * FROM consent_records 
-            WHERE phone = ? AND tenant_id = ?
-            ORDER BY consented_at ASC
-        """, (phone, tenant_id)).fetchall()
-    else:
-        rows = conn.execute("""
-            SELECT * FROM consent_records 
-            WHERE phone = ?
-            ORDER BY consented_at ASC
-        """, (phone,)).fetchall()
-    
-    conn.close()
-    
-    trail = []
-    for row in rows:
-        record = dict(row)
-        # Parse metadata JSON if present
+    with read_conn() as conn:
+        if tenant_id:
+            rows = conn.execute("""
+                SELECT * FROM consent_records 
+                WHERE phone = ? AND tenant_id = ?
+                ORDER BY consented_at ASC
+            """, (phone, tenant_id)).fetchall()
+        else:
+            rows = conn.execute("""
+                SELECT * FROM consent_records 
+                WHERE phone = ?
+                ORDER BY consented_at ASC
+            """, (phone,)).fetchall()
+    
+    trail = [dict(row) for row in rows]
+    for record in trail:
+        # Parse metadata JSON if present (orjson/json decode errors are ValueErrors)
         if record.get('metadata'):
             try:
-                record['metadata'] = json.loads(record['metadata'])
-            except:
+                record['metadata'] = _loads(record['metadata'])
+            except ValueError:
                 pass
-        trail.append(record)
-    
+
     return trail
 
 
@@ -1616,18 +2019,28 @@ def check_webhook_processed(provider_id):
     if not provider_id:
         return False, None
     
-    conn = get_db_connection()
-    try:
+    # Fast path: Twilio retries usually land on the worker that just processed the SID
+    is_duplicate, internal_id = seen_webhooks.get(provider_id)
+    if is_duplicate:
+        return True, internal_id
+    
+    # Then the cross-worker Redis set (one round trip, no DB read on retry storms)
+    is_duplicate, internal_id = shared_seen_get(provider_id)
+    if is_duplicate:
+        seen_webhooks.add(provider_id, internal_id)
+        return True, internal_id
+    
+    with read_conn() as conn:
         row = conn.execute(
             "SELECT id, internal_id FROM webhook_events WHERE provider_id = ? LIMIT 1",
             (provider_id,)
         ).fetchone()
-        if row:
-            return True, row['internal_id']
-        return False, None
-    finally:
-        conn.close()
+    if row:
+        seen_webhooks.add(provider_id, row['internal_id'])
+        return True, row['internal_id']
+    return False, None
 
+@_retry_busy
 def record_webhook_processed(provider_id, webhook_type, tenant_id=None, internal_id=None):
     """
     Records that a webhook was processed to prevent duplicate handling.
@@ -1639,70 +2052,62 @@ def record_webhook_processed(provider_id, webhook_type, tenant_id=None, internal
         internal_id: Our internal message/event ID
     
     Returns:
-        True if recorded, False if duplicate (already exists)
+        True if recorded, False if duplicate (already exists). Concurrent deliveries
+        of the same provider_id race on the unique index: exactly one gets True.
     """
     if not provider_id:
         return False
     
-    conn = get_db_connection()
-    try:
-        webhook_id = str(uuid.uuid4())
-        processed_at = datetime.now().isoformat()
-        
-        conn.execute("""
+    # Row id is internal only (dedup goes through provider_id): 32 random hex chars,
+    # no UUID object or dashed formatting per inbound webhook
+    webhook_id = os.urandom(16).hex()
+    processed_at = datetime.now().isoformat()
+    
+    with write_conn() as conn:
+        cur = conn.execute("""
             INSERT INTO webhook_events (id, provider_id, webhook_type, tenant_id, processed_at, internal_id)
             VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(provider_id) DO NOTHING
         """, (webhook_id, provider_id, webhook_type, tenant_id, processed_at, internal_id))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
+    if cur.rowcount == 0:
         # Duplicate provider_id - already processed
         return False
-    finally:
-        conn.close()
+    seen_webhooks.add(provider_id, internal_id)
+    shared_seen_add(provider_id, internal_id)
+    return True
 
 def get_consent_stats(tenant_id=None):
     """
     Returns consent statistics for reporting.
     
-    Useful for compliance dashboards.
+    Useful for compliance dashboards. One pass over consent_records
+    (conditional aggregation) instead of one COUNT(*) per figure.
     """
-    conn = get_db_connection()
     now = datetime.now().isoformat()
     
-    if tenant_id:
-        base_query = "FROM consent_records WHERE tenant_id = ?"
-        params = (tenant_id,)
-    else:
-        base_query = "FROM consent_records WHERE 1=1"
-        params = ()
-    
-    # Total consents
-    total = conn.execute(f"SELECT COUNT(*) {base_query}", params).fetchone()[0]
-    
-    # Active consents (not expired, not revoked)
-    active_query = f"""
-        SELECT COUNT(*) {base_query} 
-        AND revoked_at IS NULL 
-        AND (expires_at IS NULL OR expires_at > ?)
+    query = """
+        SELECT
+            COUNT(*) AS total,
+            COALESCE(SUM(CASE WHEN revoked_at IS NULL AND (expires_at IS NULL OR expires_at > ?) THEN 1 ELSE 0 END), 0) AS active,
+            COALESCE(SUM(CASE WHEN revoked_at IS NOT NULL THEN 1 ELSE 0 END), 0) AS revoked,
+            COALESCE(SUM(CASE WHEN consent_type = 'express' THEN 1 ELSE 0 END), 0) AS express,
+            COALESCE(SUM(CASE WHEN consent_type = 'implied' THEN 1 ELSE 0 END), 0) AS implied
+        FROM consent_records
     """
-    active = conn.execute(active_query, params + (now,)).fetchone()[0]
-    
-    # Revoked consents
-    revoked = conn.execute(f"SELECT COUNT(*) {base_query} AND revoked_at IS NOT NULL", params).fetchone()[0]
-    
-    # By type
-    express = conn.execute(f"SELECT COUNT(*) {base_query} AND consent_type = 'express'", params).fetchone()[0]
-    implied = conn.execute(f"SELECT COUNT(*) {base_query} AND consent_type = 'implied'", params).fetchone()[0]
+    params = [now]
+    if tenant_id:
+        query += " WHERE tenant_id = ?"
+        params.append(tenant_id)
     
-    conn.close()
+    with read_conn() as conn:
+        row = conn.execute(query, params).fetchone()
     
     return {
-        'total_consents': total,
-        'active_consents': active,
-        'revoked_consents': revoked,
-        'express_consents': express,
-        'implied_consents': implied
+        'total_consents': row['total'],
+        'active_consents': row['active'],
+        'revoked_consents': row['revoked'],
+        'express_consents': row['express'],
+        'implied_consents': row['implied']
     }
 
 # Initialize on module load (safe?)
@@ -1715,136 +2120,95 @@ def insert_or_update_alert_buffer(tenant_id, customer_phone, plumber_phone, mess
     """
     Inserts a new alert buffer or updates an existing one.
     Resets the timer to 30s from now on every new message (Debounce).
-    Uses consistent ISO format for timestamps.
+    send_at is stored as unix seconds.
     """
-    conn = get_db_connection()
-    if not conn:
-        return False
-    
     try:
-        # Validate tenant_id exists
-        if tenant_id:
-            tenant_check = conn.execute("SELECT 1 FROM tenants WHERE id = ?", (tenant_id,)).fetchone()
-            if not tenant_check:
-                logger.warning(f"⚠️ Invalid tenant_id {tenant_id} in alert buffer")
-                return False
-        
-        c = conn.cursor()
-        
-        # Check if exists
-        c.execute("SELECT messages_text, message_count FROM alert_buffer WHERE tenant_id = ? AND customer_phone = ?", (tenant_id, customer_phone))
-        row = c.fetchone()
-        
-        from datetime import timedelta
-        # Use ISO format for consistent timestamp comparison
-        send_at = (datetime.now() + timedelta(seconds=30)).isoformat()
-        
-        if row:
-            # Update
-            existing_text = row['messages_text']
-            new_count = row['message_count'] + 1
-            combined_text = f"{existing_text}\n{message_text}"
+        with write_conn() as conn:
+            # Validate tenant_id exists
+            if tenant_id:
+                tenant_check = conn.execute("SELECT 1 FROM tenants WHERE id = ?", (tenant_id,)).fetchone()
+                if not tenant_check:
+                    logger.warning(f"⚠️ Invalid tenant_id {tenant_id} in alert buffer")
+                    return False
             
-            c.execute("""
-                UPDATE alert_buffer 
-                SET messages_text = ?, message_count = ?, send_at = ?
-                WHERE tenant_id = ? AND customer_phone = ?
-            """, (combined_text, new_count, send_at, tenant_id, customer_phone))
-        else:
-            # Insert
-            created_at = datetime.now().isoformat()
-            c.execute("""
+            # send_at is unix seconds (the worker polls it); created_at stays ISO for display
+            now = datetime.now()
+            send_at = int(now.timestamp()) + 30
+            
+            # One upsert on UNIQUE(tenant_id, customer_phone): insert, or append the
+            # text, bump the count and push send_at back - one statement, no read first
+            conn.execute("""
                 INSERT INTO alert_buffer (tenant_id, customer_phone, plumber_phone, messages_text, message_count, send_at, created_at)
                 VALUES (?, ?, ?, ?, 1, ?, ?)
-            """, (tenant_id, customer_phone, plumber_phone, message_text, send_at, created_at))
-            
-        conn.commit()
+                ON CONFLICT(tenant_id, customer_phone) DO UPDATE SET
+                    messages_text = alert_buffer.messages_text || ? || excluded.messages_text,
+                    message_count = alert_buffer.message_count + 1,
+                    send_at = excluded.send_at
+            """, (tenant_id, customer_phone, plumber_phone, message_text, send_at, now.isoformat(), "\n"))
         return True
     except Exception as e:
-        conn.rollback()
         logger.warning(f"⚠️ Error updating alert buffer: {e}")
         return False
-    finally:
-        conn.close()
+
+_ALERT_BUFFER_COLUMNS = ("id", "tenant_id", "customer_phone", "plumber_phone", "messages_text",
+                         "message_count", "send_at", "created_at")
 
 def process_alert_buffer():
     """
     Checks for ready-to-send alerts and queues them.
-    Uses transaction to prevent race conditions and ensure atomicity.
-    """
-    conn = get_db_connection()
-    if not conn:
-        return 0
+    Set-based: the ready rows are drained in one statement and their summaries are
+    inserted into sms_queue with one executemany, all in one writer transaction, so a
+    buffer row is only deleted together with the alert it produced.
     
+    Alerts go to the plumber (internal), so the per-message add_to_queue screening is
+    skipped; an opted-out plumber number is still retired by claim_pending_sms.
+    """
+    cols = ", ".join(_ALERT_BUFFER_COLUMNS)
     try:
-        # Use transaction to prevent race conditions
-        conn.execute("BEGIN IMMEDIATE")
-        
-        c = conn.cursor()
-        
-        # Use consistent ISO format for timestamp comparison
-        now_iso = datetime.now().isoformat()
-        
-        # Fetch ready alerts (use ISO string for consistent comparison)
-        rows = c.execute("SELECT * FROM alert_buffer WHERE send_at <= ?", (now_iso,)).fetchall()
-        
-        if not rows:
-            conn.rollback()  # No work, rollback transaction
-            return 0
-        
-        from execution.utils.sms_engine import add_to_queue
-        
-        processed_count = 0
-        failed_count = 0
-        buffer_ids_to_delete = []
-        
-        for row in rows:
-            buf_id = row['id']
-            tenant_id = row['tenant_id']
-            cust_phone = row['customer_phone']
-            plumber_phone = row['plumber_phone']
-            msg_text = row['messages_text']
-            count = row['message_count']
+        with write_conn() as conn:
+            now = datetime.now()
+            now_ts = int(now.timestamp())
             
-            # Construct Summary Message
-            if count > 1:
-                final_msg = f"🔔 Lead Alert: {cust_phone} sent {count} messages:\n---\n{msg_text}\n---"
+            # Claim ready alerts: DELETE ... RETURNING drains them in one statement
+            if _HAS_RETURNING:
+                rows = conn.execute(f"DELETE FROM alert_buffer WHERE send_at <= ? RETURNING {cols}", (now_ts,)).fetchall()
             else:
-                final_msg = f"🔔 Lead Alert: {cust_phone} says: {msg_text}"
+                rows = conn.execute(f"SELECT {cols} FROM alert_buffer WHERE send_at <= ?", (now_ts,)).fetchall()
+            
+            if not rows:
+                return 0
+            
+            created_at = now.isoformat()
+            queue_rows = []
+            for row in rows:
+                cust_phone = row['customer_phone']
+                msg_text = row['messages_text']
+                count = row['message_count']
+                
+                # Construct Summary Message
+                if count > 1:
+                    final_msg = f"🔔 Lead Alert: {cust_phone} sent {count} messages:\n---\n{msg_text}\n---"
+                else:
+                    final_msg = f"🔔 Lead Alert: {cust_phone} says: {msg_text}"
                 
-            # Queue it - check return value
-            logger.info(f"🚀 Dispatching Buffered Alert to {plumber_phone} (Count: {count})")
-            # Use UUID-based external_id to prevent collisions
-            import uuid
-            external_id = f"buf_{buf_id}_{uuid.uuid4().hex[:8]}"
+                logger.info(f"🚀 Dispatching Buffered Alert to {row['plumber_phone']} (Count: {count})")
+                # Use UUID-based external_id to prevent collisions
+                external_id = f"buf_{row['id']}_{uuid.uuid4().hex[:8]}"
+                queue_rows.append((str(uuid.uuid4()), row['tenant_id'], external_id, row['plumber_phone'],
+                                   final_msg, created_at, None, None))
             
-            queue_success = add_to_queue(plumber_phone, final_msg, external_id=external_id, tenant_id=tenant_id)
+            conn.executemany(SQL_INSERT_SMS_QUEUE, queue_rows)
             
-            if queue_success:
-                # Only delete if queueing succeeded
-                buffer_ids_to_delete.append(buf_id)
-                processed_count += 1
-            else:
-                failed_count += 1
-                logger.warning(f"⚠️ Failed to queue alert buffer {buf_id}, will retry later")
-        
-        # Delete all successfully queued alerts in one operation
-        if buffer_ids_to_delete:
-            placeholders = ','.join(['?'] * len(buffer_ids_to_delete))
-            c.execute(f"DELETE FROM alert_buffer WHERE id IN ({placeholders})", buffer_ids_to_delete)
-        
-        conn.commit()
+            if not _HAS_RETURNING:
+                # Delete the drained alerts in one operation
+                placeholders = ','.join(['?'] * len(rows))
+                conn.execute(f"DELETE FROM alert_buffer WHERE id IN ({placeholders})", [r['id'] for r in rows])
         
-        if failed_count > 0:
-            logger.warning(f"⚠️ {failed_count} alert(s) failed to queue and will be retried")
-        
-        return processed_count
+        return len(rows)
     except Exception as e:
-        conn.rollback()
+        # The transaction rolled back: every buffer row is still there for the next pass
         logger.warning(f"⚠️ Error processing alert buffer: {e}")
         return 0
-    finally:
-        conn.close()
 
 def save_otp(phone, code, valid_minutes=10):
     """
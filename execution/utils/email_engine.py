@@ -1,5 +1,3 @@
-import smtplib
-import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
@@ -7,6 +5,10 @@ import sys
 
 # Import Config
 from execution import config
+from execution.utils.alert_system import smtp_send
+from execution.utils.logger import setup_logger
+
+logger = setup_logger("EmailEngine")
 
 def send_email_report(to_email, subject, body_html):
     """
@@ -17,7 +19,7 @@ def send_email_report(to_email, subject, body_html):
     sender_password = os.getenv("SMTP_PASSWORD")
     
     if not sender_email or not sender_password:
-        print("⚠️  EMAIL NOT SENT: Missing SMTP_EMAIL or SMTP_PASSWORD in env/config.")
+        logger.warning("⚠️  EMAIL NOT SENT: Missing SMTP_EMAIL or SMTP_PASSWORD in env/config.")
         return False
 
     message = MIMEMultipart("alternative")
@@ -43,12 +45,10 @@ def send_email_report(to_email, subject, body_html):
     message.attach(part)
 
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, to_email, message.as_string())
-        print(f"   ✅ Email sent successfully")
+        # Pooled, kept-alive SMTP_SSL session (no TLS handshake + login per report)
+        smtp_send(sender_email, sender_password, to_email, message.as_string())
+        logger.info(f"✅ Email sent successfully: {subject}")
         return True
     except Exception as e:
-        print(f"   ❌ Email Failed: {e}")
+        logger.error(f"❌ Email Failed: {e}")
         return False
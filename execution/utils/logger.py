@@ -1,6 +1,12 @@
+import atexit
+import copy
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import weakref
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from multiprocessing import util as mp_util
 
 # Define Logs Dir
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -9,6 +15,87 @@ os.makedirs(LOG_DIR, exist_ok=True)
 
 APP_LOG_FILE = os.path.join(LOG_DIR, 'plumber_ai.log')
 
+# Request threads only enqueue records; one background listener does the JSON
+# formatting and the file/console writes (keeps disk + stdout I/O off webhooks).
+_log_queue = queue.SimpleQueue()
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+_queue_handlers = weakref.WeakSet()  # re-pointed at a fresh queue after fork
+
+class _InProcessQueueHandler(QueueHandler):
+    """QueueHandler that keeps exc_info for the JSON formatter (records never leave the process)."""
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+def _get_listener():
+    """Builds the shared file + console handlers and starts the listener once per process."""
+    global _listener, _listener_pid
+    with _listener_lock:
+        if _listener is None:
+            from pythonjsonlogger import jsonlogger
+            
+            # 1. File Handler (Rotating: 5 files of 5MB each)
+            file_handler = RotatingFileHandler(APP_LOG_FILE, maxBytes=5*1024*1024, backupCount=5)
+            
+            # JSON Formatter
+            # We include standard fields + allow extras
+            formatter = jsonlogger.JsonFormatter(
+                '%(asctime)s %(levelname)s %(name)s %(message)s %(filename)s %(funcName)s %(lineno)d',
+                rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"},
+                datefmt='%Y-%m-%dT%H:%M:%S%z'
+            )
+            file_handler.setFormatter(formatter)
+            
+            # 2. Console Handler (Keep it simple for human readability, or JSON too?)
+            # Let's keep Console simple for dev, JSON for machine/file.
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(jsonlogger.JsonFormatter('%(asctime)s %(levelname)s %(message)s'))
+            
+            _listener = QueueListener(_log_queue, file_handler, console_handler, respect_handler_level=True)
+            _listener.start()
+            _listener_pid = os.getpid()
+    return _listener
+
+def _stop_listener():
+    """Flushes whatever is still queued on interpreter shutdown (only the process that owns the thread)."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+            _listener = None
+
+atexit.register(_stop_listener)
+
+def _reinit_after_fork():
+    """
+    A forked child (run_app.py's SMS workers / watchdog) inherits the queue but not
+    the listener thread, so nothing would drain it. Give the child its own queue and
+    listener, and re-point every existing logger's handler at them.
+    """
+    global _log_queue, _listener, _listener_pid, _listener_lock
+    had_listener = _listener is not None
+    _log_queue = queue.SimpleQueue()
+    _listener = None
+    _listener_pid = None
+    _listener_lock = threading.Lock()
+    for handler in list(_queue_handlers):
+        handler.queue = _log_queue
+    if had_listener:
+        _get_listener()
+
+def _flush_at_child_exit(_):
+    """multiprocessing children leave via os._exit (atexit never runs): drain the queue from their exit finalizers."""
+    mp_util.Finalize(None, _stop_listener, exitpriority=-100)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+    mp_util.register_after_fork(_stop_listener, _flush_at_child_exit)
+
 def setup_logger(name):
     """
     Sets up a structured logger with rotation.
@@ -19,25 +106,9 @@ def setup_logger(name):
     
     # Avoid duplicate handlers if setup moved multiple times
     if not logger.handlers:
-        from pythonjsonlogger import jsonlogger
-        
-        # 1. File Handler (Rotating: 5 files of 5MB each)
-        file_handler = RotatingFileHandler(APP_LOG_FILE, maxBytes=5*1024*1024, backupCount=5)
-        
-        # JSON Formatter
-        # We include standard fields + allow extras
-        formatter = jsonlogger.JsonFormatter(
-            '%(asctime)s %(levelname)s %(name)s %(message)s %(filename)s %(funcName)s %(lineno)d',
-            rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"},
-            datefmt='%Y-%m-%dT%H:%M:%S%z'
-        )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        
-        # 2. Console Handler (Keep it simple for human readability, or JSON too?)
-        # Let's keep Console simple for dev, JSON for machine/file.
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(jsonlogger.JsonFormatter('%(asctime)s %(levelname)s %(message)s'))
-        logger.addHandler(console_handler)
+        _get_listener()
+        handler = _InProcessQueueHandler(_log_queue)
+        _queue_handlers.add(handler)
+        logger.addHandler(handler)
         
     return logger
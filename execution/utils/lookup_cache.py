@@ -0,0 +1,97 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from execution.utils.logger import setup_logger
+
+logger = setup_logger("LookupCache")
+
+# Twilio Lookup is a blocking HTTPS round trip; callers hear dead air while the
+# /voice webhook waits on it. Line type and CNAM are stable per number, so resolve
+# them in the background and serve repeat callers from an in-process TTL LRU.
+LOOKUP_CACHE_SIZE = 10000
+LOOKUP_CACHE_TTL = 86400  # seconds
+DEFAULT_LOOKUP = {'line_type': 'mobile', 'caller_name': None}
+LOOKUP_WORKERS = 4
+
+# Bounded: a burst of first-time callers queues lookups instead of spawning a thread each
+_LOOKUP_EXECUTOR = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix='lookup')
+
+
+class LineLookupCache:
+    """
+    Bounded TTL LRU of caller number -> {'line_type', 'caller_name'}.
+
+    get() never blocks on Twilio: a miss returns DEFAULT_LOOKUP (assume mobile,
+    so the SMS fallback still fires) and queues one background lookup for the
+    number. Cached dicts are shared between requests: treat them as read-only.
+    """
+
+    def __init__(self, max_size=LOOKUP_CACHE_SIZE, ttl=LOOKUP_CACHE_TTL):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()  # number -> (expires_at, lookup)
+        self._pending = set()          # numbers with a lookup thread in flight
+        self._lock = threading.Lock()
+
+    def peek(self, number):
+        """Returns the cached lookup for number, or None. Never triggers a lookup."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(number)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[number]
+                return None
+            self._entries.move_to_end(number)
+            return entry[1]
+
+    def get(self, number, lookup_fn):
+        """Cached lookup, or DEFAULT_LOOKUP while lookup_fn(number) runs in the background."""
+        if not number:
+            return DEFAULT_LOOKUP
+        cached = self.peek(number)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            if number in self._pending:
+                return DEFAULT_LOOKUP
+            self._pending.add(number)
+
+        def _resolve():
+            try:
+                result = lookup_fn(number)
+                self.add(number, {
+                    'line_type': result.get('line_type') or 'mobile',
+                    'caller_name': result.get('caller_name'),
+                })
+            except Exception as e:
+                # Not cached: the next call for this number retries the lookup
+                logger.warning(f"⚠️ Background lookup failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(number)
+
+        try:
+            _LOOKUP_EXECUTOR.submit(_resolve)
+        except Exception as e:
+            logger.error(f"Failed to queue lookup: {e}")
+            with self._lock:
+                self._pending.discard(number)
+        return DEFAULT_LOOKUP
+
+    def add(self, number, lookup):
+        with self._lock:
+            self._entries[number] = (time.monotonic() + self._ttl, lookup)
+            self._entries.move_to_end(number)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+line_lookups = LineLookupCache()
@@ -0,0 +1,53 @@
+import os
+import time
+import threading
+from execution.utils.logger import setup_logger
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = setup_logger("RedisClient")
+
+# Shared state across gunicorn workers (webhook dedupe, rate limits). Optional and
+# off unless REDIS_URL is set: every caller must treat None as "Redis unavailable"
+# and fall back to the DB / in-process state.
+REDIS_URL = os.getenv('REDIS_URL') or None
+REDIS_SOCKET_TIMEOUT = 0.25  # seconds - a hot-path cache must never stall a webhook
+REDIS_RETRY_INTERVAL = 30  # seconds before reconnecting after a failure
+
+_client = None
+_down_until = 0.0
+_lock = threading.Lock()
+
+
+def get_redis():
+    """Returns a connected (pooled, thread-safe) Redis client, or None if Redis is unavailable."""
+    global _client, _down_until
+    if _client is not None:
+        return _client
+    if redis is None or not REDIS_URL or time.monotonic() < _down_until:
+        return None
+
+    with _lock:
+        if _client is None and time.monotonic() >= _down_until:
+            try:
+                client = redis.from_url(REDIS_URL, socket_timeout=REDIS_SOCKET_TIMEOUT,
+                                        socket_connect_timeout=REDIS_SOCKET_TIMEOUT)
+                client.ping()
+                _client = client
+                logger.info("✅ Redis connected for shared webhook/rate-limit state.")
+            except Exception as e:
+                _down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                logger.warning(f"⚠️ Redis not available ({e}). Using DB/in-process fallbacks.")
+    return _client
+
+
+def mark_redis_down(e):
+    """Drops the client after a failed command; get_redis() reconnects after REDIS_RETRY_INTERVAL."""
+    global _client, _down_until
+    with _lock:
+        _client = None
+        _down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+    logger.warning(f"⚠️ Redis command failed ({e}). Falling back for {REDIS_RETRY_INTERVAL}s.")
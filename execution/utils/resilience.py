@@ -6,6 +6,7 @@ from datetime import datetime
 from execution.utils.logger import setup_logger
 from execution.utils import database
 from execution.utils.alert_system import send_critical_alert
+from execution.utils.tenant_cache import tenant_router
 
 logger = setup_logger("Resilience")
 
@@ -78,10 +79,11 @@ def add_to_webhook_cache(provider_id, internal_id):
 def get_tenant_safe(to_number):
     """
     Safely retrieves a tenant by phone number with fallback logic.
+    Served from the in-process tenant cache (see tenant_cache.py).
     Returns (tenant: dict or None, error: str or None)
     """
     try:
-        tenant = database.get_tenant_by_twilio_number(to_number)
+        tenant = tenant_router.get(to_number)
         if tenant:
             return tenant, None
         return None, f"No tenant found for number {to_number}"
@@ -7,6 +7,7 @@ from flask import request, abort
 from twilio.request_validator import RequestValidator
 from execution import config
 from execution.utils.logger import setup_logger
+from execution.utils.redis_client import REDIS_URL, get_redis, mark_redis_down
 
 logger = setup_logger("Security")
 
@@ -56,8 +57,36 @@ def check_rate_limit():
 _tenant_records = {}
 TENANT_RATE_LIMIT = 20 # Max calls/sms per minute per tenant
 
+# Per-minute counter shared by all workers: INCR + EXPIRE in one atomic round trip
+_TENANT_RATE_LUA = """
+local n = redis.call('INCR', KEYS[1])
+if n == 1 then redis.call('EXPIRE', KEYS[1], ARGV[1]) end
+return n
+"""
+_tenant_rate_script = None  # (client, Script) - EVALSHA, re-loaded automatically on NOSCRIPT
+
+def _redis_tenant_count(client, tenant_id, now):
+    global _tenant_rate_script
+    if _tenant_rate_script is None or _tenant_rate_script[0] is not client:
+        _tenant_rate_script = (client, client.register_script(_TENANT_RATE_LUA))
+    key = f"rl:{tenant_id}:{int(now // 60)}"
+    return _tenant_rate_script[1](keys=[key], args=[120])
+
 def check_tenant_rate_limit(tenant_id):
     now = time.time()
+    
+    # Shared across gunicorn workers only when REDIS_URL is configured (and reachable);
+    # in-process window otherwise
+    client = get_redis() if REDIS_URL else None
+    if client is not None:
+        try:
+            if _redis_tenant_count(client, tenant_id, now) > TENANT_RATE_LIMIT:
+                logger.warning(f"⛔️ Tenant Rate Limit Exceeded: {tenant_id}")
+                return False
+            return True
+        except Exception as e:
+            mark_redis_down(e)
+    
     global _tenant_records
     history = _tenant_records.get(tenant_id, [])
     history = [t for t in history if now - t < 60]
@@ -159,7 +188,7 @@ def verify_unsubscribe_token(phone, token):
 
 # --- CENTRAL SAFETY CHECK ---
 
-def check_send_safety(to_number, body, external_id=None, tenant_id=None, is_internal_alert=False):
+def check_send_safety(to_number, body, external_id=None, tenant_id=None, is_internal_alert=False, opt_out_checked=False, tenant_config=None):
     """
     CENTRAL SAFETY CHECK: Blocks all sends unless safe and compliant.
     
@@ -169,6 +198,10 @@ def check_send_safety(to_number, body, external_id=None, tenant_id=None, is_inte
     3. Not a duplicate
     4. Allowed time window (8am-9pm, emergency exception)
     
+    tenant_config: the caller's already-resolved tenant row (skips the lookup in check 4).
+    opt_out_checked=True skips check 2 for rows the queue claim already gated
+    (claim_pending_sms); internal alerts then need no DB lookup for 1-2 at all.
+    
     Returns:
         (allowed: bool, reason: str)
         - (True, "reason") if allowed
@@ -177,17 +210,23 @@ def check_send_safety(to_number, body, external_id=None, tenant_id=None, is_inte
     Logs every check for audit trail.
     """
     from datetime import datetime
-    import pytz
-    from execution.utils.database import verify_valid_consent, check_opt_out_status, get_db_connection, get_tenant_by_id
+    from zoneinfo import ZoneInfo
+    from execution.utils.database import get_messaging_gate, get_db_connection
+    from execution.utils.tenant_cache import tenant_by_id
     
     masked_number = mask_pii(to_number)
     
+    # Consent + opt-out state in one DB round-trip (none needed if both checks are skipped)
+    gate = None
+    if not (is_internal_alert and opt_out_checked):
+        gate = get_messaging_gate(to_number, tenant_id=tenant_id)
+    
     # 1. CHECK CONSENT (Skip for Internal Alerts)
     if is_internal_alert:
         consent_proof = "Internal Alert (Implicit Consent)"
         logger.info(f"✅ Consent check skipped (internal) for {masked_number}")
     else:
-        consent = verify_valid_consent(to_number, tenant_id=tenant_id)
+        consent = gate['consent']
         
         # FIX: Allow immediate response to missed calls (Implied Consent)
         # Even if DB hasn't updated 'leads' table yet, the fact we are sending a "Missed Call" msg
@@ -207,12 +246,14 @@ def check_send_safety(to_number, body, external_id=None, tenant_id=None, is_inte
              logger.info(f"✅ Consent check passed for {masked_number} - {consent_proof}")
     
     # 2. CHECK OPT-OUT
-    if check_opt_out_status(to_number):
+    if opt_out_checked:
+        logger.info(f"✅ Opt-out check done at claim time for {masked_number}")
+    elif gate['opted_out']:
         reason = f"BLOCKED: {masked_number} is unsubscribed"
         logger.warning(f"🚫 {reason}")
         return False, reason
-    
-    logger.info(f"✅ Opt-out check passed for {masked_number}")
+    else:
+        logger.info(f"✅ Opt-out check passed for {masked_number}")
     
     # 3. CHECK DUPLICATE
     if external_id:
@@ -233,14 +274,13 @@ def check_send_safety(to_number, body, external_id=None, tenant_id=None, is_inte
     
     # 4. CHECK TIME WINDOW (skip for internal alerts)
     if not is_internal_alert:
-        tenant_config = None
-        if tenant_id:
-            tenant_config = get_tenant_by_id(tenant_id)
+        if tenant_config is None and tenant_id:
+            tenant_config = tenant_by_id.get(tenant_id)
         
         if tenant_config:
             try:
                 tz_name = tenant_config.get('timezone', 'America/Los_Angeles')
-                tz = pytz.timezone(tz_name)
+                tz = ZoneInfo(tz_name)  # ZoneInfo caches instances per key
                 local_now = datetime.now(tz)
                 hour = local_now.hour
                 
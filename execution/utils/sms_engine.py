@@ -1,29 +1,42 @@
+import re
 import time
+import logging
 import sys
 import os
 from datetime import datetime
-import pytz
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Ensure we can find the database module
 # (Absolute import assuming execution as main package)
 try:
-    from execution.utils.database import init_db, add_sms_to_queue, claim_pending_sms, update_sms_status, log_conversation_event, update_lead_status, check_opt_out_status, process_alert_buffer, update_sms_twilio_sid, get_tenant_by_id
+    from execution.utils.database import init_db, add_sms_to_queue, add_many_sms_to_queue, claim_pending_sms, update_sms_status, log_conversation_event, update_lead_status, check_opt_out_status, get_opted_out_phones, process_alert_buffer, finalize_send_attempt, archive_old_sms
+    from execution.utils.tenant_cache import tenant_by_id
     from execution.utils.logger import setup_logger
     from execution.utils.alert_system import send_critical_alert
     from execution.utils.security import mask_pii
 except ImportError:
     # If running as script from root maybe
-    from execution.utils.database import init_db, add_sms_to_queue, claim_pending_sms, update_sms_status, log_conversation_event, update_lead_status, check_opt_out_status, process_alert_buffer, update_sms_twilio_sid
+    from execution.utils.database import init_db, add_sms_to_queue, add_many_sms_to_queue, claim_pending_sms, update_sms_status, log_conversation_event, update_lead_status, check_opt_out_status, get_opted_out_phones, process_alert_buffer, finalize_send_attempt, archive_old_sms
     from execution.utils.logger import setup_logger
     from execution.utils.alert_system import send_critical_alert
 
     from execution.utils.security import mask_pii
-    from execution.utils.database import get_tenant_by_id
+    from execution.utils.tenant_cache import tenant_by_id
 
 logger = setup_logger("SMSEngine")
 
 MAX_RETRIES = 5 # Lower count, but longer wait text time
 
+# Body checks, compiled once: one case-insensitive scan per message, no lowercase copy
+_FOOTER_RE = re.compile(r'\b(?:stop|unsubscribe|cancel|opt[\- ]?out)\b', re.IGNORECASE)
+_RESPONSE_RE = re.compile(r'assistant|emergency', re.IGNORECASE)
+_SHORTENER_RE = re.compile(
+    '|'.join(map(re.escape, ("bit.ly", "tinyurl.com", "goo.gl", "t.co", "is.gd", "buff.ly"))),
+    re.IGNORECASE,
+)
+
 # Initialize DB
 try:
     init_db()
@@ -38,17 +51,19 @@ try:
 except ImportError:
     PLUMBER_PHONE_NUMBER = None
 
-def add_to_queue(to_number, body, external_id=None, tenant_id=None, delay_seconds=0):
-    """Adds a message to the pending queue (SQLite)"""
+def _screen_outbound(to_number, body, external_id=None, tenant_id=None, opted_out=None):
+    """
+    Validation, opt-out and safety gates shared by add_to_queue / add_many_to_queue. True = may queue.
+    opted_out: pre-fetched set of opted-out numbers for a batch (skips the per-message DB check).
+    """
     # Validate phone number format (basic E.164 check)
     if not to_number or len(str(to_number).strip()) < 10:
         logger.warning(f"⛔️ Invalid phone number format: {mask_pii(to_number)}")
         return False
     
-    # Validate tenant_id if provided
+    # Validate tenant_id if provided (resolved once; reused by the gates below)
+    tenant_config = tenant_by_id.get(tenant_id) if tenant_id else None
     if tenant_id and tenant_id != "system_alert":
-        from execution.utils.database import get_tenant_by_id
-        tenant_config = get_tenant_by_id(tenant_id)
         if not tenant_config:
             logger.warning(f"⛔️ Invalid tenant_id: {tenant_id}. Message not queued.")
             return False
@@ -62,7 +77,8 @@ def add_to_queue(to_number, body, external_id=None, tenant_id=None, delay_second
     
     # Also check database (for persistence)
     try:
-        if check_opt_out_status(to_number):
+        is_blocked = (to_number in opted_out) if opted_out is not None else check_opt_out_status(to_number)
+        if is_blocked:
             logger.warning(f"⛔️ IMMEDIATE BLOCK (DB): {mask_pii(to_number)} is unsubscribed. Message not queued.")
             return False
     except Exception as e:
@@ -81,34 +97,110 @@ def add_to_queue(to_number, body, external_id=None, tenant_id=None, delay_second
         logger.info(f"✅ Internal alert detected: {mask_pii(to_number)} matches Global Plumber Phone")
         
     # Case B: Tenant Specific Plumber Phone
-    if not is_internal and tenant_id:
-        from execution.utils.database import get_tenant_by_id
-        tenant_config = get_tenant_by_id(tenant_id)
-        if tenant_config:
-            plumber_phone = tenant_config.get('plumber_phone_number')
-            if plumber_phone and plumber_phone == to_number:
-                is_internal = True
-                logger.info(f"✅ Internal alert detected: {mask_pii(to_number)} is plumber for tenant {tenant_id}")
+    if not is_internal and tenant_config:
+        plumber_phone = tenant_config.get('plumber_phone_number')
+        if plumber_phone and plumber_phone == to_number:
+            is_internal = True
+            logger.info(f"✅ Internal alert detected: {mask_pii(to_number)} is plumber for tenant {tenant_id}")
     
-    allowed, reason = check_send_safety(to_number, body, external_id=external_id, tenant_id=tenant_id, is_internal_alert=is_internal)
+    allowed, reason = check_send_safety(to_number, body, external_id=external_id, tenant_id=tenant_id,
+                                        is_internal_alert=is_internal, tenant_config=tenant_config)
     if not allowed:
         logger.warning(f"⛔️ Dropping message to {mask_pii(to_number)} - {reason}")
         return False
+    return True
+
+def _send_after_utc(to_number, body, tenant_id=None, delay_seconds=0):
+    """
+    Quiet-hours gate, computed once at queue time: the earliest unix time this message
+    may go out in the tenant's local business hours (default 8am-9pm), or None if it
+    may go out whenever it is due (no tenant, internal alert, emergency/assistant response).
+    claim_pending_sms filters on it, so the worker never re-checks timezones.
+    """
+    if not tenant_id:
+        return None
+    tenant_config = tenant_by_id.get(tenant_id)
+    if not tenant_config:
+        return None
+    if to_number in (PLUMBER_PHONE_NUMBER, tenant_config.get('plumber_phone_number')):
+        return None  # Internal alert
+    
+    # Responses the customer just asked for may go out at night
+    if _RESPONSE_RE.search(body):
+        return None
+    
+    try:
+        tz = ZoneInfo(tenant_config.get('timezone') or 'America/Los_Angeles')
+        start_h = int(tenant_config.get('business_hours_start', 8))
+        end_h = int(tenant_config.get('business_hours_end', 21))  # Default to 9 PM
+    except Exception as e:
+        logger.error(f"Timezone Check Failed: {e}")
+        return None
+    
+    due = datetime.now(tz) + timedelta(seconds=delay_seconds)
+    if start_h <= due.hour < end_h:
+        return None
+    opens = due.replace(hour=start_h, minute=0, second=0, microsecond=0)
+    if due.hour >= end_h:
+        opens += timedelta(days=1)
+    logger.info(f"⏳ Timezone Guard: Holding message to {mask_pii(to_number)} until {opens.isoformat()}")
+    return int(opens.timestamp())
+
+def add_to_queue(to_number, body, external_id=None, tenant_id=None, delay_seconds=0):
+    """Adds a message to the pending queue (SQLite)"""
+    if not _screen_outbound(to_number, body, external_id=external_id, tenant_id=tenant_id):
+        return False
 
     # Pass delay_seconds to DB function
-    added = add_sms_to_queue(to_number, body, external_id=external_id, tenant_id=tenant_id, delay_seconds=delay_seconds)
+    send_after_utc = _send_after_utc(to_number, body, tenant_id=tenant_id, delay_seconds=delay_seconds)
+    added = add_sms_to_queue(to_number, body, external_id=external_id, tenant_id=tenant_id,
+                             delay_seconds=delay_seconds, send_after_utc=send_after_utc)
     if added:
-        if delay_seconds > 0:
-            logger.info(f"Queued DELAYED message for {mask_pii(to_number)} (+{delay_seconds}s)")
-        else:
-            logger.info(f"Queued message for {mask_pii(to_number)} (Tenant: {tenant_id})")
+        if logger.isEnabledFor(logging.INFO):
+            if delay_seconds > 0:
+                logger.info("Queued DELAYED message for %s (+%ss)", mask_pii(to_number), delay_seconds)
+            else:
+                logger.info("Queued message for %s (Tenant: %s)", mask_pii(to_number), tenant_id)
         return True
     else:
-        logger.info(f"Skipped duplicate message for {mask_pii(to_number)} (Ref: {external_id})")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Skipped duplicate message for %s (Ref: %s)", mask_pii(to_number), external_id)
         return False
 
+def add_many_to_queue(messages):
+    """
+    Queues several (to_number, body, external_id, tenant_id) messages with a single DB commit.
+    Each message passes the same gates as add_to_queue; returns one boolean per message.
+    """
+    messages = list(messages)
+    results = [False] * len(messages)
+    accepted = []
+    
+    # One opt-out query for the whole batch (tenant rows come from the TTL cache)
+    try:
+        opted_out = get_opted_out_phones(m[0] for m in messages)
+    except Exception as e:
+        logger.warning(f"Failed to batch-check opt-out status in DB: {e}. Checking per message.")
+        opted_out = None
+    
+    for i, (to_number, body, external_id, tenant_id) in enumerate(messages):
+        if _screen_outbound(to_number, body, external_id=external_id, tenant_id=tenant_id, opted_out=opted_out):
+            accepted.append(i)
+    
+    if accepted:
+        inserted = add_many_sms_to_queue(
+            (*messages[i], _send_after_utc(messages[i][0], messages[i][1], tenant_id=messages[i][3]))
+            for i in accepted
+        )
+        log_queued = logger.isEnabledFor(logging.INFO)
+        for i, added in zip(accepted, inserted):
+            results[i] = added
+            if added and log_queued:
+                logger.info("Queued message for %s (Tenant: %s)", mask_pii(messages[i][0]), messages[i][3])
+    return results
+
 def calculate_backoff(attempt):
-    """Exponential Backoff: 0 for first, then 5s, 30s, 2m, 10m, 30m"""
+    """Exponential Backoff: 0 for first, then 5s, 30s, 2m, 10m, 30m (applied in SQL by finalize_send_attempt)"""
     if attempt == 0: return 0 
     if attempt == 1: return 5
     if attempt == 2: return 30
@@ -120,6 +212,99 @@ def calculate_backoff(attempt):
 _alert_buffer_last_check = 0
 _alert_buffer_check_interval = 5  # Check every 5 seconds instead of every cycle
 
+# Hourly archival of finished messages (keeps sms_queue small for claim_pending_sms)
+_archive_last_run = 0
+_archive_interval = 3600
+
+# Rows claimed per process_queue tick
+CLAIM_BATCH_SIZE = 10
+
+# Parallel Twilio sends per claimed batch (threads share the client's keep-alive session)
+SEND_WORKERS = 8
+_SEND_EXECUTOR = ThreadPoolExecutor(max_workers=SEND_WORKERS, thread_name_prefix="sms-send")
+
+def _maybe_archive_sms():
+    global _archive_last_run
+    now = time.time()
+    if now - _archive_last_run < _archive_interval:
+        return
+    _archive_last_run = now  # Set up-front so a failing archive doesn't retry every cycle
+    try:
+        archive_old_sms()
+    except Exception as e:
+        logger.error(f"Error Archiving Old SMS: {e}")
+
+def _send_one(twilio, msg, body):
+    """Sends one claimed message. Runs on a send thread; returns (success, message_sid, error)."""
+    to_number = msg['to_number']
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Attempt #%s for %s...", msg['attempts'] + 1, mask_pii(to_number))
+    try:
+        # send_sms returns MessageSid on success, False on failure
+        result = twilio.send_sms(to_number, body, tenant_id=msg.get('tenant_id'), external_id=msg.get('external_id'))
+        if result:
+            logger.info(f"✅ SMS sent successfully. MessageSid: {result}")
+            return True, result, None
+        return False, None, None
+    except Exception as e:
+        # API timeout or crash - log clearly
+        error_type = "API_TIMEOUT" if "timeout" in str(e).lower() or "timed out" in str(e).lower() else "API_ERROR"
+        logger.error(f"{error_type}: Failed to send to {mask_pii(to_number)}: {e}")
+        return False, None, str(e)
+
+def _record_send_result(msg, body, send_success, message_sid, send_error):
+    """Writes the outcome of one send back to the queue / lead tables."""
+    msg_id = msg['id']
+    tenant_id = msg.get('tenant_id')
+    to_number = msg['to_number']
+    attempts = msg['attempts']
+    # Read once when the send completes (not at tick start: the send was a network round-trip)
+    now = datetime.now()
+
+    # CRITICAL: Always update status, even if send failed or status update fails
+    # This prevents infinite retries and double-sending
+    try:
+        # One UPDATE: sent (+ MessageSid for status callbacks), or retry/dead-letter with
+        # the backoff computed in SQL (claim_pending_sms filters on next_attempt_at)
+        finalize_send_attempt(msg_id, send_success, MAX_RETRIES, twilio_message_sid=message_sid, now=now)
+        
+        if send_success:
+            if message_sid:
+                logger.info(f"📝 Stored MessageSid {message_sid} for message {msg_id}")
+            
+            # LEAD STATE UPDATE
+            log_conversation_event(to_number, 'outbound', body, external_id=f"out_{msg_id}", tenant_id=tenant_id)
+            update_lead_status(to_number, 'contacted', tenant_id=tenant_id)
+        else:
+            # Failure: requeued with backoff, or dead-lettered at max retries
+            if attempts + 1 < MAX_RETRIES:
+                logger.warning(f"Retry scheduled for {mask_pii(to_number)} (attempt {attempts+1}/{MAX_RETRIES})")
+            else:
+                logger.error(f"DEAD-LETTER: Message {msg_id} moved to failed_permanent after {attempts+1} attempts. Error: {send_error or 'Send returned False'}")
+                
+                # 🚨 LOUD ALERT: Message failed - very visible log
+                reason = send_error or 'Send returned False'
+                logger.critical(f"🚨 MESSAGE FAILED - ID: {msg_id} | Reason: {reason} | Attempts: {attempts+1}/{MAX_RETRIES} | To: {mask_pii(to_number)}")
+                
+                send_critical_alert(
+                    "SMS Dead-Letter Queue",
+                    f"Message moved to dead-letter after {attempts+1} retries.\n"
+                    f"To: {mask_pii(to_number)}\n"
+                    f"Message ID: {msg_id}\n"
+                    f"Error: {send_error or 'Unknown error'}"
+                )
+    except Exception as update_error:
+        # CRITICAL: If status update fails, mark as failed_permanent to prevent infinite retries
+        logger.critical(f"CRITICAL: Failed to update status for {msg_id}: {update_error}. Marking as failed_permanent to prevent infinite retries.")
+        try:
+            update_sms_status(msg_id, 'failed_permanent', attempts+1, last_attempt=now.isoformat())
+            # 🚨 LOUD ALERT: Message failed due to status update error
+            logger.critical(f"🚨 MESSAGE FAILED - ID: {msg_id} | Reason: Status update failed ({update_error}) | To: {mask_pii(to_number)}")
+        except:
+            # Last resort: log and continue (message will be picked up by stuck message recovery)
+            logger.critical(f"FATAL: Cannot update status for {msg_id}. Manual intervention required.")
+            logger.critical(f"🚨 MESSAGE FAILED - ID: {msg_id} | Reason: Cannot update status (database error) | To: {mask_pii(to_number)}")
+
 def process_queue():
     """Reads queue from DB, attempts to send pending messages"""
     
@@ -131,31 +316,26 @@ def process_queue():
     global _alert_buffer_last_check
     import time
     now = time.time()
+    # One wall-clock read per tick, shared by every gate below
+    now_iso = datetime.now().isoformat()
     if now - _alert_buffer_last_check > _alert_buffer_check_interval:
         try:
-            # Quick check if any alerts exist before processing
-            from execution.utils.database import get_db_connection
-            conn = get_db_connection()
-            if conn:
-                try:
-                    now_iso = datetime.now().isoformat()
-                    count = conn.execute("SELECT COUNT(*) FROM alert_buffer WHERE send_at <= ?", (now_iso,)).fetchone()[0]
-                    if count > 0:
-                        processed_alerts = process_alert_buffer()
-                        if processed_alerts > 0:
-                            logger.info(f"Released {processed_alerts} buffered groups to SMS queue.")
-                    # Update timestamp even if no alerts (to avoid checking every cycle)
-                    _alert_buffer_last_check = now
-                finally:
-                    conn.close()
-            else:
-                _alert_buffer_last_check = now  # Update on connection failure
+            # Quick check if any alerts exist before processing (read-only, no write lock)
+            from execution.utils.database import read_conn
+            with read_conn() as conn:
+                count = conn.execute("SELECT COUNT(*) FROM alert_buffer WHERE send_at <= ?", (int(now),)).fetchone()[0]
+            if count > 0:
+                processed_alerts = process_alert_buffer()
+                if processed_alerts > 0:
+                    logger.info(f"Released {processed_alerts} buffered groups to SMS queue.")
+            # Update timestamp even if no alerts (to avoid checking every cycle)
+            _alert_buffer_last_check = now
         except Exception as e:
             logger.error(f"Error Processing Alert Buffer: {e}")
             _alert_buffer_last_check = now  # Update even on error to prevent spam
 
     # Atomic Claim from DB
-    queue = claim_pending_sms(limit=10)
+    queue = claim_pending_sms(limit=CLAIM_BATCH_SIZE)
     
     if not queue:
         return [] # No work
@@ -164,6 +344,7 @@ def process_queue():
 
     # Get Single Twilio Instance
     twilio = get_twilio_service()
+    ready = []
 
     for msg in queue:
         logger.info(f"🔍 DEBUG: Worker picked up msg_id {msg['id']}")
@@ -188,13 +369,14 @@ def process_queue():
         
         # Case B: Tenant Specific
         if tenant_id:
-            tenant_config = get_tenant_by_id(tenant_id)
+            tenant_config = tenant_by_id.get(tenant_id)
             if tenant_config and tenant_config.get('plumber_phone_number') == to_number:
                 is_internal_alert = True
             elif not tenant_config:
                 logger.warning(f"⚠️ Tenant {tenant_id} not found. Skipping safety check for internal alert detection.")
         
-        allowed, reason = check_send_safety(to_number, body, external_id=msg.get('external_id'), tenant_id=tenant_id, is_internal_alert=is_internal_alert)
+        # Opt-out was already enforced by claim_pending_sms; keep the consent/duplicate/time gates
+        allowed, reason = check_send_safety(to_number, body, external_id=msg.get('external_id'), tenant_id=tenant_id, is_internal_alert=is_internal_alert, opt_out_checked=True, tenant_config=tenant_config)
         if not allowed:
             logger.warning(f"⛔️ Dropping queued message to {mask_pii(to_number)} - {reason}")
             update_sms_status(msg_id, 'failed_safety', attempts)
@@ -206,7 +388,7 @@ def process_queue():
             logger.error(error_msg)
             
             try:
-                update_sms_status(msg_id, 'failed_permanent', attempts, last_attempt=datetime.now().isoformat())
+                update_sms_status(msg_id, 'failed_permanent', attempts, last_attempt=now_iso)
             except Exception as update_error:
                 logger.critical(f"CRITICAL: Failed to mark message {msg_id} as failed_permanent: {update_error}")
             
@@ -229,13 +411,10 @@ def process_queue():
         # tenant_config already loaded above for safety check
         
         if not is_internal_alert:
-            body_lower = body.lower()
-            required_footers = ["stop", "unsubscribe", "cancel", "opt out", "opt-out"]
-            
             # Soft Check: If it's short, it might be a conversation. 
             # Strict Rule: "Make sure every outbound message includes... one-click or Reply STOP"
             # We enforce "STOP" presence.
-            if not any(f in body_lower for f in required_footers):
+            if not _FOOTER_RE.search(body):
                 # FIX: Auto-append footer instead of blocking
                 # This ensures compliance while allowing messages to send
                 logger.info(f"⚠️ Auto-appending compliance footer to message {msg_id}")
@@ -254,111 +433,30 @@ def process_queue():
 
         # --- C. URL SHORTENER CHECK (Deliverability) ---
         # Rule: Avoid bit.ly, tinyurl, etc. in pilot phase to prevent filtering.
-        shorteners = ["bit.ly", "tinyurl.com", "goo.gl", "t.co", "is.gd", "buff.ly"]
-        if any(s in body.lower() for s in shorteners):
+        if _SHORTENER_RE.search(body):
             logger.warning(f"⚠️ DELIVERABILITY WARNING: Message {msg_id} contains a URL shortener. This may be blocked by carriers.")
             # We don't block it yet, but we log the warning for the pilot team.
 
         # --- B. TIMEZONE GATE (Reliability) ---
-        # Don't text customers at 3 AM unless it's an emergency response they just asked for.
-        if tenant_config and not is_internal_alert:
-            # Check Timezone - use same logic as security.py for consistency
-            try:
-                tz_name = tenant_config.get('timezone', 'America/Los_Angeles')
-                tz = pytz.timezone(tz_name)
-                local_now = datetime.now(tz)
-                hour = local_now.hour
-                
-                # Use tenant config for time window (consistent with security.py)
-                start_h = int(tenant_config.get('business_hours_start', 8))
-                end_h = int(tenant_config.get('business_hours_end', 21)) # Default to 9 PM
-                
-                if not (start_h <= hour < end_h):
-                    # It's night time.
-                    # ONLY allow if it's an "Emergency" response or explicit "After Hours" flow initiated by user.
-                    # We check body keywords as a proxy for "Response"
-                    is_response = "assistant" in body.lower() or "emergency" in body.lower()
-                    
-                    if not is_response:
-                        logger.warning(f"⏳ Timezone Guard: Holding message to {mask_pii(to_number)} until {start_h}am. (Hour: {hour})")
-                        # Requeue with backoff (wait 1 hour or check later)
-                        # We just leave it pending but update last_attempt so we don't spin
-                        status_update = "pending"
-                        update_sms_status(msg_id, status_update, attempts, last_attempt=datetime.now().isoformat())
-                        continue
-            except Exception as e:
-                logger.error(f"Timezone Check Failed: {e}")
-        
-        # Send with timeout protection
-        logger.info(f"Attempt #{attempts+1} for {mask_pii(to_number)}...")
-        send_success = False
-        send_error = None
-        message_sid = None
-        
-        try:
-            # Send with explicit timeout handling
-            # send_sms now returns MessageSid on success, False on failure
-            result = twilio.send_sms(to_number, body, tenant_id=tenant_id, external_id=msg.get('external_id'))
-            if result:
-                send_success = True
-                message_sid = result  # Store the MessageSid
-                logger.info(f"✅ SMS sent successfully. MessageSid: {message_sid}")
-            else:
-                send_success = False
-        except Exception as e:
-            # API timeout or crash - log clearly
-            send_error = str(e)
-            error_type = "API_TIMEOUT" if "timeout" in str(e).lower() or "timed out" in str(e).lower() else "API_ERROR"
-            logger.error(f"{error_type}: Failed to send to {mask_pii(to_number)}: {e}")
-            send_success = False
+        # Enforced at claim time: add_to_queue stored send_after_utc for the tenant's
+        # business hours, and claim_pending_sms only hands out rows inside that window.
         
-        # CRITICAL: Always update status, even if send failed or status update fails
-        # This prevents infinite retries and double-sending
-        try:
-            if send_success:
-                # Success: Mark as sent
-                update_sms_status(msg_id, 'sent', attempts+1, sent_at=datetime.now().isoformat())
-                
-                # Store Twilio MessageSid for status callback tracking
-                if message_sid:
-                    update_sms_twilio_sid(msg_id, message_sid)
-                    logger.info(f"📝 Stored MessageSid {message_sid} for message {msg_id}")
-                
-                # LEAD STATE UPDATE
-                log_conversation_event(to_number, 'outbound', body, external_id=f"out_{msg_id}", tenant_id=tenant_id)
-                update_lead_status(to_number, 'contacted', tenant_id=tenant_id)
-            else:
-                # Failure: Requeue with backoff (if not at max retries)
-                if attempts + 1 < MAX_RETRIES:
-                    update_sms_status(msg_id, 'pending', attempts+1, last_attempt=datetime.now().isoformat())
-                    logger.warning(f"Retry scheduled for {mask_pii(to_number)} (attempt {attempts+1}/{MAX_RETRIES})")
-                else:
-                    # At max retries: Move to dead-letter
-                    update_sms_status(msg_id, 'failed_permanent', attempts+1, last_attempt=datetime.now().isoformat())
-                    logger.error(f"DEAD-LETTER: Message {msg_id} moved to failed_permanent after {attempts+1} attempts. Error: {send_error or 'Send returned False'}")
-                    
-                    # 🚨 LOUD ALERT: Message failed - very visible log
-                    reason = send_error or 'Send returned False'
-                    logger.critical(f"🚨 MESSAGE FAILED - ID: {msg_id} | Reason: {reason} | Attempts: {attempts+1}/{MAX_RETRIES} | To: {mask_pii(to_number)}")
-                    
-                    send_critical_alert(
-                        "SMS Dead-Letter Queue",
-                        f"Message moved to dead-letter after {attempts+1} retries.\n"
-                        f"To: {mask_pii(to_number)}\n"
-                        f"Message ID: {msg_id}\n"
-                        f"Error: {send_error or 'Unknown error'}"
-                    )
-        except Exception as update_error:
-            # CRITICAL: If status update fails, mark as failed_permanent to prevent infinite retries
-            logger.critical(f"CRITICAL: Failed to update status for {msg_id}: {update_error}. Marking as failed_permanent to prevent infinite retries.")
-            try:
-                update_sms_status(msg_id, 'failed_permanent', attempts+1, last_attempt=datetime.now().isoformat())
-                # 🚨 LOUD ALERT: Message failed due to status update error
-                logger.critical(f"🚨 MESSAGE FAILED - ID: {msg_id} | Reason: Status update failed ({update_error}) | To: {mask_pii(to_number)}")
-            except:
-                # Last resort: log and continue (message will be picked up by stuck message recovery)
-                logger.critical(f"FATAL: Cannot update status for {msg_id}. Manual intervention required.")
-                logger.critical(f"🚨 MESSAGE FAILED - ID: {msg_id} | Reason: Cannot update status (database error) | To: {mask_pii(to_number)}")
+        # Passed every gate: send in parallel below
+        ready.append((msg, body))
+
+    if not ready:
+        return queue
+
+    # Sends are network-bound (one HTTPS round-trip each): dispatch them together and
+    # record each outcome on this thread as it completes (status writes stay serialized)
+    futures = {
+        _SEND_EXECUTOR.submit(_send_one, twilio, msg, body): (msg, body)
+        for msg, body in ready
+    }
+    for future in as_completed(futures):
+        msg, body = futures[future]
+        send_success, message_sid, send_error = future.result()
+        _record_send_result(msg, body, send_success, message_sid, send_error)
 
     return queue
 
@@ -376,6 +474,8 @@ def run_worker():
                 time.sleep(10)
                 continue
 
+            _maybe_archive_sms()
+
             # Process queue and check if work was found
             queue = process_queue()
             if queue and len(queue) > 0:
@@ -383,8 +483,10 @@ def run_worker():
                 # Reset backoff since we're actively processing
                 current_backoff = 1
                 failure_streak = 0
-                # Don't sleep if we found work, maybe a small yield
-                time.sleep(0.1)
+                # A full batch means a backlog: claim the next one straight away.
+                # A partial batch drained the queue, so just yield briefly.
+                if len(queue) < CLAIM_BATCH_SIZE:
+                    time.sleep(0.1)
                 continue
                 
             # No work found (empty queue), increase backoff (Capped at 2s for instant OTP response)
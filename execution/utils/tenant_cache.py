@@ -0,0 +1,78 @@
+import time
+import threading
+from collections import OrderedDict
+from execution.utils import database
+from execution.utils.logger import setup_logger
+
+logger = setup_logger("TenantCache")
+
+# Tenant rows change rarely (provisioning / admin edits), but every inbound
+# webhook and queued SMS resolves one. Keep small in-process TTL LRUs in front of the DB.
+TENANT_CACHE_SIZE = 1024
+TENANT_CACHE_TTL = 60  # seconds
+
+
+def _normalize_number(number):
+    """Cache key for a phone number: trimmed, no leading '+'."""
+    return str(number).strip().lstrip('+')
+
+
+class TenantRouter:
+    """
+    Resolves a tenant by key (incoming Twilio number by default), with a bounded TTL LRU.
+
+    Negative results (unknown numbers) are cached too, so probing with random
+    numbers can't bypass the cache. DB errors are NOT cached - they propagate
+    to the caller (see resilience.get_tenant_safe).
+
+    Cached dicts are shared between requests: treat them as read-only.
+    """
+
+    def __init__(self, loader, cache_size=TENANT_CACHE_SIZE, ttl=TENANT_CACHE_TTL, key=_normalize_number):
+        self._loader = loader
+        self._key = key
+        self._cache_size = cache_size
+        self._ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tenant or None)
+        self._lock = threading.Lock()
+
+    def get(self, number):
+        if not number:
+            return None
+        key = self._key(number)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # Miss (or expired): query outside the lock so a slow DB doesn't serialize webhooks
+        tenant = self._loader(number)
+
+        with self._lock:
+            self._entries[key] = (now + self._ttl, tenant)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._cache_size:
+                self._entries.popitem(last=False)
+        return tenant
+
+    def invalidate(self, number=None):
+        """Drops one number from the cache, or everything if number is None (admin updates)."""
+        with self._lock:
+            if number is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(number), None)
+        logger.info(f"🔄 Tenant cache invalidated ({number or 'all'})")
+
+
+tenant_router = TenantRouter(database.get_tenant_by_twilio_number)
+tenant_by_id = TenantRouter(database.get_tenant_by_id, key=str)
+
+
+def invalidate_tenants():
+    """Drops every cached tenant. Call after any tenant insert/update/delete."""
+    tenant_router.invalidate()
+    tenant_by_id.invalidate()
@@ -0,0 +1,81 @@
+import time
+import threading
+from collections import OrderedDict
+from execution.utils.redis_client import get_redis, mark_redis_down
+
+# Twilio retries a webhook within seconds when our response is slow or lost.
+# Remember recently processed SIDs in-process so those retries skip the DB.
+WEBHOOK_SEEN_MAX = 4096
+WEBHOOK_SEEN_TTL = 600  # seconds
+# Retries can land on another gunicorn worker; Redis (when configured) shares
+# processed SIDs across workers so those skip the DB too.
+WEBHOOK_SHARED_TTL = 86400  # seconds
+WEBHOOK_SHARED_PREFIX = 'wh:'
+
+
+class SeenWebhooks:
+    """
+    Bounded TTL LRU of provider_id -> internal_id for webhooks already processed.
+
+    Only positive results are cached: a miss always falls through to
+    webhook_events, which stays the source of truth across workers/restarts.
+    """
+
+    def __init__(self, max_size=WEBHOOK_SEEN_MAX, ttl=WEBHOOK_SEEN_TTL):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()  # provider_id -> (expires_at, internal_id)
+        self._lock = threading.Lock()
+
+    def get(self, provider_id):
+        """Returns (True, internal_id) on a fresh hit, (False, None) otherwise."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(provider_id)
+            if entry is None:
+                return False, None
+            if entry[0] <= now:
+                del self._entries[provider_id]
+                return False, None
+            self._entries.move_to_end(provider_id)
+            return True, entry[1]
+
+    def add(self, provider_id, internal_id=None):
+        with self._lock:
+            self._entries[provider_id] = (time.monotonic() + self._ttl, internal_id)
+            self._entries.move_to_end(provider_id)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+seen_webhooks = SeenWebhooks()
+
+
+def shared_seen_get(provider_id):
+    """Cross-worker lookup in Redis. Returns (True, internal_id) on a hit, (False, None) on miss or if Redis is down."""
+    client = get_redis()
+    if client is None:
+        return False, None
+    try:
+        value = client.get(WEBHOOK_SHARED_PREFIX + provider_id)
+    except Exception as e:
+        mark_redis_down(e)
+        return False, None
+    if value is None:
+        return False, None
+    return True, value.decode() or None
+
+
+def shared_seen_add(provider_id, internal_id=None):
+    """Publishes a processed SID to Redis (SET NX EX: first writer wins, entries expire)."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.set(WEBHOOK_SHARED_PREFIX + provider_id, internal_id or '', nx=True, ex=WEBHOOK_SHARED_TTL)
+    except Exception as e:
+        mark_redis_down(e)
@@ -19,11 +19,16 @@ logger = setup_logger("ProcessManager")
 def start_flask_app():
     """Runs the Flask Webhook Server via Gunicorn (Production)"""
     print("🌐 Starting Gunicorn Web Server on Port 5002...")
-    # 2 Workers, Threads enabled, Bind to 5002
+    # 2 Workers x WEB_THREADS threads, Bind to 5002.
+    # Webhooks are I/O-bound (DB, Twilio, SMTP): gthread lets one worker serve
+    # many in-flight requests instead of being pinned by each blocking call.
+    threads = os.getenv("WEB_THREADS", "16")
     cmd = [
         "gunicorn", 
         "execution.handle_incoming_call:app", 
         "-w", "2", 
+        "-k", "gthread",
+        "--threads", threads,
         "-b", "0.0.0.0:5002",
         "--access-logfile", "-",
         "--error-logfile", "-"